@@ -45,35 +45,72 @@ class Timestamp(datetime.datetime):
     mediawikiTSFormat = "%Y%m%d%H%M%S"
     ISO8601Format = "%Y-%m-%dT%H:%M:%SZ"
 
+    # Parsed timestamps, keyed by (class, string); cleared when it holds
+    # MAXCACHE items.  Timestamps are immutable, so they can be shared.
+    MAXCACHE = 1000
+    _cache = {}
+
     @classmethod
     def fromISOformat(cls, ts):
         """Convert an ISO 8601 timestamp to a Timestamp object."""
-        return cls.strptime(ts, cls.ISO8601Format)
+        cache = Timestamp._cache
+        try:
+            return cache[cls, ts]
+        except KeyError:
+            pass
+        # the API always uses this exact layout, so read the fields at
+        # their fixed offsets; anything else is left to strptime
+        if len(ts) == 20 and ts[4] == ts[7] == "-" and ts[10] == "T" \
+                and ts[13] == ts[16] == ":" and ts[19] == "Z" \
+                and (ts[:4] + ts[5:7] + ts[8:10] + ts[11:13] + ts[14:16]
+                     + ts[17:19]).isdigit():
+            result = cls(int(ts[:4]), int(ts[5:7]), int(ts[8:10]),
+                         int(ts[11:13]), int(ts[14:16]), int(ts[17:19]))
+        else:
+            result = cls.strptime(ts, cls.ISO8601Format)
+        if len(cache) >= cls.MAXCACHE:
+            cache.clear()
+        cache[cls, ts] = result
+        return result
 
     @classmethod
     def fromtimestampformat(cls, ts):
         """Convert the internal MediaWiki timestamp format to a Timestamp object."""
-        return cls.strptime(ts, cls.mediawikiTSFormat)
+        cache = Timestamp._cache
+        try:
+            return cache[cls, ts]
+        except KeyError:
+            pass
+        if len(ts) == 14 and ts.isdigit():
+            result = cls(int(ts[:4]), int(ts[4:6]), int(ts[6:8]),
+                         int(ts[8:10]), int(ts[10:12]), int(ts[12:14]))
+        else:
+            result = cls.strptime(ts, cls.mediawikiTSFormat)
+        if len(cache) >= cls.MAXCACHE:
+            cache.clear()
+        cache[cls, ts] = result
+        return result
 
     def __str__(self):
         """Return a string format recognized by the API"""
-        return self.strftime(self.ISO8601Format)
+        return "%04d-%02d-%02dT%02d:%02d:%02dZ" % (self.year, self.month,
+                                                   self.day, self.hour,
+                                                   self.minute, self.second)
+
+    # Results are rebuilt from the pickled state of the datetime, which
+    # is much faster than passing every field to the constructor.
 
     def __add__(self, other):
         newdt = datetime.datetime.__add__(self, other)
         if isinstance(newdt, datetime.datetime):
-            return Timestamp(newdt.year, newdt.month, newdt.day, newdt.hour,
-                             newdt.minute, newdt.second, newdt.microsecond,
-                             newdt.tzinfo)
+            return self.__class__(*newdt.__reduce__()[1])
         else:
             return newdt
 
     def __sub__(self, other):
         newdt = datetime.datetime.__sub__(self, other)
         if isinstance(newdt, datetime.datetime):
-            return Timestamp(newdt.year, newdt.month, newdt.day, newdt.hour,
-                             newdt.minute, newdt.second, newdt.microsecond,
-                             newdt.tzinfo)
+            return self.__class__(*newdt.__reduce__()[1])
         else:
             return newdt
 
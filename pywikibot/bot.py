@@ -230,6 +230,11 @@ def logoutput(text, decoder=None, newline=True, _level=INFO, _logger="",
     if not _handlers_initialized:
         init_handlers()
 
+    # don't inspect the stack or decode the text for a record that
+    # would be discarded anyway
+    if not logger.isEnabledFor(_level):
+        return
+
     frame = currentframe()
     module = os.path.basename(frame.f_code.co_filename)
     context = {'caller_name': frame.f_code.co_name,
@@ -302,6 +307,33 @@ def debug(text, layer, decoder=None, newline=True, **kwargs):
     """Output a debug record to the log file."""
     logoutput(text, decoder, newline, DEBUG, layer, **kwargs)
 
+def debugging(layer):
+    """Return True if debug records of the given layer are logged.
+
+    Callers can use this to skip building a costly debug message when
+    debugging is not enabled for their layer:
+
+    >>> if debugging("api"):
+    ...     debug(u"Parameters: %r" % params, "api")
+
+    """
+    if not _handlers_initialized:
+        init_handlers()
+    return logging.getLogger("pywiki." + layer).isEnabledFor(DEBUG)
+
+def truncated(text, limit=None):
+    """Shorten text, e.g. a request or response body, for a debug record.
+
+    @param limit: maximum number of characters kept; defaults to
+        config.debug_log_limit. If 0, text is returned unchanged.
+
+    """
+    if limit is None:
+        limit = config.debug_log_limit
+    if not limit or len(text) <= limit:
+        return text
+    return text[:limit] + "... [%i more characters]" % (len(text) - limit)
+
 
 # User input functions
 
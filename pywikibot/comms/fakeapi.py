@@ -0,0 +1,428 @@
+# -*- coding: utf-8  -*-
+"""
+A small in-process imitation of api.php, for offline tests and benchmarks.
+
+L{FakeAPI} keeps a handful of pages in memory and answers the requests
+that the framework's generators, preloading and editing code send most
+often:
+
+    - action=query with meta=siteinfo and meta=userinfo
+    - action=query with list=allpages or generator=allpages, continued
+      with query-continue (generator=templates yields no pages)
+    - action=query with titles=, pageids= or revids= and prop=info and
+      prop=revisions (including the edit token)
+    - action=paraminfo for the query modules above
+    - action=login, action=logout and action=edit
+
+Anything else is answered with an API error.  A FakeAPI object has the
+same request() method as L{threadedhttp.Http}, so it can be used by the
+HTTP threads instead of a real connection; see L{transport}.
+
+"""
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+__docformat__ = 'epytext'
+
+import cgi
+import datetime
+import threading
+import time
+import urlparse
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+import pywikibot
+from pywikibot.comms.threadedhttp import httplib2
+
+_logger = "comm.fakeapi"
+
+
+class FakeAPI(object):
+    """In-process imitation of a small part of api.php"""
+
+    # namespace numbers and names; 4 and 5 are named after the site
+    namespaces = {-2: u"Media", -1: u"Special", 0: u"", 1: u"Talk",
+                  2: u"User", 3: u"User talk", 6: u"File", 7: u"File talk",
+                  8: u"MediaWiki", 9: u"MediaWiki talk", 10: u"Template",
+                  11: u"Template talk", 12: u"Help", 13: u"Help talk",
+                  14: u"Category", 15: u"Category talk"}
+
+    # query modules described by action=paraminfo, with their prefix and
+    # whether they have a limit parameter
+    modules = {"allpages": ("ap", True), "revisions": ("rv", True),
+               "info": ("in", False), "siteinfo": ("si", False),
+               "userinfo": ("ui", False), "imageinfo": ("ii", False),
+               "categoryinfo": ("ci", False), "templates": ("tl", True)}
+
+    # largest number of items returned for "limit=max"
+    maxlimit = 500
+
+    edittoken = u"+\\"
+
+    def __init__(self, lang="en", sitename=u"Wikipedia", latency=0):
+        """
+        @param lang: language code reported in the site information
+        @param sitename: name of the site, used for namespaces 4 and 5
+        @param latency: seconds to wait before answering each request
+
+        """
+        self.lang = lang
+        self.sitename = sitename
+        self.latency = latency
+        self.namespaces = dict(self.namespaces)
+        self.namespaces[4] = sitename
+        self.namespaces[5] = sitename + u" talk"
+        self.pages = {}         # title -> page dict
+        self.revisions = {}     # revid -> (page dict, revision dict)
+        self.username = None
+        self.requests = 0
+        self._lastid = 0
+        self._lastrevid = 0
+        self._clock = datetime.datetime(2011, 1, 1)
+        self.lock = threading.RLock()
+
+    # page storage
+
+    def normalize(self, title):
+        """Return (namespace, normalized title) for title"""
+        title = title.replace(u"_", u" ").strip()
+        ns = 0
+        if u":" in title:
+            prefix, rest = title.split(u":", 1)
+            prefix = prefix.strip().lower()
+            for num, name in self.namespaces.iteritems():
+                if name and name.lower() == prefix:
+                    ns = num
+                    title = rest.strip()
+                    break
+        if title:
+            title = title[0].upper() + title[1:]
+        if ns:
+            title = self.namespaces[ns] + u":" + title
+        return ns, title
+
+    def add_page(self, title, text, user=u"Example", comment=u""):
+        """Create a page, or add a revision to an existing one.
+
+        @return: the new revision id
+
+        """
+        self.lock.acquire()
+        try:
+            ns, title = self.normalize(title)
+            if title not in self.pages:
+                self._lastid += 1
+                self.pages[title] = {"pageid": self._lastid, "ns": ns,
+                                     "title": title, "revisions": []}
+            page = self.pages[title]
+            self._lastrevid += 1
+            self._clock += datetime.timedelta(seconds=1)
+            revision = {"revid": self._lastrevid, "user": user,
+                        "comment": comment, "*": text,
+                        "timestamp": self._clock.strftime(
+                                         "%Y-%m-%dT%H:%M:%SZ")}
+            page["revisions"].append(revision)
+            self.revisions[revision["revid"]] = (page, revision)
+            return revision["revid"]
+        finally:
+            self.lock.release()
+
+    # HTTP interface
+
+    def request(self, uri, method="GET", body=None, headers=None,
+                max_redirects=None, connection_type=None):
+        """Answer an HTTP request like L{threadedhttp.Http.request}.
+
+        @return: (response, content) tuple
+
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        path, query = urlparse.urlparse(uri)[2:5:2]
+        if not path.endswith("/api.php"):
+            return (httplib2.Response({"status": "404"}), "")
+        params = {}
+        sources = [query]
+        if isinstance(body, basestring):
+            sources.append(body)
+        for source in sources:
+            values = cgi.parse_qs(source, keep_blank_values=True)
+            for key in values:
+                params[key] = values[key][-1].decode("utf-8")
+        if body is not None and not isinstance(body, basestring):
+            data = self._error("unsupported",
+                               "Multipart requests are not supported")
+        else:
+            data = self.handle(params)
+        return (httplib2.Response({"status": "200",
+                                   "content-type":
+                                       "application/json; charset=utf-8"}),
+                json.dumps(data))
+
+    def handle(self, params):
+        """Return the API result (a dict) for the request parameters"""
+        self.lock.acquire()
+        try:
+            self.requests += 1
+            action = params.get("action", "")
+            handler = getattr(self, "_action_" + action, None)
+            if handler is None:
+                return self._error("unknown_action",
+                                   "Unrecognized value for parameter "
+                                   "'action': %s" % action)
+            return handler(params)
+        finally:
+            self.lock.release()
+
+    def _error(self, code, info):
+        pywikibot.debug(u"FakeAPI error %s: %s" % (code, info), _logger)
+        return {"error": {"code": code, "info": info}}
+
+    def _limit(self, params, key, default=10):
+        value = params.get(key, str(default))
+        if value == "max":
+            return self.maxlimit
+        return min(int(value), self.maxlimit)
+
+    # actions
+
+    def _action_login(self, params):
+        self.username = params.get("lgname")
+        return {"login": {"result": "Success", "lguserid": 1,
+                          "lgusername": self.username,
+                          "lgtoken": "fake", "cookieprefix": "fakewiki",
+                          "sessionid": "fake"}}
+
+    def _action_logout(self, params):
+        self.username = None
+        return {}
+
+    def _action_paraminfo(self, params):
+        result = []
+        for name in params.get("querymodules", "").split("|"):
+            if name not in self.modules:
+                result.append({"name": name, "missing": ""})
+                continue
+            prefix, limit = self.modules[name]
+            parameters = [{"name": "namespace"}]
+            if limit:
+                parameters.append({"name": "limit", "max": self.maxlimit,
+                                   "highmax": self.maxlimit})
+            result.append({"name": name, "prefix": prefix,
+                           "parameters": parameters})
+        return {"paraminfo": {"querymodules": result}}
+
+    def _action_query(self, params):
+        result = {}
+        data = {"query": result}
+        cont = {}
+        for name in params.get("meta", "").split("|"):
+            if name == "siteinfo":
+                result.update(self._siteinfo(params))
+            elif name == "userinfo":
+                result["userinfo"] = self._userinfo()
+        for name in params.get("list", "").split("|"):
+            if name == "allpages":
+                pages, next = self._allpages(params, "ap")
+                result["allpages"] = [dict((key, page[key])
+                                           for key in ("pageid", "ns",
+                                                       "title"))
+                                      for page in pages]
+                if next is not None:
+                    cont["allpages"] = {"apfrom": next}
+            elif name:
+                return self._error("unknown_list", "Unrecognized value for "
+                                   "parameter 'list': %s" % name)
+        pages = None
+        if params.get("generator") == "templates":
+            # pages have no templates here
+            pages = []
+        elif "generator" in params:
+            if params["generator"] != "allpages":
+                return self._error("unknown_generator", "Unrecognized value "
+                                   "for parameter 'generator': %s"
+                                   % params["generator"])
+            pages, next = self._allpages(params, "gap")
+            if next is not None:
+                cont["allpages"] = {"gapfrom": next}
+        elif "titles" in params:
+            pages = []
+            normalized = []
+            for title in params["titles"].split("|"):
+                ns, name = self.normalize(title)
+                if name != title:
+                    normalized.append({"from": title, "to": name})
+                pages.append(self.pages.get(name)
+                             or {"ns": ns, "title": name})
+            if normalized:
+                result["normalized"] = normalized
+        elif "pageids" in params:
+            byid = dict((page["pageid"], page)
+                        for page in self.pages.itervalues())
+            pages = [byid[int(pageid)]
+                     for pageid in params["pageids"].split("|")
+                     if int(pageid) in byid]
+        elif "revids" in params:
+            pages = []
+            for revid in params["revids"].split("|"):
+                if int(revid) in self.revisions:
+                    page, revision = self.revisions[int(revid)]
+                    if page not in pages:
+                        pages.append(page)
+        if pages is not None:
+            result["pages"] = self._pages(pages, params, cont)
+        if cont:
+            data["query-continue"] = cont
+        return data
+
+    def _action_edit(self, params):
+        if params.get("token") != self.edittoken:
+            return self._error("badtoken", "Invalid token")
+        if "text" not in params:
+            return self._error("notext", "The text parameter must be set")
+        ns, title = self.normalize(params.get("title", u""))
+        page = self.pages.get(title)
+        if page is None and "nocreate" in params:
+            return self._error("missingtitle",
+                               "The page you specified doesn't exist")
+        if page is not None and "createonly" in params:
+            return self._error("articleexists",
+                               "The article you tried to create has been "
+                               "created already")
+        if page is not None:
+            latest = page["revisions"][-1]
+            if params.get("basetimestamp", latest["timestamp"]) \
+                    != latest["timestamp"]:
+                return self._error("editconflict", "Edit conflict detected")
+            if latest["*"] == params["text"]:
+                return {"edit": {"result": "Success",
+                                 "pageid": page["pageid"], "title": title,
+                                 "nochange": ""}}
+            oldrevid = latest["revid"]
+        else:
+            oldrevid = 0
+        revid = self.add_page(title, params["text"],
+                              user=self.username or u"127.0.0.1",
+                              comment=params.get("summary", u""))
+        page, revision = self.revisions[revid]
+        return {"edit": {"result": "Success", "pageid": page["pageid"],
+                         "title": title, "oldrevid": oldrevid,
+                         "newrevid": revid,
+                         "newtimestamp": revision["timestamp"]}}
+
+    # query parts
+
+    def _siteinfo(self, params):
+        props = params.get("siprop", "general").split("|")
+        result = {}
+        if "general" in props:
+            result["general"] = {
+                "mainpage": u"Main Page",
+                "base": u"http://%s.example.org/wiki/Main_Page" % self.lang,
+                "sitename": self.sitename,
+                "generator": u"MediaWiki 1.17",
+                "case": u"first-letter",
+                "lang": self.lang,
+                "wikiid": u"%swiki" % self.lang,
+                "articlepath": u"/wiki/$1",
+            }
+        if "namespaces" in props:
+            result["namespaces"] = dict(
+                (str(num), {"id": num, "case": u"first-letter", "*": name})
+                for num, name in self.namespaces.iteritems())
+        if "namespacealiases" in props:
+            result["namespacealiases"] = []
+        return result
+
+    def _userinfo(self):
+        rights = ["read", "edit", "createpage", "writeapi"]
+        if self.username is None:
+            return {"id": 0, "name": u"127.0.0.1", "anon": "",
+                    "groups": ["*"], "rights": rights}
+        return {"id": 1, "name": self.username,
+                "groups": ["*", "user"], "rights": rights}
+
+    def _allpages(self, params, prefix):
+        """Return the pages for a list=allpages query, and the next start"""
+        ns = int(params.get(prefix + "namespace", 0))
+        start = params.get(prefix + "from", u"")
+        limit = self._limit(params, prefix + "limit")
+        names = []
+        for page in self.pages.itervalues():
+            if page["ns"] == ns:
+                name = page["title"]
+                if ns:
+                    name = name.split(u":", 1)[1]
+                if name >= start:
+                    names.append((name, page))
+        names.sort()
+        next = None
+        if len(names) > limit:
+            next = names[limit][0]
+        return [page for name, page in names[:limit]], next
+
+    def _pages(self, pages, params, cont):
+        """Return the "pages" element for the given pages"""
+        props = params.get("prop", "").split("|")
+        result = {}
+        missing = 0
+        for page in pages:
+            if "pageid" not in page:
+                missing -= 1
+                result[str(missing)] = {"ns": page["ns"],
+                                        "title": page["title"],
+                                        "missing": ""}
+                continue
+            latest = page["revisions"][-1]
+            entry = {"pageid": page["pageid"], "ns": page["ns"],
+                     "title": page["title"]}
+            if "info" in props:
+                entry.update(touched=latest["timestamp"],
+                             lastrevid=latest["revid"],
+                             length=len(latest["*"]))
+                if "edit" in params.get("intoken", "").split("|"):
+                    entry["edittoken"] = self.edittoken
+                if "protection" in params.get("inprop", "").split("|"):
+                    entry["protection"] = []
+            if "revisions" in props:
+                entry["revisions"] = self._revisions(page, params, cont)
+            result[str(page["pageid"])] = entry
+        return result
+
+    def _revisions(self, page, params, cont):
+        """Return the revisions of page requested by a prop=revisions query"""
+        props = params.get("rvprop", "ids|timestamp|flags|comment|user")
+        props = props.split("|")
+        if "revids" in params:
+            wanted = set(int(revid) for revid in params["revids"].split("|"))
+            revisions = [rev for rev in page["revisions"]
+                         if rev["revid"] in wanted]
+        elif "rvlimit" in params:
+            revisions = page["revisions"][::-1]
+            if "rvstartid" in params:
+                startid = int(params["rvstartid"])
+                revisions = [rev for rev in revisions
+                             if rev["revid"] <= startid]
+            limit = self._limit(params, "rvlimit")
+            if len(revisions) > limit:
+                cont["revisions"] = {"rvstartid":
+                                         revisions[limit]["revid"]}
+                revisions = revisions[:limit]
+        else:
+            revisions = page["revisions"][-1:]
+        result = []
+        for revision in revisions:
+            item = {"revid": revision["revid"]}
+            for key in ("timestamp", "user", "comment"):
+                if key in props:
+                    item[key] = revision[key]
+            if "content" in props:
+                item["*"] = revision["*"]
+            result.append(item)
+        return result
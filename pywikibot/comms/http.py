@@ -21,7 +21,6 @@ This module is responsible for
 __version__ = '$Id$'
 __docformat__ = 'epytext'
 
-import Queue
 import urllib
 import urlparse
 import logging
@@ -32,6 +31,7 @@ from pywikibot.exceptions import Server504Error
 import pywikibot
 import cookielib
 import threadedhttp
+import transport
 
 _logger = "comm.http"
 
@@ -39,11 +39,12 @@ _logger = "comm.http"
 # global variables
 
 useragent = 'Pywikipediabot/2.0' # This should include some global version string
-numthreads = 1
+numthreads = max(1, config.max_http_threads)
 threads = []
 
-connection_pool = threadedhttp.ConnectionPool()
-http_queue = Queue.Queue()
+connection_pool = threadedhttp.ConnectionPool(
+                      maxnum=max(5, config.max_host_connections))
+http_queue = threadedhttp.RequestQueue(config.max_host_connections or None)
 
 cookie_jar = threadedhttp.LockableCookieJar(
                  config.datafilepath("pywikibot.lwp"))
@@ -58,7 +59,9 @@ else:
 # Build up HttpProcessors
 pywikibot.log('Starting %(numthreads)i threads...' % locals())
 for i in range(numthreads):
-    proc = threadedhttp.HttpProcessor(http_queue, cookie_jar, connection_pool)
+    proc = threadedhttp.HttpProcessor(http_queue, cookie_jar, connection_pool,
+                                      transport.create(cookie_jar,
+                                                       connection_pool))
     proc.setDaemon(True)
     threads.append(proc)
     proc.start()
@@ -85,8 +88,26 @@ def request(site, uri, ssl=False, *args, **kwargs):
     @param site: The Site to connect to
     @param uri: the URI to retrieve (relative to the site's scriptpath)
     @param ssl: Use https connection
+    @param priority: (optional) Queue priority of the request, see
+        L{threadedhttp.HttpRequest}
     @return: The received data (a unicode string).
 
+    """
+    request = request_async(site, uri, ssl, *args, **kwargs)
+    return get_response(site, request)
+
+
+def request_async(site, uri, ssl=False, *args, **kwargs):
+    """Queue a request to be submitted to Site without waiting for it.
+
+    Parameters are the same as for L{request}.
+
+    @param callback: (optional) function to call with the
+        L{threadedhttp.HttpRequest} object as soon as the response is
+        available; it is called from the HTTP processor thread.
+    @return: The queued L{threadedhttp.HttpRequest}; pass it to
+        L{get_response} to retrieve the data.
+
     """
     if ssl:
         proto = "https"
@@ -102,6 +123,19 @@ def request(site, uri, ssl=False, *args, **kwargs):
     kwargs["headers"].setdefault("user-agent", useragent)
     request = threadedhttp.HttpRequest(baseuri, *args, **kwargs)
     http_queue.put(request)
+    return request
+
+
+def get_response(site, request):
+    """Wait for a request queued by L{request_async} and return its data.
+
+    This must be called only once per request.
+
+    @param site: The Site the request was sent to
+    @param request: The object returned by L{request_async}
+    @return: The received data (a unicode string).
+
+    """
     request.lock.acquire()
 
     #TODO: do some error correcting stuff
@@ -21,12 +21,14 @@ __version__ = '$Id$'
 __docformat__ = 'epytext'
 
 # standard python libraries
+import heapq
 import re
 import threading
 import time
 import logging
 
 import urllib
+import urlparse
 import cookielib
 import sys
 
@@ -35,6 +37,12 @@ from pywikibot import config
 
 _logger = "comm.threadedhttp"
 
+# Request priorities; lower values are served first.  Writes and logins
+# use HIGH_PRIORITY so that they are never stuck behind bulk reads.
+HIGH_PRIORITY = 0
+NORMAL_PRIORITY = 10
+LOW_PRIORITY = 20
+
 
 # easy_install safeguarded dependencies
 try:
@@ -48,6 +56,38 @@ except ImportError:
             u"Error: You need the python module setuptools to use this module")
         sys.exit(1)
 
+
+def _rewind(body):
+    """Go back to the start of a file-like request body."""
+    if hasattr(body, "seek"):
+        body.seek(0)
+
+
+class HTTPConnection(httplib2.HTTPConnectionWithTimeout):
+    """A connection that rewinds file-like bodies before sending them.
+
+    httplib2 sends a request again when the server has closed the
+    keep-alive connection; the body must then be read from the start.
+
+    """
+    def request(self, method, url, body=None, headers={}):
+        _rewind(body)
+        httplib2.HTTPConnectionWithTimeout.request(self, method, url, body,
+                                                   headers)
+
+
+class HTTPSConnection(httplib2.HTTPSConnectionWithTimeout):
+    """A connection that rewinds file-like bodies before sending them."""
+
+    def request(self, method, url, body=None, headers={}):
+        _rewind(body)
+        httplib2.HTTPSConnectionWithTimeout.request(self, method, url, body,
+                                                    headers)
+
+
+CONNECTION_TYPES = {"http": HTTPConnection, "https": HTTPSConnection}
+
+
 class ConnectionPool(object):
     """A thread-safe connection pool."""
 
@@ -200,6 +240,8 @@ class Http(httplib2.Http):
         (scheme, authority, request_uri, defrag_uri) = httplib2.urlnorm(
                                                         httplib2.iri2uri(uri))
         conn_key = scheme+":"+authority
+        if connection_type is None:
+            connection_type = CONNECTION_TYPES.get(scheme)
 
         connection = self.connection_pool.pop_connection(conn_key)
         if connection is not None:
@@ -208,11 +250,15 @@ class Http(httplib2.Http):
         # Redirect hack: we want to regulate redirects
         follow_redirects = self.follow_redirects
         self.follow_redirects = False
-        pywikibot.debug(u"%r" % (
-                            (uri.replace("%7C","|"), method, body,
-                            headers, max_redirects,
-                            connection_type),),
-                        _logger)
+        if pywikibot.debugging(_logger):
+            logbody = body
+            if isinstance(logbody, basestring):
+                logbody = pywikibot.truncated(logbody)
+            pywikibot.debug(u"%r" % (
+                                (uri.replace("%7C","|"), method, logbody,
+                                headers, max_redirects,
+                                connection_type),),
+                            _logger)
         try:
             (response, content) = httplib2.Http.request(
                                     self, uri, method, body, headers,
@@ -309,28 +355,147 @@ class HttpRequest(object):
 
     """
     def __init__(self, *args, **kwargs):
-        """See C{Http.request} for parameters."""
+        """See C{Http.request} for parameters.
+
+        @param priority: (optional) The queue priority of this request;
+               one of HIGH_PRIORITY, NORMAL_PRIORITY (default) or
+               LOW_PRIORITY.
+        @param callback: (optional) Function to call with this object as
+               argument once the data is available.
+
+        """
+        self.priority = kwargs.pop('priority', NORMAL_PRIORITY)
+        self.callback = kwargs.pop('callback', None)
         self.args = args
         self.kwargs = kwargs
         self.data = None
         self.lock = threading.Semaphore(0)
 
+    def host(self):
+        """Return the network location this request is sent to."""
+        if self.args:
+            uri = self.args[0]
+        else:
+            uri = self.kwargs.get('uri', '')
+        return urlparse.urlparse(uri)[1].lower()
+
+
+class RequestQueue(object):
+    """Thread-safe priority queue of L{HttpRequest} objects.
+
+    Requests are handed out in order of priority (and, within the same
+    priority, in order of arrival), but a request is held back while
+    C{host_limit} requests to the same host are already being processed.
+    This way a pool of L{HttpProcessor} threads can work on many hosts at
+    once without opening more than C{host_limit} simultaneous connections
+    to any single one of them.
+
+    Consumers must call L{release} once they have finished processing an
+    item returned by L{get}.
+
+    A C{None} item (used to shut down a processor thread) is only returned
+    once no other requests are pending.
+
+    """
+    def __init__(self, host_limit=None):
+        """
+        @param host_limit: Maximum number of requests per host that may be
+               processed simultaneously, or None for no limit.
+
+        """
+        self.host_limit = host_limit
+        self.cond = threading.Condition(threading.Lock())
+        self.pending = {}   # host -> heap of (priority, sequence, request)
+        self.active = {}    # host -> number of requests being processed
+        self.stops = 0      # number of pending None items
+        self.sequence = 0
+
+    def put(self, item):
+        """Add an L{HttpRequest} (or None) to the queue."""
+        self.cond.acquire()
+        try:
+            if item is None:
+                self.stops += 1
+            else:
+                self.sequence += 1
+                heapq.heappush(self.pending.setdefault(item.host(), []),
+                               (item.priority, self.sequence, item))
+            self.cond.notify()
+        finally:
+            self.cond.release()
+
+    def get(self):
+        """Remove and return the next request that may be processed.
+
+        Blocks until such a request is available.
+
+        """
+        self.cond.acquire()
+        try:
+            while True:
+                best = None
+                for host, heap in self.pending.iteritems():
+                    if self.host_limit is not None \
+                            and self.active.get(host, 0) >= self.host_limit:
+                        continue
+                    if best is None or heap[0] < self.pending[best][0]:
+                        best = host
+                if best is not None:
+                    heap = self.pending[best]
+                    item = heapq.heappop(heap)[2]
+                    if not heap:
+                        del self.pending[best]
+                    self.active[best] = self.active.get(best, 0) + 1
+                    return item
+                if self.stops and not self.pending:
+                    self.stops -= 1
+                    return None
+                self.cond.wait()
+        finally:
+            self.cond.release()
+
+    def release(self, item):
+        """Mark a request returned by L{get} as finished."""
+        host = item.host()
+        self.cond.acquire()
+        try:
+            self.active[host] -= 1
+            if not self.active[host]:
+                del self.active[host]
+            # waiting threads may be interested in different hosts
+            self.cond.notifyAll()
+        finally:
+            self.cond.release()
+
+    def qsize(self):
+        """Return the number of requests waiting to be processed."""
+        self.cond.acquire()
+        try:
+            return sum(len(heap) for heap in self.pending.itervalues())
+        finally:
+            self.cond.release()
+
 
 class HttpProcessor(threading.Thread):
     """Thread object to spawn multiple HTTP connection threads."""
-    def __init__(self, queue, cookiejar, connection_pool):
+    def __init__(self, queue, cookiejar, connection_pool, http=None):
         """
-        @param queue: The C{Queue.Queue} object that contains L{HttpRequest}
+        @param queue: The L{RequestQueue} object that contains L{HttpRequest}
                objects.
         @param cookiejar: The C{LockableCookieJar} cookie object to share among
                requests.
         @param connection_pool: The C{ConnectionPool} object which contains
                connections to share among requests.
+        @param http: (optional) The object that carries out the requests;
+               it must have the request() method of L{Http}. By default,
+               a new Http object is used.
 
         """
         threading.Thread.__init__(self)
         self.queue = queue
-        self.http = Http(cookiejar=cookiejar, connection_pool=connection_pool)
+        if http is None:
+            http = Http(cookiejar=cookiejar, connection_pool=connection_pool)
+        self.http = http
 
     def run(self):
         # The Queue item is expected to either an HttpRequest object
@@ -344,8 +509,15 @@ class HttpProcessor(threading.Thread):
             try:
                 item.data = self.http.request(*item.args, **item.kwargs)
             finally:
+                self.queue.release(item)
                 if item.lock:
                     item.lock.release()
+                if item.callback:
+                    try:
+                        item.callback(item)
+                    except Exception:
+                        pywikibot.error(u"Exception in request callback:",
+                                        exc_info=True)
 
 
 # Metaweb Technologies, Inc. License:
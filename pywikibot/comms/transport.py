@@ -0,0 +1,263 @@
+# -*- coding: utf-8  -*-
+"""
+Exchangeable transports for the HTTP threads.
+
+Each L{threadedhttp.HttpProcessor} hands its requests to an object with
+the request() method of L{threadedhttp.Http}.  Normally this is an Http
+object that talks to the wiki, but for offline tests and reproducible
+benchmarks config.http_transport can select another one:
+
+    - 'record': talk to the wiki, and save every response to the
+      cassette file config.http_cassette when the bot exits
+    - 'replay': answer requests from the responses in the cassette file,
+      in the order they were recorded
+    - 'fake': answer requests from a L{fakeapi.FakeAPI}
+
+The 'replay' and 'fake' transports wait config.http_latency seconds
+before each answer, to imitate the network.  A request that the cassette
+has no response for raises L{pywikibot.FatalServerError}, which is not
+retried.  The on-disk site metadata cache is only used with the 'http'
+transport, so a cassette always contains the siteinfo and paraminfo
+requests the bot makes.
+
+"""
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+__docformat__ = 'epytext'
+
+import atexit
+import base64
+import re
+import threading
+import time
+import urllib
+try:
+    import json
+except ImportError:
+    import simplejson as json
+from hashlib import sha1
+
+import pywikibot
+from pywikibot import config
+from pywikibot.comms import threadedhttp
+from pywikibot.comms.threadedhttp import httplib2
+
+_logger = "comm.transport"
+
+# objects shared by the transports of all threads, created on first use
+_cassette = None
+_fakeapi = None
+
+
+class Cassette(object):
+    """HTTP responses recorded in a JSON file.
+
+    A request is identified by its method, URI and a hash of its body, so
+    that passwords are not written to the file.  Bodies that are not
+    strings (such as file uploads) are not hashed.  Identical requests are
+    answered with their responses in the order in which they were
+    recorded.
+
+    Session cookies and tokens are scrubbed: Set-Cookie headers are not
+    recorded, and the value of every JSON key ending in 'token' (and of
+    'sessionid') is replaced by a placeholder.  The same replacement is
+    applied to the URIs and bodies of later requests before they are
+    identified, so that the requests a bot sends with the placeholders
+    during the replay match the ones it sent with the real tokens.  Other
+    content is stored verbatim, including anything the wiki shows only to
+    the logged-in user, so a cassette should not be published unless it
+    was recorded with an account that can be disclosed.
+
+    """
+    _secret = re.compile(r'"(\w*token|sessionid)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.interactions = []
+        self.pending = {}
+        # the (secret, placeholder) pairs seen while recording
+        self.secrets = []
+        self.lock = threading.Lock()
+
+    def _placeholder(self, match):
+        value = json.loads(u'"%s"' % match.group(2))
+        if value in (u"", u"+\\"):
+            # the token of anonymous users
+            return match.group(0)
+        for secret, placeholder in self.secrets:
+            if secret == value:
+                break
+        else:
+            placeholder = u"scrubbed%d" % len(self.secrets)
+            # MediaWiki tokens end with this suffix
+            if value.endswith(u"+\\"):
+                placeholder += u"+\\"
+            self.secrets.append((value, placeholder))
+        return u'"%s": %s' % (match.group(1), json.dumps(placeholder))
+
+    def scrub(self, text):
+        """Replace the known secrets in a URI or request body."""
+        for secret, placeholder in self.secrets:
+            secret = secret.encode("utf-8")
+            placeholder = placeholder.encode("utf-8")
+            text = text.replace(urllib.quote_plus(secret),
+                                urllib.quote_plus(placeholder))
+            text = text.replace(urllib.quote(secret),
+                                urllib.quote(placeholder))
+            text = text.replace(secret, placeholder)
+        return text
+
+    def key(self, uri, method, body):
+        if not isinstance(body, basestring):
+            body = repr(type(body))
+        elif isinstance(body, unicode):
+            body = body.encode("utf-8")
+        if isinstance(uri, unicode):
+            uri = uri.encode("utf-8")
+        return method, self.scrub(uri), sha1(self.scrub(body)).hexdigest()
+
+    def load(self):
+        """Read the recorded responses from the file"""
+        f = open(self.filename, "rb")
+        try:
+            self.interactions = json.load(f)["interactions"]
+        finally:
+            f.close()
+        self.pending = {}
+        for item in self.interactions:
+            key = (item["method"], item["uri"], item["body"])
+            self.pending.setdefault(key, []).append(item)
+        for responses in self.pending.itervalues():
+            responses.reverse()
+
+    def save(self):
+        """Write the recorded responses to the file"""
+        self.lock.acquire()
+        try:
+            f = open(self.filename, "wb")
+            try:
+                json.dump({"interactions": self.interactions}, f, indent=1)
+            finally:
+                f.close()
+        finally:
+            self.lock.release()
+        pywikibot.log(u"Saved %i HTTP responses to %s"
+                        % (len(self.interactions), self.filename))
+
+    def add(self, uri, method, body, response, content):
+        """Record the response to a request"""
+        headers = dict((name, value) for name, value in response.iteritems()
+                       if name.lower() != "set-cookie")
+        self.lock.acquire()
+        try:
+            method, uri, bodyhash = self.key(uri, method, body)
+            try:
+                content = self._secret.sub(self._placeholder,
+                                           content.decode("utf-8"))
+                encoding = None
+            except UnicodeError:
+                content = base64.b64encode(content)
+                encoding = "base64"
+            self.interactions.append({"method": method, "uri": uri,
+                                      "body": bodyhash, "headers": headers,
+                                      "content": content,
+                                      "encoding": encoding})
+        finally:
+            self.lock.release()
+
+    def next(self, uri, method, body):
+        """Return the next recorded (response, content) for a request.
+
+        @return: (response, content) tuple, or None if there is no
+            recorded response left
+
+        """
+        self.lock.acquire()
+        try:
+            responses = self.pending.get(self.key(uri, method, body))
+            if not responses:
+                return None
+            item = responses.pop()
+        finally:
+            self.lock.release()
+        if item["encoding"] == "base64":
+            content = base64.b64decode(item["content"])
+        else:
+            content = item["content"].encode("utf-8")
+        return httplib2.Response(item["headers"]), content
+
+
+class RecordingTransport(object):
+    """Send requests to the wiki and record the responses in a Cassette"""
+
+    def __init__(self, http, cassette):
+        self.http = http
+        self.cassette = cassette
+
+    def request(self, uri, method="GET", body=None, headers=None,
+                max_redirects=None, connection_type=None):
+        result = self.http.request(uri, method, body, headers,
+                                   max_redirects, connection_type)
+        if not isinstance(result, Exception):
+            self.cassette.add(uri, method, body, *result)
+        return result
+
+
+class ReplayTransport(object):
+    """Answer requests with the responses recorded in a Cassette"""
+
+    def __init__(self, cassette, latency=0):
+        self.cassette = cassette
+        self.latency = latency
+
+    def request(self, uri, method="GET", body=None, headers=None,
+                max_redirects=None, connection_type=None):
+        if self.latency:
+            time.sleep(self.latency)
+        result = self.cassette.next(uri, method, body)
+        if result is None:
+            # returned like the exceptions of threadedhttp.Http.request
+            return pywikibot.FatalServerError(
+                u"No recorded response for %s %s" % (method, uri))
+        return result
+
+
+def _get_cassette(load):
+    global _cassette
+    if _cassette is None:
+        filename = config.datafilepath(config.http_cassette)
+        _cassette = Cassette(filename)
+        if load:
+            _cassette.load()
+        else:
+            atexit.register(_cassette.save)
+    return _cassette
+
+
+def create(cookiejar, connection_pool):
+    """Return the object an HTTP thread uses to carry out its requests.
+
+    @param cookiejar: The C{LockableCookieJar} to share among requests
+    @param connection_pool: The C{ConnectionPool} to share among requests
+
+    """
+    global _fakeapi
+    name = config.http_transport
+    if name == "replay":
+        return ReplayTransport(_get_cassette(True), config.http_latency)
+    if name == "fake":
+        if _fakeapi is None:
+            from pywikibot.comms.fakeapi import FakeAPI
+            _fakeapi = FakeAPI(latency=config.http_latency)
+        return _fakeapi
+    http = threadedhttp.Http(cookiejar=cookiejar,
+                             connection_pool=connection_pool)
+    if name == "record":
+        return RecordingTransport(http, _get_cassette(False))
+    if name != "http":
+        raise ValueError("Unknown http_transport %r" % name)
+    return http
@@ -251,6 +251,9 @@ verbose_output = 0
 # if True, include a lot of debugging info in logfile
 # (overrides log setting above)
 debug_log = []
+# Maximum number of characters of a request or response body written to
+# the debug log; longer bodies are truncated. Set to 0 to log them whole.
+debug_log_limit = 2000
 
 ############## INTERWIKI SETTINGS ##############
 
@@ -316,6 +319,11 @@ sort_ignore_case = False
 # Commons by default.
 upload_to_commons = False
 
+# Files larger than this number of bytes are uploaded in chunks of this size,
+# if the wiki supports chunked uploads (MediaWiki 1.19 or later).  Set it to
+# 0 to always upload files in a single request.
+upload_chunk_size = 5 * 1024 * 1024
+
 ############## SETTINGS TO AVOID SERVER OVERLOAD ##############
 
 # Slow down the robot such that it never requests a second page within
@@ -457,6 +465,44 @@ persistent_http = False
 # Default socket timeout. Set to None to disable timeouts.
 socket_timeout = 120  # set a pretty long timeout just in case...
 
+# Number of threads used to submit HTTP requests. Requests to different
+# hosts are processed in parallel, so bots working on many wikis at once
+# (such as interwiki.py) benefit from a larger number.
+max_http_threads = 4
+
+# Maximum number of simultaneous HTTP requests to a single host. Please be
+# considerate towards the server operators before increasing this. Set to 0
+# to disable the limit.
+max_host_connections = 1
+
+# How HTTP requests are carried out. Besides 'http' (talk to the wiki), this
+# can be set for offline tests and reproducible benchmarks to:
+#  'record' - talk to the wiki and save the responses to http_cassette
+#  'replay' - answer requests with the responses saved in http_cassette
+#  'fake'   - answer requests from a small in-process imitation of api.php
+http_transport = 'http'
+
+# File (in the bot's data directory) used by the 'record' and 'replay'
+# HTTP transports.
+http_cassette = 'http-cassette.json'
+
+# Seconds the 'replay' and 'fake' HTTP transports wait before each answer,
+# to imitate network latency.
+http_latency = 0
+
+# Site metadata (siteinfo and API parameter information) is cached on disk
+# so that new bot processes need not retrieve it again. Cached data is
+# retrieved again after this many hours; the API parameter information is
+# also discarded if the siteinfo then shows a new MediaWiki version. After
+# an upgrade of the wiki, the old data may thus be used for up to this many
+# hours. Set to 0 to disable the cache.
+metadata_cache_expiry = 24
+
+# If True, the TranslateWiki messages of the scripts are stored in compact
+# files in the 'i18ncache' subdirectory of the data directory, so that only
+# the languages actually used need to be loaded.
+i18n_cache = False
+
 
 ############## FURTHER SETTINGS ##############
 # The bot can make some additional changes to each page it edits, e.g. fix
@@ -492,6 +538,26 @@ proxy = None
 # processing. As higher this value this effect will decrease.
 max_queue_size = 64
 
+# Number of groups of pages that the PreloadingGenerator retrieves in
+# advance, while the bot is working on the current group. Each group holds
+# up to 50 pages. The source generator is then run in a background thread,
+# so exceptions raised by it (including KeyboardInterrupt) are only seen
+# when the bot reaches the affected page, and the generator must not rely
+# on running in the main thread. 0 retrieves each group only when needed.
+preload_lookahead = 0
+
+# Number of worker processes used to search XML dumps (e.g. replace.py -xml).
+# Set to 0 to use one process per CPU, or to 1 to search in the bot process
+# itself.
+xml_dump_processes = 0
+
+# Before saving a page that was loaded earlier, check with a prop=info query
+# that its latest revision has not changed, and raise an EditConflict if it
+# has.  The server only compares the timestamp of the loaded revision, to the
+# second, and cannot detect that a missing page was created in the meantime.
+# Set to False to save this request on each edit.
+edit_check_lastrevid = True
+
 # End of configuration section
 # ============================
 
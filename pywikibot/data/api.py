@@ -17,8 +17,12 @@ except ImportError:
     import simplejson as json
 import logging
 import mimetypes
+import os
 import pprint
+import Queue
+import random
 import re
+import threading
 import traceback
 import time
 import urllib
@@ -34,6 +38,126 @@ lagpattern = re.compile(r"Waiting for [\d.]+: (?P<lag>\d+) seconds? lagged")
 
 _modules = {} # cache for retrieved API parameter information
 
+class MultipartBody(object):
+    """The body of a "multipart/form-data" request, as a file-like object.
+
+    The body is made of form fields and of parts of local files.  Files are
+    only read when the body is sent, in blocks of blocksize bytes, so that
+    large uploads do not need to be held in memory.  The body can be
+    rewound with seek(0) and sent again.
+
+    """
+    blocksize = 65536
+
+    def __init__(self, digest=None):
+        """
+        @param digest: (optional) a hashlib object; the file parts are added
+            to a copy of it as they are read, which is available as the
+            digest attribute
+
+        """
+        self.boundary = "%032x" % random.getrandbits(128)
+        # the sequence of byte strings and (filename, offset, length) tuples
+        # that make up the body
+        self._segments = []
+        self._length = 0
+        # the current segment, and the position in it if it is a string
+        self._current = 0
+        self._pos = 0
+        self._file = None
+        self._digest = digest
+        self.digest = digest and digest.copy()
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return "<%s of %d bytes>" % (self.__class__.__name__, self._length)
+
+    def _add(self, data):
+        self._segments.append(data)
+        self._length += len(data)
+
+    def _header(self, disposition, mimetype):
+        self._add("--%s\r\nContent-Type: %s\r\n"
+                  "Content-Disposition: form-data; %s\r\n\r\n"
+                  % (self.boundary, mimetype, disposition))
+
+    def add_field(self, name, value, mimetype="text/plain"):
+        """Add a form field; value must be a byte string."""
+        self._header('name="%s"' % name, mimetype)
+        self._add(value + "\r\n")
+
+    def add_file(self, name, filename, mimetype, offset=0, length=None):
+        """Add length bytes of a local file, starting at offset."""
+        if length is None:
+            length = os.path.getsize(filename) - offset
+        basename = os.path.basename(filename)
+        if isinstance(basename, unicode):
+            basename = basename.encode("utf-8")
+        self._header('name="%s"; filename="%s"' % (name, basename), mimetype)
+        self._segments.append((filename, offset, length))
+        self._length += length
+        self._add("\r\n")
+
+    def close(self):
+        """Add the closing boundary; no parts may be added afterwards."""
+        self._add("--%s--\r\n" % self.boundary)
+
+    def seek(self, offset, whence=0):
+        """Go back to the start of the body; no other position is allowed.
+
+        The digest starts again from the one the body was created with.
+
+        """
+        if offset or whence:
+            raise IOError("%s can only be rewound"
+                          % self.__class__.__name__)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._current = 0
+        self._pos = 0
+        if self._digest is not None:
+            self.digest = self._digest.copy()
+
+    def read(self, size=None):
+        """Return the next block of the body, or "" at the end."""
+        if size is None or size < 0:
+            size = self.blocksize
+        while self._current < len(self._segments):
+            segment = self._segments[self._current]
+            if isinstance(segment, str):
+                data = segment[self._pos:self._pos + size]
+                self._pos += len(data)
+                if self._pos >= len(segment):
+                    self._current += 1
+                    self._pos = 0
+                if data:
+                    return data
+                continue
+            filename, offset, length = segment
+            if self._file is None:
+                if not length:
+                    self._current += 1
+                    continue
+                self._file = open(filename, "rb")
+                self._file.seek(offset)
+                self._left = length
+            data = self._file.read(min(size, self._left))
+            if not data:
+                raise IOError("File %s is shorter than expected" % filename)
+            self._left -= len(data)
+            if self.digest is not None:
+                self.digest.update(data)
+            if not self._left:
+                self._file.close()
+                self._file = None
+                self._current += 1
+            return data
+        return ""
+
+
 class APIError(pywikibot.Error):
     """The wiki site returned an error message."""
     def __init__(self, code, info, **kwargs):
@@ -74,8 +198,10 @@ class Request(object, DictMixin):
     details on what parameters are accepted for each request type.
 
     Uploading files is a special case: to upload, the parameter "mime" must
-    be true, and the parameter "file" must be set equal to a valid
-    filename on the local computer, _not_ to the content of the file.
+    be true, and the parameter "file" (or "chunk", for a chunked upload)
+    must be set equal to a valid filename on the local computer, _not_ to
+    the content of the file.  The file is read while the request is sent,
+    in blocks, so that it is never held in memory as a whole.
 
     Returns a dict containing the JSON data returned by the wiki. Normally,
     one of the dict keys will be equal to the value of the 'action'
@@ -104,11 +230,20 @@ class Request(object, DictMixin):
     @param site: The Site to which the request will be submitted. If not
            supplied, uses the user's configured default Site.
     @param mime: If true, send in "multipart/form-data" format (default False)
+    @param file_range: (optional) A tuple (offset, length); if given, only
+           this part of the uploaded file is sent
+    @param digest: (optional) A hashlib object; once the request has been
+           answered, the digest attribute holds a copy of it updated with
+           the part of the uploaded file that was sent
     @param max_retries: (optional) Maximum number of times to retry after
            errors, defaults to 25
     @param retry_wait: (optional) Minimum time to wait after an error,
            defaults to 5 seconds (doubles each retry until max of 120 is
            reached)
+    @param retry_timeouts: (optional) If False, raise Server504Error after
+           a server timeout instead of submitting the request again, so
+           that the caller can retry with a smaller request; defaults to
+           True
     @param format: (optional) Defaults to "json"
 
     """
@@ -118,9 +253,14 @@ class Request(object, DictMixin):
         except KeyError:
             self.site = pywikibot.Site()
         self.mime = kwargs.pop("mime", False)
+        self.file_range = kwargs.pop("file_range", None)
+        self.digest = kwargs.pop("digest", None)
         self.max_retries = kwargs.pop("max_retries", 25)
         self.retry_wait = kwargs.pop("retry_wait", 5)
+        self.retry_timeouts = kwargs.pop("retry_timeouts", True)
         self.params = {}
+        # length of the last response received, in bytes
+        self.response_size = 0
         if "action" not in kwargs:
             raise ValueError("'action' specification missing from Request.")
         self.update(**kwargs)
@@ -212,151 +352,187 @@ u"http_params: Key '%s' could not be encoded to '%s'; params=%r"
 
         """
         from pywikibot.comms import http
-        from email.mime.multipart import MIMEMultipart
-        from email.mime.nonmultipart import MIMENonMultipart
 
         paramstring = self.http_params()
         if self.site._loginstatus == -3:
             self.site.login(False)
         while True:
-            action = self.params.get("action", "")
             self.site.throttle(write=self.write)
-            uri = self.site.scriptpath() + "/api.php"
             try:
-                ssl = False
-                if self.site.family.name in config.available_ssl_project:
-                    if action == "login" and config.use_SSL_onlogin:
-                        ssl = True
-                    elif config.use_SSL_always:
-                        ssl = True
-                if self.mime:
-                    # construct a MIME message containing all API key/values
-                    container = MIMEMultipart(_subtype='form-data')
-                    for key in self.params:
-                        # key "file" requires special treatment in a multipart
-                        # message
-                        if key == "file":
-                            local_filename = self.params[key]
-                            filetype = mimetypes.guess_type(local_filename)[0] \
-                                       or 'application/octet-stream'
-                            file_content = file(local_filename, "rb").read()
-                            submsg = MIMENonMultipart(*filetype.split("/"))
-                            submsg.add_header("Content-disposition",
-                                              "form-data", name=key,
-                                              filename=local_filename)
-                            submsg.set_payload(file_content)
-                        else:
-                            try:
-                                self.params[key].encode("ascii")
-                                keytype = ("text", "plain")
-                            except UnicodeError:
-                                keytype = ("application", "octet-stream")
-                            submsg = MIMENonMultipart(*keytype)
-                            submsg.add_header("Content-disposition", "form-data",
-                                              name=key)
-                            submsg.set_payload(self.params[key])
-                        container.attach(submsg)
-                    # strip the headers to get the HTTP message body
-                    body = container.as_string()
-                    marker = "\n\n" # separates headers from body
-                    eoh = body.find(marker)
-                    body = body[ eoh + len(marker): ]
-                    # retrieve the headers from the MIME object
-                    mimehead = dict(container.items())
-                    rawdata = http.request(self.site, uri, ssl, method="POST",
-                                           headers=mimehead, body=body)
-                else:
-                    rawdata = http.request(self.site, uri, ssl, method="POST",
-                                headers={'Content-Type':
-                                         'application/x-www-form-urlencoded'},
-                                body=paramstring)
+                uri, ssl, kwargs = self._http_args(paramstring)
+                rawdata = http.request(self.site, uri, ssl, **kwargs)
             except Server504Error:
+                if not self.retry_timeouts:
+                    raise
                 pywikibot.log(u"Caught HTTP 504 error; retrying")
                 self.wait()
                 continue
+            except FatalServerError:
+                raise
             #TODO: what other exceptions can occur here?
             except Exception, e:
                 # for any other error on the http request, wait and retry
                 pywikibot.error(traceback.format_exc())
-                pywikibot.log(u"%s, %s" % (uri, paramstring))
+                pywikibot.log(u"%s, %s" % (self.site.scriptpath() + "/api.php",
+                                           paramstring))
                 self.wait()
                 continue
-            if not isinstance(rawdata, unicode):
-                rawdata = rawdata.decode(self.site.encoding())
-            pywikibot.debug(u"API response received:\n" + rawdata, _logger)
-            if rawdata.startswith(u"unknown_action"):
-                raise APIError(rawdata[:14], rawdata[16:])
-            try:
-                result = json.loads(rawdata)
-            except ValueError:
-                # if the result isn't valid JSON, there must be a server
-                # problem.  Wait a few seconds and try again
-                pywikibot.warning(
-"Non-JSON response received from server %s; the server may be down."
-                                 % self.site)
-                pywikibot.debug(rawdata, _logger)
-                self.wait()
-                continue
-            if not result:
-                result = {}
-            if type(result) is not dict:
-                raise APIError("Unknown",
-                               "Unable to process query response of type %s."
-                                   % type(result),
-                               {'data': result})
-            if self['action'] == 'query':
-                if 'userinfo' in result.get('query', ()):
-                    if hasattr(self.site, '_userinfo'):
-                        self.site._userinfo.update(result['query']['userinfo'])
-                    else:
-                        self.site._userinfo = result['query']['userinfo']
-                status = self.site._loginstatus # save previous login status
-                if ( ("error" in result
-                            and result["error"]["code"].endswith("limit"))
-                      or (status >= 0
-                            and self.site._userinfo['name']
-                                != self.site._username[status])):
-                    # user is no longer logged in (session expired?)
-                    # reset userinfo, then make user log in again
-                    del self.site._userinfo
-                    self.site._loginstatus = -1
-                    if status < 0:
-                        status = 0  # default to non-sysop login
-                    self.site.login(status)
-                    # retry the previous query
-                    continue
-            if "warnings" in result:
-                modules = [k for k in result["warnings"] if k != "info"]
-                for mod in modules:
-                    pywikibot.warning(
-                        u"API warning (%s): %s"
-                         % (mod, result["warnings"][mod]["*"]))
-            if "error" not in result:
+            result = self._handle_response(rawdata)
+            if result is not None:
+                if self.mime and self.digest is not None:
+                    # the file parts that were sent with the answered request
+                    self.digest = kwargs["body"].digest
                 return result
-            if "*" in result["error"]:
-                # help text returned
-                result['error']['help'] = result['error'].pop("*")
-            code = result["error"].pop("code", "Unknown")
-            info = result["error"].pop("info", None)
-            if code == "maxlag":
-                lag = lagpattern.search(info)
-                if lag:
-                    pywikibot.log(
-                        u"Pausing due to database lag: " + info)
-                    self.site.throttle.lag(int(lag.group("lag")))
-                    continue
-            if code in (u'internal_api_error_DBConnectionError', ):
-                self.wait()
-                continue
-            # raise error
-            try:
-                pywikibot.log(u"API Error: query=\n%s"
-                               % pprint.pformat(self.params))
-                pywikibot.log(u"           response=\n%s"
-                               % result)
-                raise APIError(code, info, **result["error"])
-            except TypeError:
-                raise RuntimeError(result)
+
+    def submit_async(self):
+        """Queue the query without waiting for the response.
+
+        Use this to have several queries (usually to different sites) in
+        flight at the same time.
+
+        @return: a L{RequestFuture} that delivers the data retrieved from
+            api.php
+
+        """
+        return RequestFuture(self)
+
+    def _http_args(self, paramstring):
+        """Return (uri, ssl, kwargs) to pass to L{http.request}."""
+        from pywikibot.comms import threadedhttp
+
+        action = self.params.get("action", "")
+        uri = self.site.scriptpath() + "/api.php"
+        ssl = False
+        if self.site.family.name in config.available_ssl_project:
+            if action == "login" and config.use_SSL_onlogin:
+                ssl = True
+            elif config.use_SSL_always:
+                ssl = True
+        if self.write or action == "login":
+            # don't let edits and logins wait behind bulk queries
+            priority = threadedhttp.HIGH_PRIORITY
+        else:
+            priority = threadedhttp.NORMAL_PRIORITY
+        if self.mime:
+            # construct a multipart message containing all API key/values
+            body = MultipartBody(self.digest)
+            for key in self.params:
+                # keys "file" and "chunk" name a local file, whose contents
+                # are sent
+                if key in ("file", "chunk"):
+                    local_filename = self.params[key]
+                    filetype = mimetypes.guess_type(local_filename)[0] \
+                               or 'application/octet-stream'
+                    offset, length = self.file_range or (0, None)
+                    body.add_file(key, local_filename, filetype,
+                                  offset, length)
+                else:
+                    try:
+                        self.params[key].encode("ascii")
+                        keytype = "text/plain"
+                    except UnicodeError:
+                        keytype = "application/octet-stream"
+                    body.add_field(key, self.params[key], keytype)
+            body.close()
+            headers = {'MIME-Version': '1.0',
+                       'Content-Type': 'multipart/form-data; boundary="%s"'
+                                       % body.boundary,
+                       'Content-Length': str(len(body))}
+        else:
+            headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+            body = paramstring
+        return uri, ssl, dict(method="POST", headers=headers, body=body,
+                              priority=priority)
+
+    def _handle_response(self, rawdata):
+        """Parse the raw data returned by the server.
+
+        @return: The data retrieved from api.php (a dict), or None if the
+            request has to be submitted again
+
+        """
+        self.response_size = len(rawdata)
+        if not isinstance(rawdata, unicode):
+            rawdata = rawdata.decode(self.site.encoding())
+        if pywikibot.debugging(_logger):
+            pywikibot.debug(u"API response received:\n"
+                            + pywikibot.truncated(rawdata), _logger)
+        if rawdata.startswith(u"unknown_action"):
+            raise APIError(rawdata[:14], rawdata[16:])
+        try:
+            result = json.loads(rawdata)
+        except ValueError:
+            # if the result isn't valid JSON, there must be a server
+            # problem.  Wait a few seconds and try again
+            pywikibot.warning(
+"Non-JSON response received from server %s; the server may be down."
+                             % self.site)
+            pywikibot.debug(pywikibot.truncated(rawdata), _logger)
+            self.wait()
+            return None
+        if not result:
+            result = {}
+        if type(result) is not dict:
+            raise APIError("Unknown",
+                           "Unable to process query response of type %s."
+                               % type(result),
+                           {'data': result})
+        if self['action'] == 'query':
+            if 'userinfo' in result.get('query', ()):
+                if hasattr(self.site, '_userinfo'):
+                    self.site._userinfo.update(result['query']['userinfo'])
+                else:
+                    self.site._userinfo = result['query']['userinfo']
+            status = self.site._loginstatus # save previous login status
+            if ( ("error" in result
+                        and result["error"]["code"].endswith("limit"))
+                  or (status >= 0
+                        and self.site._userinfo['name']
+                            != self.site._username[status])):
+                # user is no longer logged in (session expired?)
+                # reset userinfo, then make user log in again
+                del self.site._userinfo
+                self.site._loginstatus = -1
+                if status < 0:
+                    status = 0  # default to non-sysop login
+                self.site.login(status)
+                # retry the previous query
+                return None
+        if "warnings" in result:
+            modules = [k for k in result["warnings"] if k != "info"]
+            for mod in modules:
+                pywikibot.warning(
+                    u"API warning (%s): %s"
+                     % (mod, result["warnings"][mod]["*"]))
+        if "error" not in result:
+            return result
+        if "*" in result["error"]:
+            # help text returned
+            result['error']['help'] = result['error'].pop("*")
+        code = result["error"].pop("code", "Unknown")
+        info = result["error"].pop("info", None)
+        if code == "maxlag":
+            lag = lagpattern.search(info)
+            if lag:
+                pywikibot.log(
+                    u"Pausing due to database lag: " + info)
+                self.site.throttle.lag(int(lag.group("lag")))
+                return None
+        if code in (u'internal_api_error_DBConnectionError', ):
+            self.wait()
+            return None
+        if code == "badtoken":
+            # the session has changed; do not reuse any cached tokens
+            self.site.invalidate_tokens()
+        # raise error
+        try:
+            pywikibot.log(u"API Error: query=\n%s"
+                           % pprint.pformat(self.params))
+            pywikibot.log(u"           response=\n%s"
+                           % result)
+            raise APIError(code, info, **result["error"])
+        except TypeError:
+            raise RuntimeError(result)
 
     def wait(self):
         """Determine how long to wait after a failed request."""
@@ -370,6 +546,248 @@ u"http_params: Key '%s' could not be encoded to '%s'; params=%r"
         self.retry_wait = min(120, self.retry_wait * 2)
 
 
+class RequestFuture(object):
+    """The pending result of a L{Request} submitted with submit_async().
+
+    The HTTP request is queued when the object is created; the calling
+    thread is only blocked when it asks for the result.  If the response
+    asks for the query to be repeated (for example because of database
+    lag or an expired session), the retries are done synchronously by
+    L{Request.submit} when result() is called.
+
+    Example:
+
+    >>> futures = [Request(site=site, action="query", meta="siteinfo"
+    ...                   ).submit_async()
+    ...            for site in sites]
+    >>> for future in gather(futures):
+    ...     print future.request.site, future.result()["query"]
+
+    """
+    def __init__(self, request):
+        """
+        @param request: the request to submit
+        @type request: Request
+
+        """
+        from pywikibot.comms import http
+
+        self.request = request
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._result = None
+        self._exception = None
+        self._evaluated = False
+        self._http = None
+        paramstring = request.http_params()
+        if request.site._loginstatus == -3:
+            request.site.login(False)
+        request.site.throttle(write=request.write)
+        try:
+            uri, ssl, kwargs = request._http_args(paramstring)
+            self._http = http.request_async(request.site, uri, ssl,
+                                            callback=self._set_done,
+                                            **kwargs)
+        except Exception:
+            # let result() go the synchronous way, which handles retries
+            pywikibot.error(traceback.format_exc())
+            self._set_done(None)
+
+    def _set_done(self, httprequest):
+        """Mark the HTTP request as finished and run the callbacks."""
+        self._lock.acquire()
+        try:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        finally:
+            self._lock.release()
+        for callback in callbacks:
+            callback(self)
+
+    def done(self):
+        """Return True if the response has arrived."""
+        return self._done.isSet()
+
+    def add_done_callback(self, callback):
+        """Call callback(future) as soon as the response has arrived.
+
+        If the response has already arrived, callback is called at once.
+        Otherwise it will be called from an HTTP processor thread, so it
+        should return quickly.
+
+        """
+        self._lock.acquire()
+        try:
+            if not self._done.isSet():
+                self._callbacks.append(callback)
+                return
+        finally:
+            self._lock.release()
+        callback(self)
+
+    def result(self):
+        """Wait for the response and return the data retrieved from api.php.
+
+        Raises the same exceptions as L{Request.submit}.
+
+        """
+        from pywikibot.comms import http
+
+        if not self._evaluated:
+            self._evaluated = True
+            try:
+                self._result = self._evaluate(http)
+            except Exception, e:
+                self._exception = e
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def _evaluate(self, http):
+        request = self.request
+        if self._http is None:
+            return request.submit()
+        try:
+            rawdata = http.get_response(request.site, self._http)
+        except Server504Error:
+            if not request.retry_timeouts:
+                raise
+            pywikibot.log(u"Caught HTTP 504 error; retrying")
+            request.wait()
+            return request.submit()
+        except FatalServerError:
+            raise
+        except Exception, e:
+            pywikibot.error(traceback.format_exc())
+            request.wait()
+            return request.submit()
+        result = request._handle_response(rawdata)
+        if result is None:
+            result = request.submit()
+        return result
+
+
+def gather(futures):
+    """Iterate the given futures in the order their responses arrive.
+
+    @param futures: L{RequestFuture} objects, or L{Request} objects that
+        will be submitted with submit_async()
+    @return: generator of L{RequestFuture} objects whose response has
+        arrived; call result() on them to get the data
+
+    """
+    queue = Queue.Queue()
+    count = 0
+    for future in futures:
+        if isinstance(future, Request):
+            future = future.submit_async()
+        future.add_done_callback(queue.put)
+        count += 1
+    for i in xrange(count):
+        yield queue.get()
+
+
+class BatchSizer(object):
+    """Number of pages to retrieve per request, together with their content.
+
+    Retrieving many pages at once saves round trips, but a request for
+    many large pages takes long and may time out on the server.  The batch
+    size grows while responses are small and fast, and shrinks when they
+    get large or slow, or when the server times out.  Use L{batch_sizer}
+    to get the object for a site; it is shared by all queries to the site
+    for the lifetime of the process.
+
+    """
+    # aim for responses of about this many bytes...
+    target_bytes = 2 * 1024 * 1024
+    # ...that take no longer than this many seconds
+    target_seconds = 15.0
+
+    def __init__(self, maximum, size=50):
+        self.maximum = maximum
+        self.size = min(size, maximum)
+        # moving average of the number of bytes per page in responses
+        self.pagebytes = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Return the number of pages to request next."""
+        return min(self.size, self.maximum)
+
+    def update(self, pages, nbytes, seconds):
+        """Adapt the batch size to a successful response.
+
+        @param pages: number of pages in the response
+        @param nbytes: length of the response
+        @param seconds: time it took to retrieve the response
+
+        """
+        if pages <= 0:
+            return
+        self.lock.acquire()
+        try:
+            pagebytes = float(nbytes) / pages
+            if self.pagebytes is None:
+                self.pagebytes = pagebytes
+            else:
+                self.pagebytes = 0.7 * self.pagebytes + 0.3 * pagebytes
+            size = self.target_bytes / max(self.pagebytes, 1.0)
+            if seconds > self.target_seconds:
+                size = min(size, pages * self.target_seconds / seconds)
+            # neither grow nor shrink by more than a factor of two at once
+            size = max(self.size // 2, min(self.size * 2, int(size)))
+            self.size = max(1, min(self.maximum, size))
+        finally:
+            self.lock.release()
+        pywikibot.debug(u"Batch size %i (%i bytes/page, %.1f s)"
+                          % (self.size, self.pagebytes, seconds),
+                        _logger)
+
+    def failed(self):
+        """Halve the batch size after a server timeout."""
+        self.lock.acquire()
+        try:
+            self.size = max(1, min(self.size, self.maximum) // 2)
+        finally:
+            self.lock.release()
+        pywikibot.log(u"Server timeout; reducing batch size to %i"
+                      % self.size)
+
+
+_sizers = {}
+_sizers_lock = threading.Lock()
+
+
+def titles_limit(site):
+    """Return how many titles may be given in one request to site.
+
+    This is 50, or 500 if the user has the apihighlimits right.
+
+    """
+    if site.logged_in() and "apihighlimits" in site.getuserinfo()["rights"]:
+        return 500
+    return 50
+
+
+def batch_sizer(site):
+    """Return the L{BatchSizer} for content queries to site.
+
+    At most L{titles_limit} pages may be requested at once.
+
+    """
+    maximum = titles_limit(site)
+    _sizers_lock.acquire()
+    try:
+        if site not in _sizers:
+            _sizers[site] = BatchSizer(maximum)
+        sizer = _sizers[site]
+        sizer.maximum = maximum
+        return sizer
+    finally:
+        _sizers_lock.release()
+
+
 class QueryGenerator(object):
     """Base class for iterators that handle responses to API action=query.
 
@@ -416,6 +834,7 @@ class QueryGenerator(object):
                 self.get_module()
                 break
         self.request = Request(**kwargs)
+        self.retry_timeouts = self.request.retry_timeouts
         self.prefix = None
         self.update_limit() # sets self.prefix
         if self.api_limit is not None and "generator" in kwargs:
@@ -431,8 +850,21 @@ class QueryGenerator(object):
                                             # but not always
 
     def get_module(self):
-        """Query api on self.site for paraminfo on querymodule=self.module"""
+        """Query api on self.site for paraminfo on querymodule=self.module
 
+        Parameter information stored in the on-disk site cache is used
+        if available.
+
+        """
+        from pywikibot.data import sitecache
+
+        cache = sitecache.site_cache(self.site)
+        cached = [cache.get_paraminfo(name)
+                  for name in self.module.split("|")]
+        if None not in cached:
+            for paraminfo in cached:
+                _modules[paraminfo["name"]] = paraminfo
+            return
         paramreq = Request(site=self.site, action="paraminfo",
                            querymodules=self.module)
         data = paramreq.submit()
@@ -444,6 +876,7 @@ class QueryGenerator(object):
             if "missing" in paraminfo:
                 raise Error("Invalid query module name '%s'." % self.module)
             _modules[paraminfo["name"]] = paraminfo
+        cache.set_paraminfo(data["paraminfo"]["querymodules"])
 
     def set_query_increment(self, value):
         """Set the maximum number of items to be retrieved per API query.
@@ -516,9 +949,39 @@ class QueryGenerator(object):
 
         Continues response as needed until limit (if any) is reached.
 
+        """
+        for resultdata in self._batches():
+            for item in resultdata:
+                yield self.result(item)
+
+    def columns(self, *keys):
+        """Iterate the response one API batch at a time, by column.
+
+        Instead of one object per item, yield one dict per API response
+        that maps each of the given keys to the list of the values of
+        that key in the batch's items, in order (None where an item has
+        no such key).  Values are returned as received, e.g. timestamps
+        are not parsed.  This is much lighter than creating an object
+        for every item when scanning long lists such as logevents or
+        usercontribs.
+
+        @param keys: keys of the result items to collect
+
+        """
+        for resultdata in self._batches():
+            yield dict((key, [item.get(key) for item in resultdata])
+                       for key in keys)
+
+    def _batches(self):
+        """Submit request and yield the list of result items of each response
+
+        Continues response as needed until limit (if any) is reached.
+
         """
         count = 0
         while True:
+            new_limit = None
+            sizer = None
             if self.query_limit is not None:
                 if self.limit is None:
                     new_limit = self.query_limit
@@ -526,25 +989,42 @@ class QueryGenerator(object):
                     new_limit = min(self.query_limit, self.limit - count)
                 else:
                     new_limit = None
-                if "rvprop" in self.request \
-                        and "content" in self.request["rvprop"]:
-                    # queries that retrieve page content have lower limits
-                    # Note: although API allows up to 500 pages for content
-                    #   queries, these sometimes result in server-side errors
-                    #   so use 250 as a safer limit
-                    new_limit = min(new_limit, self.api_limit // 10, 250)
+                if new_limit is not None and "rvprop" in self.request \
+                        and "content" in self.request["rvprop"] \
+                        and "generator" in self.request:
+                    # queries that retrieve page content have lower limits,
+                    # and large ones may cause server-side errors, so adapt
+                    # the number of pages to the size of the responses;
+                    # only a generator's limit counts pages, otherwise it
+                    # counts the revisions of a single page
+                    sizer = batch_sizer(self.site)
+                    new_limit = min(new_limit, self.api_limit // 10,
+                                    sizer.get())
                 if new_limit is not None:
                     self.request[self.prefix+"limit"] = str(new_limit)
+            # after a server timeout, retry with a lower limit if possible
+            self.request.retry_timeouts = self.retry_timeouts \
+                                          and (new_limit is None
+                                               or new_limit < 2)
+            start = time.time()
             try:
                 self.data = self.request.submit()
             except Server504Error:
                 # server timeout, usually caused by request with high limit
-                old_limit = self.query_limit
-                if old_limit is None or old_limit < 2:
+                if new_limit is None or new_limit < 2:
                     raise
-                pywikibot.log("Setting query limit to %s" % (old_limit // 2))
-                self.set_query_increment(old_limit // 2)
+                if sizer is not None:
+                    sizer.failed()
+                else:
+                    pywikibot.log("Setting query limit to %s"
+                                  % (new_limit // 2))
+                    self.set_query_increment(new_limit // 2)
                 continue
+            if sizer is not None and isinstance(self.data, dict):
+                sizer.update(len(self.data.get("query", {})
+                                          .get(self.resultkey, ())),
+                             self.request.response_size,
+                             time.time() - start)
             if not self.data or not isinstance(self.data, dict):
                 pywikibot.debug(
                     u"%s: stopped iteration because no dict retrieved from api."
@@ -554,37 +1034,40 @@ class QueryGenerator(object):
             if "query" not in self.data:
                 pywikibot.debug(
 u"%s: stopped iteration because 'query' not found in api response."
-                        % (self.__class__.__name__, self.resultkey),
+                        % self.__class__.__name__,
                     _logger)
-                pywikibot.debug(unicode(self.data), _logger)
+                if pywikibot.debugging(_logger):
+                    pywikibot.debug(pywikibot.truncated(unicode(self.data)),
+                                    _logger)
                 return
             if self.resultkey in self.data["query"]:
                 resultdata = self.data["query"][self.resultkey]
-                if isinstance(resultdata, dict):
+                if pywikibot.debugging(_logger):
+                    if isinstance(resultdata, dict):
+                        received = resultdata.keys()
+                    else:
+                        received = resultdata
                     pywikibot.debug(u"%s received %s; limit=%s"
                                       % (self.__class__.__name__,
-                                         resultdata.keys(),
+                                         pywikibot.truncated(
+                                             unicode(received)),
                                          self.limit),
                                     _logger)
+                if isinstance(resultdata, dict):
                     resultdata = [resultdata[k] for k in sorted(resultdata.keys())]
-                else:
-                    pywikibot.debug(u"%s received %s; limit=%s"
-                                      % (self.__class__.__name__,
-                                         resultdata,
-                                         self.limit),
-                                    _logger)
                 if "normalized" in self.data["query"]:
                     self.normalized = dict((item['to'], item['from'])
                                           for item in
                                           self.data["query"]["normalized"])
                 else:
                     self.normalized = {}
-                for item in resultdata:
-                    yield self.result(item)
-                    count += 1
-                    if self.limit is not None and self.limit > 0 \
-                                              and count >= self.limit:
-                        return
+                if self.limit is not None and self.limit > 0:
+                    resultdata = resultdata[:self.limit - count]
+                count += len(resultdata)
+                yield resultdata
+                if self.limit is not None and self.limit > 0 \
+                                          and count >= self.limit:
+                    return
             if not "query-continue" in self.data:
                 return
             if not self.continuekey in self.data["query-continue"]:
@@ -25,7 +25,14 @@ class LogDict(dict):
         raise KeyError("Log entry has no '%s' key" % key, key)
 
 class LogEntry(object):
-    """Generic log entry"""
+    """Generic log entry
+
+    Log scans can create a great many entries, so entries have no
+    instance dictionary; the values derived from the API data are
+    stored in slots the first time they are asked for.
+
+    """
+    __slots__ = ('data', '_title', '_timestamp')
 
     # Log type expected. None for every type, or one of the (letype) str :
     # block/patrol/etc...
@@ -34,7 +41,9 @@ class LogEntry(object):
 
     def __init__(self, apidata):
         """Initialize object from a logevent dict returned by MW API"""
-        self.data = LogDict(apidata)
+        if not isinstance(apidata, LogDict):
+            apidata = LogDict(apidata)
+        self.data = apidata
         if self._expectedType is not None and self._expectedType != self.type():
             raise Error("Wrong log type! Expecting %s, received %s instead." \
                         % (self._expectedType, self.type()))
@@ -78,6 +87,7 @@ class LogEntry(object):
         return self.data['comment']
 
 class BlockEntry(LogEntry):
+    __slots__ = ('_blockid', '_flags', '_duration', '_expiry')
     _expectedType = 'block'
     def __init__(self, apidata):
         super(BlockEntry, self).__init__(apidata)
@@ -85,9 +95,10 @@ class BlockEntry(LogEntry):
         # When an autoblock is removed, the "title" field is not a page title
         # ( https://bugzilla.wikimedia.org/show_bug.cgi?id=17781 )
         pos = self.data['title'].find('#')
-        self.isAutoblockRemoval = pos > 0
-        if self.isAutoblockRemoval:
+        if pos > 0:
             self._blockid = int(self.data['title'][pos+1:])
+        else:
+            self._blockid = None
 
     def title(self):
         """
@@ -101,8 +112,10 @@ class BlockEntry(LogEntry):
         else:
             return super(BlockEntry, self).title()
 
+    @property
     def isAutoblockRemoval(self):
-        return self.isAutoblockRemoval
+        """True if this log entry reflects the removal of an autoblock"""
+        return self._blockid is not None
 
     def _getBlockDetails(self):
         try:
@@ -150,18 +163,23 @@ class BlockEntry(LogEntry):
         return self._expiry
 
 class ProtectEntry(LogEntry):
+    __slots__ = ()
     _expectedType = 'protect'
 
 class RightsEntry(LogEntry):
+    __slots__ = ()
     _expectedType = 'rights'
 
 class DeleteEntry(LogEntry):
+    __slots__ = ()
     _expectedType = 'delete'
 
 class UploadEntry(LogEntry):
+    __slots__ = ()
     _expectedType = 'upload'
 
 class MoveEntry(LogEntry):
+    __slots__ = ('_new_title',)
     _expectedType = 'move'
 
     def new_ns(self):
@@ -184,12 +202,15 @@ class MoveEntry(LogEntry):
 
 
 class ImportEntry(LogEntry):
+    __slots__ = ()
     _expectedType = 'import'
 
 class PatrolEntry(LogEntry):
+    __slots__ = ()
     _expectedType = 'patrol'
 
 class NewUsersEntry(LogEntry):
+    __slots__ = ()
     _expectedType = 'newusers'
 
 #TODO entries for merge,suppress,makebot,gblblock,renameuser,globalauth,gblrights ?
@@ -0,0 +1,211 @@
+# -*- coding: utf-8  -*-
+"""
+On-disk cache of site metadata (siteinfo and API parameter information).
+
+Every bot process needs some information about the sites it works on
+before it can do anything useful: the namespaces from meta=siteinfo, and
+the parameters of each query module from action=paraminfo.  This data
+rarely changes, so it is stored in the 'apicache' subdirectory of the
+user's data directory and reused by later processes.
+
+Cached data expires after config.metadata_cache_expiry hours.  When the
+siteinfo is retrieved again and the 'generator' (MediaWiki version) string
+has changed, the cached parameter information is discarded as well.
+
+The version can only be compared when the siteinfo is retrieved, which
+happens when the cache has expired.  After the wiki has been upgraded,
+the cached data is therefore used until it expires, which may be up to
+config.metadata_cache_expiry hours.  Call L{SiteCache.clear} (or delete
+the file) to retrieve it at once.
+"""
+#
+# (C) Pywikipedia bot team, 2010
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+import os
+import threading
+import time
+
+import pywikibot
+from pywikibot import config
+
+_logger = "data.sitecache"
+
+# increase this whenever the layout of the cache files changes
+CACHE_FORMAT = 1
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def site_cache(site):
+    """Return the L{SiteCache} object for site."""
+    key = "%s-%s" % (site.family.name, site.code)
+    _caches_lock.acquire()
+    try:
+        if key not in _caches:
+            _caches[key] = SiteCache(key)
+        return _caches[key]
+    finally:
+        _caches_lock.release()
+
+
+class SiteCache(object):
+    """Persistent siteinfo and paraminfo data for a single site.
+
+    The file is read when the data is first needed, and rewritten whenever
+    new data is stored.
+
+    """
+    def __init__(self, key):
+        """
+        @param key: file name (without extension) of the cache file
+        @type key: str
+
+        """
+        self.filename = config.datafilepath("apicache", key + ".json")
+        self.lock = threading.RLock()
+        self._data = None
+
+    def enabled(self):
+        """Return True if the on-disk cache is to be used.
+
+        The cache is not used unless the HTTP transport talks to the wiki
+        itself: a cassette has to record the metadata requests in order
+        to answer them when it is replayed, and the data of the 'fake'
+        transport must not end up in the cache of the real site.
+
+        """
+        return bool(config.metadata_cache_expiry) \
+               and config.http_transport == "http"
+
+    def _load(self):
+        if self._data is not None:
+            return self._data
+        data = None
+        if self.enabled() and os.path.exists(self.filename):
+            try:
+                f = open(self.filename, "rb")
+                try:
+                    data = json.load(f)
+                finally:
+                    f.close()
+            except (IOError, ValueError):
+                pywikibot.debug(u"Could not read %s" % self.filename,
+                                _logger)
+                data = None
+        if not isinstance(data, dict) \
+                or data.get("format") != CACHE_FORMAT:
+            data = {"format": CACHE_FORMAT, "time": 0,
+                    "generator": None, "siteinfo": None, "paraminfo": {}}
+        self._data = data
+        return data
+
+    def _save(self):
+        if not self.enabled():
+            return
+        tmpname = "%s.%d.tmp" % (self.filename, os.getpid())
+        try:
+            f = open(tmpname, "wb")
+            try:
+                json.dump(self._data, f)
+            finally:
+                f.close()
+            if os.name == "nt" and os.path.exists(self.filename):
+                os.remove(self.filename)
+            os.rename(tmpname, self.filename)
+        except (IOError, OSError):
+            pywikibot.debug(u"Could not write %s" % self.filename, _logger)
+
+    def expired(self):
+        """Return True if the cached data has to be retrieved again."""
+        self.lock.acquire()
+        try:
+            data = self._load()
+            age = time.time() - data["time"]
+            return not (0 <= age < config.metadata_cache_expiry * 3600)
+        finally:
+            self.lock.release()
+
+    def get_siteinfo(self):
+        """Return the cached siteinfo query data, or None if not available.
+
+        The returned dict is the content of the 'query' element of the
+        API response, with 'general', 'namespaces' and (usually)
+        'namespacealiases' keys.
+
+        """
+        self.lock.acquire()
+        try:
+            if not self.enabled() or self.expired():
+                return None
+            return self._load()["siteinfo"]
+        finally:
+            self.lock.release()
+
+    def set_siteinfo(self, sidata):
+        """Store siteinfo query data.
+
+        If the MediaWiki version differs from the one that was stored
+        previously, all cached parameter information is dropped.
+
+        """
+        self.lock.acquire()
+        try:
+            data = self._load()
+            generator = sidata.get("general", {}).get("generator")
+            if generator != data["generator"]:
+                if data["generator"] is not None:
+                    pywikibot.log(
+                        u"Site software changed from %s to %s; clearing cache"
+                        % (data["generator"], generator))
+                data["paraminfo"] = {}
+            data["generator"] = generator
+            data["siteinfo"] = sidata
+            data["time"] = time.time()
+            self._save()
+        finally:
+            self.lock.release()
+
+    def get_paraminfo(self, module):
+        """Return cached paraminfo for the query module, or None."""
+        self.lock.acquire()
+        try:
+            if not self.enabled() or self.expired():
+                return None
+            return self._load()["paraminfo"].get(module)
+        finally:
+            self.lock.release()
+
+    def set_paraminfo(self, modules):
+        """Store paraminfo data.
+
+        @param modules: list of paraminfo dicts, as found in the
+            'querymodules' element of the API response
+
+        """
+        self.lock.acquire()
+        try:
+            data = self._load()
+            for paraminfo in modules:
+                data["paraminfo"][paraminfo["name"]] = paraminfo
+            self._save()
+        finally:
+            self.lock.release()
+
+    def clear(self):
+        """Discard all cached data for this site."""
+        self.lock.acquire()
+        try:
+            self._data = None
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+        finally:
+            self.lock.release()
@@ -41,6 +41,22 @@ yearFormats     = ['YearAD', 'YearBC']
 millFormats     = ['MillenniumAD', 'MillenniumBC']
 snglValsFormats = ['CurrEvents']
 
+class _ProbeResult(Exception):
+    """Raised by the format helpers when they are called with _probe.
+
+    Carries the patterns (see dh()) and the literal titles which the
+    format function can decode. Used to build the getAutoFormat() index.
+
+    """
+    def __init__(self, patterns=(), literals=()):
+        Exception.__init__(self)
+        self.patterns = list(patterns)
+        self.literals = list(literals)
+
+# Passed to a format function instead of a value to find out which titles
+# it recognizes
+_probe = object()
+
 def multi( value, tuplst ):
     """This method is used when more than one pattern is used for the same
     entry. Example: 1st century, 2nd century, etc.
@@ -50,6 +66,17 @@ def multi( value, tuplst ):
     When the 2nd function evaluates to true, the 1st function is used.
 
     """
+    if value is _probe:
+        # collect what all of the functions recognize
+        result = _ProbeResult()
+        for func, pred in tuplst:
+            try:
+                func(value)
+            except _ProbeResult, e:
+                result.patterns += e.patterns
+                result.literals += e.literals
+        raise result
+
     if type(value) in _stringTypes:
         # Try all functions, and test result against predicates
         for func, pred in tuplst:
@@ -164,6 +191,8 @@ def slh( value, lst ):
             formats['MonthName']['en'](u'anything else') => raise ValueError
 
     """
+    if value is _probe:
+        raise _ProbeResult(literals=lst)
     if type(value) in _stringTypes:
         return lst.index(value)+1
     else:
@@ -179,6 +208,8 @@ def dh_constVal( value, ind, match ):
     formats['CurrEvents']['en'](u'Current Events') => ind
 
     """
+    if value is _probe:
+        raise _ProbeResult(literals=[match])
     if type(value) in _stringTypes:
         if value == match:
             return ind
@@ -362,6 +393,8 @@ def dh( value, pattern, encf, decf, filter = None ):
 
     """
 
+    if value is _probe:
+        raise _ProbeResult(patterns=[pattern])
     compPattern, strPattern, decoders = escapePattern2(pattern)
     if type(value) in _stringTypes:
         m = compPattern.match(value)
@@ -1319,9 +1352,15 @@ def addFmt( lang, isMnthOfYear, patterns ):
     for i in range(12):
         if patterns[i] is not None:
             if isMnthOfYear:
-                formats[yrMnthFmts[i]][lang] = eval(u'lambda v: dh_mnthOfYear( v, u"%s" )' % patterns[i])
+                formats[yrMnthFmts[i]][lang] = _fmtFunc(dh_mnthOfYear, patterns[i])
             else:
-                formats[dayMnthFmts[i]][lang] = eval(u'lambda v: dh_dayOfMnth( v, u"%s" )' % patterns[i])
+                formats[dayMnthFmts[i]][lang] = _fmtFunc(dh_dayOfMnth, patterns[i])
+
+def _fmtFunc(func, pattern):
+    """Return a format function which calls func with the given pattern.
+    Binding the pattern in a closure is much cheaper than compiling a lambda with eval().
+    """
+    return lambda v: func(v, pattern)
 
 def makeMonthList(pattern):
     return [pattern % m for m in range(1,13)]
@@ -1445,25 +1484,22 @@ waMonthNames = [ u"djanvî", u"fevrî", u"måss", u"avri", u"may", u"djun", u"dj
 
 # For month names begining with a consonant...
 for i in [0,1,2,4,5,6,8,10,11]:
-    formats[dayMnthFmts[i]]['wa'] = eval(
-        (u'lambda m: multi( m, [' +
-            u'(lambda v: dh_dayOfMnth( v, u"%%dî d\' %s" ), lambda p: p == 1),' +
-            u'(lambda v: dh_dayOfMnth( v, u"%%d d\' %s" ),  lambda p: p in [2,3,20,22,23]),' +
-            u'(lambda v: dh_dayOfMnth( v, u"%%d di %s" ),   alwaysTrue)])') % (waMonthNames[i], waMonthNames[i], waMonthNames[i]))
+    formats[dayMnthFmts[i]]['wa'] = _fmtFunc(multi, [
+        (_fmtFunc(dh_dayOfMnth, u"%%dî d' %s" % waMonthNames[i]), lambda p: p == 1),
+        (_fmtFunc(dh_dayOfMnth, u"%%d d' %s" % waMonthNames[i]),  lambda p: p in [2,3,20,22,23]),
+        (_fmtFunc(dh_dayOfMnth, u"%%d di %s" % waMonthNames[i]),   alwaysTrue)])
 # For month names begining with a vowel...
 for i in [3,7,9]:
-    formats[dayMnthFmts[i]]['wa'] = eval(
-        (u'lambda m: multi( m, [' +
-            u'(lambda v: dh_dayOfMnth( v, u"%%dî d\' %s" ), lambda p: p == 1),' +
-            u'(lambda v: dh_dayOfMnth( v, u"%%d d\' %s" ),  alwaysTrue)])') % (waMonthNames[i], waMonthNames[i]))
+    formats[dayMnthFmts[i]]['wa'] = _fmtFunc(multi, [
+        (_fmtFunc(dh_dayOfMnth, u"%%dî d' %s" % waMonthNames[i]), lambda p: p == 1),
+        (_fmtFunc(dh_dayOfMnth, u"%%d d' %s" % waMonthNames[i]),  alwaysTrue)])
 
 # Brazil uses "1añ" for the 1st of every month, and number without suffix for all other days
 brMonthNames = makeMonthNamedList( 'br', u"%s", True )
 for i in range(0,12):
-    formats[dayMnthFmts[i]]['br'] = eval(
-        (u'lambda m: multi( m, [' +
-            u'(lambda v: dh_dayOfMnth( v, u"%%dañ %s" ), lambda p: p == 1),' +
-            u'(lambda v: dh_dayOfMnth( v, u"%%d %s" ),   alwaysTrue)])') % (brMonthNames[i], brMonthNames[i]))
+    formats[dayMnthFmts[i]]['br'] = _fmtFunc(multi, [
+        (_fmtFunc(dh_dayOfMnth, u"%%dañ %s" % brMonthNames[i]), lambda p: p == 1),
+        (_fmtFunc(dh_dayOfMnth, u"%%d %s" % brMonthNames[i]),   alwaysTrue)])
 
 #
 # Month of the Year: "en:May 1976"
@@ -1546,11 +1582,75 @@ def getNumberOfDaysInMonth(month):
     """Returns the number of days in a given month, 1 being January, etc."""
     return formatLimits[dayMnthFmts[month-1]][2]-1
 
+class _AutoFormatIndex(object):
+    """Finds the formats of one language that may recognize a given title.
+
+    Every format function is probed once to find the literal titles and the
+    patterns it decodes. Titles are then only passed to the functions of
+    the formats whose literal titles, or the first or last literal
+    character of whose patterns, fit the title. Functions that could not be
+    probed are always tried.
+
+    """
+    def __init__(self, lang):
+        self.literals = {}  # title -> entries
+        self.byFirst = {}   # first character of the pattern -> entries
+        self.byLast = {}    # last character of the pattern -> entries
+        self.always = []    # entries to try for every title
+        # each entry is (order, dictName, func, regexes), where order
+        # keeps the iteration order of the formats dictionary, and
+        # regexes (if not None) must match before func can succeed
+        for order, (dictName, dict) in enumerate(formats.iteritems()):
+            if lang not in dict:
+                continue
+            func = dict[lang]
+            try:
+                func(_probe)
+            except _ProbeResult, e:
+                if e.literals:
+                    entry = (order, dictName, func, None)
+                else:
+                    entry = (order, dictName, func,
+                             tuple([escapePattern2(p)[0]
+                                    for p in e.patterns]))
+                for literal in e.literals:
+                    self.literals.setdefault(literal, []).append(entry)
+                for pattern in e.patterns:
+                    parts = _reParameters.split(pattern)
+                    if parts[0]:
+                        self.byFirst.setdefault(parts[0][0], []).append(entry)
+                    elif parts[-1]:
+                        self.byLast.setdefault(parts[-1][-1], []).append(entry)
+                    else:
+                        self.always.append(entry)
+            except Exception:
+                self.always.append((order, dictName, func, None))
+            else:
+                self.always.append((order, dictName, func, None))
+
+    def candidates(self, title):
+        """Return the entries that may recognize title, in format order."""
+        entries = self.always + self.literals.get(title, [])
+        if title:
+            entries = entries + self.byFirst.get(title[0], []) \
+                              + self.byLast.get(title[-1], [])
+        return sorted(set(entries))
+
+_autoFormatIndexes = {}
+
 def getAutoFormat( lang, title, ignoreFirstLetterCase = True ):
     """Returns (dictName,value), where value can be a year, date, etc, and dictName is 'YearBC', 'December', etc."""
-    for dictName, dict in formats.iteritems():
+    if lang not in _autoFormatIndexes:
+        _autoFormatIndexes[lang] = _AutoFormatIndex(lang)
+    for order, dictName, func, regexes in _autoFormatIndexes[lang].candidates(title):
+        if regexes is not None:
+            for regex in regexes:
+                if regex.match(title):
+                    break
+            else:
+                continue
         try:
-            year = dict[ lang ]( title )
+            year = func( title )
             return dictName, year
         except:
             pass
@@ -1651,6 +1751,11 @@ def test(quick=False, showAll=False):
     else:
         print(u'Date module has been fully tested')
 
-# Do a quick test upon module loading!
-# Make sure the date file is correct
-test(quick=True)
+
+if __name__ == "__main__":
+    # Check the consistency of the formats table; pass -quick to only
+    # test the first value of each format
+    import sys, time
+    startClock = time.clock()
+    test(quick='-quick' in sys.argv[1:], showAll='-all' in sys.argv[1:])
+    print(u'Tested in %.2f seconds' % (time.clock() - startClock))
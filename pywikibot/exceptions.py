@@ -101,6 +101,9 @@ class ServerError(Error):
 class Server504Error(Error):
     """Server timed out with http 504 code"""
 
+class FatalServerError(ServerError):
+    """The request failed in a way that retrying it cannot fix"""
+
 class BadTitle(Error):
     """Server responded with BadTitle."""
 
@@ -9,7 +9,14 @@
 #
 __version__ = '$Id$'
 
-from pywikibot import Error
+import marshal
+import os
+import threading
+
+from pywikibot import Error, config
+
+# Increase this whenever the layout of the i18n cache files changes
+CACHE_FORMAT = 1
 
 # Languages to use for comment text after the actual language but before
 # en:. For example, if for language 'xx', you want the preference of
@@ -210,6 +217,162 @@ class TranslationError(Error):
     """ Raised when no correct translation could be found """
     pass
 
+# The resolved fallback chains of twtranslate(), by language code
+_fallbacks = {}
+
+
+def _fallback_chain(code):
+    """Return the languages twtranslate() tries for code, in order."""
+    try:
+        return _fallbacks[code]
+    except KeyError:
+        chain = _fallbacks[code] = tuple([code] + _altlang(code) + ['en'])
+        return chain
+
+
+class MessageCatalogue(object):
+    """The TranslateWiki messages of one i18n package.
+
+    The messages are loaded once from the module i18n.<package>.  If
+    config.i18n_cache is enabled, they are also stored in a compact marshal
+    file in the 'i18ncache' subdirectory of the user's data directory;
+    later processes read that file instead, and unpack only the messages
+    of the languages they actually use.
+
+    Translations are memoized, with the fallback languages resolved and
+    (if possible) the parameters filled in.  The memo is emptied when it
+    holds more than MAXCACHE entries.
+
+    """
+    MAXCACHE = 1000
+
+    def __init__(self, package):
+        self.package = package
+        self.lock = threading.Lock()
+        self._messages = None   # code -> {twtitle: message} or packed dict
+        self._cache = {}        # (code, twtitle, parameters) -> message
+
+    def _load(self):
+        """Return the dict of messages of all languages."""
+        if self._messages is None:
+            self.lock.acquire()
+            try:
+                if self._messages is None:
+                    if config.i18n_cache:
+                        self._messages = self._load_cached()
+                    else:
+                        self._messages = self._import()
+            finally:
+                self.lock.release()
+        return self._messages
+
+    def _import(self):
+        return getattr(__import__("i18n", fromlist=[self.package]),
+                       self.package).msg
+
+    def _load_cached(self):
+        """Return the messages from the cache file, updating it if needed.
+
+        The messages of each language are kept in marshalled form until
+        they are needed; see L{messages}.
+
+        """
+        source = os.path.join(os.path.dirname(__import__("i18n").__file__),
+                              self.package + ".py")
+        filename = config.datafilepath("i18ncache", self.package + ".dat")
+        try:
+            mtime = os.path.getmtime(source)
+        except OSError:
+            # no source file; the module may still be importable
+            return self._import()
+        try:
+            f = open(filename, "rb")
+            try:
+                data = marshal.load(f)
+            finally:
+                f.close()
+            if data["format"] == CACHE_FORMAT and data["mtime"] == mtime:
+                return data["messages"]
+        except (IOError, EOFError, ValueError, TypeError, KeyError):
+            pass
+        msg = self._import()
+        packed = dict((code, marshal.dumps(messages))
+                      for (code, messages) in msg.iteritems())
+        try:
+            f = open(filename, "wb")
+            try:
+                marshal.dump({"format": CACHE_FORMAT, "mtime": mtime,
+                              "messages": packed}, f)
+            finally:
+                f.close()
+        except IOError:
+            pass
+        return msg
+
+    def messages(self, code):
+        """Return the dict of messages for language code, or None."""
+        msg = self._load()
+        messages = msg.get(code)
+        if isinstance(messages, str):
+            # unpack the language's messages from the cache file
+            messages = msg[code] = marshal.loads(messages)
+        return messages
+
+    def has_key(self, code, twtitle):
+        """Return True if twtitle is translated to code (no fallback)."""
+        messages = self.messages(code)
+        return messages is not None and twtitle in messages
+
+    def translate(self, code, twtitle, parameters=None):
+        """Return the message twtitle in code or its fallback languages.
+
+        @raise TranslationError: if there is not even an English message
+
+        """
+        key = (code, twtitle, parameters)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # parameters not hashable, e.g. a dict
+            key = None
+        trans = None
+        for alt in _fallback_chain(code):
+            messages = self.messages(alt)
+            if messages is not None and twtitle in messages:
+                trans = messages[twtitle]
+                break
+        if trans is None:
+            raise TranslationError("No English translation has been defined for TranslateWiki key %r" % twtitle)
+        if parameters:
+            trans = trans % parameters
+        if key is not None:
+            if len(self._cache) >= self.MAXCACHE:
+                self._cache.clear()
+            self._cache[key] = trans
+        return trans
+
+
+_catalogues = {}
+_catalogues_lock = threading.Lock()
+
+
+def catalogue(package):
+    """Return the L{MessageCatalogue} of an i18n package."""
+    try:
+        return _catalogues[package]
+    except KeyError:
+        pass
+    _catalogues_lock.acquire()
+    try:
+        if package not in _catalogues:
+            _catalogues[package] = MessageCatalogue(package)
+        return _catalogues[package]
+    finally:
+        _catalogues_lock.release()
+
+
 def twtranslate(code, twtitle, parameters=None):
     """ Uses TranslateWiki files to provide translations based on the TW title
         twtitle, which corresponds to a page on TW.
@@ -223,34 +386,12 @@ def twtranslate(code, twtitle, parameters=None):
         import table.
     """
     package = twtitle.split("-")[0]
-    transdict = getattr(__import__("i18n", fromlist=[package]), package).msg
-
     # If a site is given instead of a code, use its language
     if hasattr(code, 'lang'):
         code = code.lang
-
-    # There are two possible failure modes: the translation dict might not have
-    # the language altogether, or a specific key could be untranslated. Both
-    # modes are caught with the KeyError.
-
-    trans = None
-    try:
-        trans = transdict[code][twtitle]
-    except KeyError:
-        # try alternative languages and English
-        for alt in _altlang(code) + ['en']:
-            try:
-                trans = transdict[alt][twtitle]
-                break
-            except KeyError:
-                continue
-        if not trans:
-            raise TranslationError("No English translation has been defined for TranslateWiki key %r" % twtitle)
-
-    if parameters:
-        return trans % parameters
-    else:
-        return trans
+    # The language itself is tried first, then the alternative languages,
+    # and finally English.
+    return catalogue(package).translate(code, twtitle, parameters)
 
 def twhas_key(code, twtitle):
     """ Uses TranslateWiki files to to check whether specified translation
@@ -263,8 +404,7 @@ def twhas_key(code, twtitle):
         import table.
     """
     package = twtitle.split("-")[0]
-    transdict = getattr(__import__("i18n", fromlist=[package]), package).msg
     # If a site is given instead of a code, use its language
     if hasattr(code, 'lang'):
         code = code.lang
-    return code in transdict and twtitle in transdict[code]
+    return catalogue(package).has_key(code, twtitle)
@@ -2092,6 +2092,9 @@ class User(Page):
 
 class Revision(object):
     """A structure holding information about a single revision of a Page."""
+    __slots__ = ('revid', 'text', 'timestamp', 'user', 'anon', 'comment',
+                 'minor')
+
     def __init__(self, revid, timestamp, user, anon=False, comment=u"",
                  text=None, minor=False):
         """All parameters correspond to object attributes (e.g., revid
@@ -2149,6 +2152,10 @@ class Link(object):
             u'|&#x[0-9A-Fa-f]+;'
         )
 
+    # Normalized link texts and parsed links are cached per source site;
+    # each cache is cleared when it holds more than MAXCACHE entries.
+    MAXCACHE = 10000
+
     def __init__(self, text, source=None, defaultNamespace=0):
         """Constructor
 
@@ -2178,11 +2185,28 @@ class Link(object):
             self._anchor = None
 
         # Clean up the name, it can come from anywhere.
+        cache = self._source._linktexts
+        t = cache.get(self._text)
+        if t is None:
+            t = self._normalize(self._text, self._source)
+            if len(cache) >= Link.MAXCACHE:
+                cache.clear()
+            cache[self._text] = t
+        self._text = t
+
+    @staticmethod
+    def _normalize(text, source):
+        """Return text with entities, URL escapes and whitespace cleaned up.
+
+        Equal results are returned as the same string object for a source
+        site, so that titles repeated across many links are stored once.
+
+        """
         # Convert HTML entities to unicode
-        t = html2unicode(self._text)
+        t = html2unicode(text)
 
         # Convert URL-encoded characters to unicode
-        t = url2unicode(t, site=self._source)
+        t = url2unicode(t, site=source)
 
         # Normalize unicode string to a NFC (composed) format to allow proper
         # string comparisons. According to
@@ -2204,7 +2228,15 @@ class Link(object):
         t = t.strip(" ")
         # Remove left-to-right and right-to-left markers.
         t = t.replace(u"\u200e", u"").replace(u"\u200f", u"")
-        self._text = t
+        return Link._intern(t, source)
+
+    @staticmethod
+    def _intern(title, source):
+        """Return the shared copy of title for the source site."""
+        titles = source._linktitles
+        if len(titles) >= Link.MAXCACHE and title not in titles:
+            titles.clear()
+        return titles.setdefault(title, title)
 
     def parse_site(self):
         """Parse only enough text to determine which site the link points to.
@@ -2227,28 +2259,33 @@ class Link(object):
                 t = t.lstrip(u":").lstrip(u" ")
                 continue
             prefix = t[ :t.index(u":")].lower() # part of text before :
-            ns = self._source.ns_index(prefix)
-            if ns:
+            kind = self._source.link_prefix(prefix)
+            if kind is None:
+                break
+            if kind[0] == 'namespace':
                 # The prefix is a namespace in the source wiki
                 return (fam.name, code)
-            if prefix in fam.langs:
+            if kind[0] == 'language':
                 # prefix is a language code within the source wiki family
                 return (fam.name, prefix)
-            known = fam.get_known_families(site=self._source)
-            if prefix in known:
-                if known[prefix] == fam.name:
-                    # interwiki prefix links back to source family
-                    t = t[t.index(u":")+1: ].lstrip(u" ")
-                    # strip off the prefix and retry
-                    continue
-                # prefix is a different wiki family
-                return (known[prefix], code)
-            break
+            if kind[1] == fam.name:
+                # interwiki prefix links back to source family
+                t = t[t.index(u":")+1: ].lstrip(u" ")
+                # strip off the prefix and retry
+                continue
+            # prefix is a different wiki family
+            return (kind[1], code)
         return (fam.name, code)  # text before : doesn't match any known prefix
 
     def parse(self):
         """Parse text; called internally when accessing attributes"""
 
+        key = (self._text, self._defaultns)
+        parsed = self._source._parsedlinks.get(key)
+        if parsed is not None:
+            self._site, self._namespace, self._title, self._section = parsed
+            return
+
         self._site = self._source
         self._namespace = self._defaultns
         t = self._text
@@ -2267,14 +2304,13 @@ class Link(object):
 
             fam = self._site.family
             prefix = t[ :t.index(u":")].lower()
-            ns = self._site.ns_index(prefix)
-            if ns:
+            kind = self._site.link_prefix(prefix)
+            if kind is not None and kind[0] == 'namespace':
                 # Ordinary namespace
                 t = t[t.index(u":"): ].lstrip(u":").lstrip(u" ")
-                self._namespace = ns
+                self._namespace = kind[1]
                 break
-            if prefix in fam.langs.keys()\
-                   or prefix in fam.get_known_families(site=self._site):
+            if kind is not None:
                 # looks like an interwiki link
                 if not firstPass:
                     # Can't make a local interwiki link to an interwiki link.
@@ -2282,11 +2318,11 @@ class Link(object):
                           "Improperly formatted interwiki link '%s'"
                           % self._text)
                 t = t[t.index(u":"): ].lstrip(u":").lstrip(u" ")
-                if prefix in fam.langs.keys():
+                if kind[0] == 'language':
                     newsite = pywikibot.Site(prefix, fam)
                 else:
                     otherlang = self._site.code
-                    familyName = fam.get_known_families(site=self._site)[prefix]
+                    familyName = kind[1]
                     if familyName in ['commons', 'meta']:
                         otherlang = familyName
                     try:
@@ -2355,7 +2391,12 @@ not supported by PyWikiBot!"""
             raise pywikibot.Error("Invalid link (no page title): '%s'"
                                   % self._text)
 
-        self._title = t
+        self._title = Link._intern(t, self._source)
+
+        cache = self._source._parsedlinks
+        if len(cache) >= Link.MAXCACHE:
+            cache.clear()
+        cache[key] = (self._site, self._namespace, self._title, self._section)
 
     # define attributes, to be evaluated lazily
 
@@ -21,6 +21,7 @@ __version__ = '$Id$'
 import pywikibot
 from pywikibot import config
 from pywikibot import deprecate_arg
+from pywikibot.tools import prefetch
 
 import itertools
 import Queue
@@ -778,26 +779,47 @@ def PageWithTalkPageGenerator(generator):
 
 
 @deprecate_arg("pageNumber", "step")
-@deprecate_arg("lookahead", None)
-def PreloadingGenerator(generator, step=50):
-    """Yield preloaded pages taken from another generator."""
+def PreloadingGenerator(generator, step=None, lookahead=None):
+    """Yield preloaded pages taken from another generator.
+
+    @param step: how many pages to retrieve at a time; by default, this
+        is adapted to the size of the pages retrieved so far
+    @param lookahead: how many groups of pages to retrieve in advance,
+        while the current group is being processed; defaults to
+        config.preload_lookahead
+
+    """
+    if lookahead is None:
+        lookahead = config.preload_lookahead
+    groups = _PreloadingGroups(generator, step)
+    if lookahead > 0:
+        groups = prefetch(groups, lookahead)
+    for group in groups:
+        for page in group:
+            yield page
+
+
+def _PreloadingGroups(generator, step):
+    """Yield lists of preloaded pages taken from another generator."""
 
     # pages may be on more than one site, for example if an interwiki
     # generator is used, so use a separate preloader for each site
     sites = {}
+    sizes = {}
     # build a list of pages for each site found in the iterator
     for page in generator:
         site = page.site
+        if site not in sizes:
+            sizes[site] = step or pywikibot.data.api.batch_sizer(site).get()
         sites.setdefault(site, []).append(page)
-        if len(sites[site]) >= step:
+        if len(sites[site]) >= sizes[site]:
             group = sites[site]
             sites[site] = []
-            for i in site.preloadpages(group, step):
-                yield i
+            del sizes[site]
+            yield list(site.preloadpages(group, len(group)))
     for site in sites:
         if sites[site]:
-            for i in site.preloadpages(sites[site], step):
-                yield i
+            yield list(site.preloadpages(sites[site], len(sites[site])))
 
 
 def NewimagesPageGenerator(step=None, total=None, site=None):
@@ -20,9 +20,11 @@ from pywikibot.data import api
 from pywikibot.exceptions import *
 
 try:
-    from hashlib import md5
+    from hashlib import md5, sha1
 except ImportError:
     from md5 import md5
+    from sha import sha as sha1
+import itertools
 import os
 import re
 import sys
@@ -125,6 +127,12 @@ class BaseSite(object):
         # following are for use with lock_page and unlock_page methods
         self._pagemutex = threading.Lock()
         self._locked_pages = []
+        # lookup tables built by _prefix_index()
+        self._prefixes = None
+        # caches used by pywikibot.Link; see Link.__init__ and Link.parse
+        self._linktexts = {}
+        self._linktitles = {}
+        self._parsedlinks = {}
 
     @property
     def throttle(self):
@@ -235,14 +243,51 @@ class BaseSite(object):
         return [lang for lang in self.languages()
                      if lang[:1].upper() + lang[1:] not in nsnames]
 
+    def _prefix_index(self):
+        """Return the lookup tables for namespace names and link prefixes.
+
+        @return: a tuple of two dicts: the first maps each lower-case
+            namespace name and alias to the namespace index; the second
+            maps each lower-case prefix that may precede a colon in a link
+            to a tuple ('namespace', index), ('language', code) or
+            ('family', family name), in this order of precedence
+
+        """
+        # this may load the siteinfo, which resets the tables
+        namespaces = self.namespaces()
+        prefixes = self._prefixes
+        if prefixes is None:
+            nsindex = {}
+            linkprefixes = {}
+            for ns in namespaces:
+                for name in namespaces[ns]:
+                    nsindex.setdefault(name.lower(), ns)
+                    if ns != 0:
+                        linkprefixes.setdefault(name.lower(),
+                                                ('namespace', ns))
+            for lang in self.family.langs:
+                linkprefixes.setdefault(lang, ('language', lang))
+            known = self.family.get_known_families(site=self)
+            for prefix in known:
+                linkprefixes.setdefault(prefix, ('family', known[prefix]))
+            prefixes = self._prefixes = (nsindex, linkprefixes)
+        return prefixes
+
     def ns_index(self, namespace):
         """Given a namespace name, return its int index, or None if invalid."""
 
-        for ns in self.namespaces():
-            if namespace.lower() in [name.lower()
-                                     for name in self.namespaces()[ns]]:
-                return ns
-        return None
+        return self._prefix_index()[0].get(namespace.lower())
+
+    def link_prefix(self, prefix):
+        """Return the meaning of a link prefix (the text before a colon).
+
+        @return: ('namespace', index) if prefix is a namespace name of this
+            site, ('language', code) if it is a language code of the
+            site's family, ('family', name) if it is an interwiki prefix
+            of another wiki family, or None
+
+        """
+        return self._prefix_index()[1].get(prefix.lower())
 
     getNamespaceIndex = ns_index  # for backwards-compatibility
 
@@ -630,6 +675,8 @@ class APISite(BaseSite):
             }
         self.sitelock = threading.Lock()
         self._msgcache = {}
+        # cached tokens, see token()
+        self._tokens = {}
         # _loginstatus: -3 means login not yet attempted,
         #               -2 means login attempt in progress,
         #               -1 means not logged in (anon user),
@@ -710,6 +757,8 @@ class APISite(BaseSite):
                 del self._userinfo
             self.getuserinfo()
             self._loginstatus = sysop
+            # tokens of the previous session are no longer valid
+            self.invalidate_tokens()
         else:
             self._loginstatus = -1 # failure
         if not hasattr(self, "_siteinfo"):
@@ -912,34 +961,50 @@ class APISite(BaseSite):
         """Return list of localized PAGENAMEE tags for the site."""
         return self.getmagicwords("pagenamee")
 
-    def _getsiteinfo(self):
-        """Retrieve siteinfo and namespaces from site."""
-        sirequest = api.Request(
-                            site=self,
-                            action="query",
-                            meta="siteinfo",
-                            siprop="general|namespaces|namespacealiases"
-                        )
-        try:
-            sidata = sirequest.submit()
-        except api.APIError:
-            # hack for older sites that don't support 1.12 properties
-            # probably should delete if we're not going to support pre-1.12
+    def _getsiteinfo(self, force=False):
+        """Retrieve siteinfo and namespaces from site.
+
+        The data is taken from the on-disk site cache unless it has
+        expired or force is True.
+
+        """
+        from pywikibot.data import sitecache
+
+        cache = sitecache.site_cache(self)
+        sidata = None
+        if not force:
+            sidata = cache.get_siteinfo()
+        if sidata is None:
             sirequest = api.Request(
                                 site=self,
                                 action="query",
                                 meta="siteinfo",
-                                siprop="general|namespaces"
+                                siprop="general|namespaces|namespacealiases"
                             )
-            sidata = sirequest.submit()
-
-        assert 'query' in sidata, \
-               "API siteinfo response lacks 'query' key"
-        sidata = sidata['query']
-        assert 'general' in sidata, \
-               "API siteinfo response lacks 'general' key"
-        assert 'namespaces' in sidata, \
-               "API siteinfo response lacks 'namespaces' key"
+            try:
+                sidata = sirequest.submit()
+            except api.APIError:
+                # hack for older sites that don't support 1.12 properties
+                # probably should delete if we're not going to support pre-1.12
+                sirequest = api.Request(
+                                    site=self,
+                                    action="query",
+                                    meta="siteinfo",
+                                    siprop="general|namespaces"
+                                )
+                sidata = sirequest.submit()
+
+            assert 'query' in sidata, \
+                   "API siteinfo response lacks 'query' key"
+            sidata = sidata['query']
+            assert 'general' in sidata, \
+                   "API siteinfo response lacks 'general' key"
+            assert 'namespaces' in sidata, \
+                   "API siteinfo response lacks 'namespaces' key"
+            cache.set_siteinfo(dict((key, sidata[key])
+                                    for key in ('general', 'namespaces',
+                                                'namespacealiases')
+                                    if key in sidata))
         self._siteinfo = sidata['general']
         nsdata = sidata['namespaces']
         for nskey in nsdata:
@@ -958,6 +1023,11 @@ class APISite(BaseSite):
                     continue
                 # this is a less preferred form so it goes at the end
                 self._namespaces[int(item['id'])].append(item["*"])
+        # namespace names are used in the cached exception regexes,
+        # the prefix tables and the parsed links
+        pywikibot.textlib.clear_exception_cache(self)
+        self._prefixes = None
+        self._parsedlinks = {}
 
     @property
     def siteinfo(self):
@@ -1142,46 +1212,86 @@ class APISite(BaseSite):
             page._redirtarget = target
         return page._redirtarget
 
-    def preloadpages(self, pagelist, groupsize=50, templates=False,
-            langlinks=False):
+    def preloadpages(self, pagelist, groupsize=None, templates=False,
+            langlinks=False, lookahead=0):
         """Return a generator to a list of preloaded pages.
 
         Note that [at least in current implementation] pages may be iterated
         in a different order than in the underlying pagelist.
 
         @param pagelist: an iterable that returns Page objects
-        @param groupsize: how many Pages to query at a time
+        @param groupsize: how many Pages to query at a time; by default,
+            this is adapted to the size of the pages retrieved so far
         @type groupsize: int
         @param templates: preload list of templates in the pages
         @param langlinks: preload list of language links found in the pages
+        @param lookahead: how many groups to retrieve in advance, while the
+            pages of the current group are being processed
+        @type lookahead: int
 
         """
-        from pywikibot.tools import itergroup
-        for sublist in itergroup(pagelist, groupsize):
-            pageids = [str(p._pageid) for p in sublist
-                                      if hasattr(p, "_pageid")
-                                         and p._pageid > 0]
-            cache = dict((p.title(withSection=False), p) for p in sublist)
-
-            props = "revisions|info|categoryinfo"
-            if templates:
-                props += '|templates'
-            if langlinks:
-                props += '|langlinks'
-            rvgen = api.PropertyGenerator(props, site=self)
-            rvgen.set_maximum_items(-1) # suppress use of "rvlimit" parameter
-            if len(pageids) == len(sublist):
-                # only use pageids if all pages have them
-                rvgen.request["pageids"] = "|".join(pageids)
-            else:
-                rvgen.request["titles"] = "|".join(cache.keys())
-            rvgen.request[u"rvprop"] = \
-                    u"ids|flags|timestamp|user|comment|content"
-            pywikibot.output(u"Retrieving %s pages from %s."
-                           % (len(cache), self)
-                        )
+        from pywikibot.tools import itergroup, prefetch
+        if groupsize is None:
+            sublists = self._preloadsublists(pagelist)
+        else:
+            sublists = itergroup(pagelist, groupsize)
+        groups = (self._preloadgroup(sublist, templates, langlinks)
+                  for sublist in sublists)
+        if lookahead > 0:
+            groups = prefetch(groups, lookahead)
+        for group in groups:
+            for page in group:
+                yield page
+
+    def _preloadsublists(self, pagelist):
+        """Split pagelist into lists sized by the site's L{api.BatchSizer}."""
+        sizer = api.batch_sizer(self)
+        pagelist = iter(pagelist)
+        while True:
+            sublist = list(itertools.islice(pagelist, sizer.get()))
+            if not sublist:
+                return
+            yield sublist
+
+    def _preloadgroup(self, sublist, templates, langlinks):
+        """Preload a list of pages with a single query; return the pages.
+
+        If the server times out, the list is split in two halves which are
+        retrieved separately.
+
+        """
+        pageids = [str(p._pageid) for p in sublist
+                                  if hasattr(p, "_pageid")
+                                     and p._pageid > 0]
+        cache = dict((p.title(withSection=False), p) for p in sublist)
+
+        props = "revisions|info|categoryinfo"
+        if templates:
+            props += '|templates'
+        if langlinks:
+            props += '|langlinks'
+        rvgen = api.PropertyGenerator(props, site=self,
+                                      retry_timeouts=len(sublist) < 2)
+        rvgen.set_maximum_items(-1) # suppress use of "rvlimit" parameter
+        if len(pageids) == len(sublist):
+            # only use pageids if all pages have them
+            rvgen.request["pageids"] = "|".join(pageids)
+        else:
+            rvgen.request["titles"] = "|".join(cache.keys())
+        rvgen.request[u"rvprop"] = \
+                u"ids|flags|timestamp|user|comment|content"
+        pywikibot.output(u"Retrieving %s pages from %s."
+                       % (len(cache), self)
+                    )
+        sizer = api.batch_sizer(self)
+        start = time.time()
+        pages = []
+        try:
             for pagedata in rvgen:
-                pywikibot.debug(u"Preloading %s" % pagedata, _logger)
+                if pywikibot.debugging(_logger):
+                    pywikibot.debug(pywikibot.truncated(
+                                        u"Preloading %s" % pagedata),
+                                    _logger)
                 try:
                     if pagedata['title'] not in cache:
                         pywikibot.warning(
@@ -1195,16 +1305,40 @@ class APISite(BaseSite):
                     continue
                 page = cache[pagedata['title']]
                 api.update_page(page, pagedata)
-                yield page
+                if templates and not hasattr(page, "_templates"):
+                    # no templates were returned, so the page uses none
+                    page._templates = []
+                pages.append(page)
+        except Server504Error:
+            sizer.failed()
+            half = len(sublist) // 2
+            return (self._preloadgroup(sublist[:half], templates, langlinks)
+                    + self._preloadgroup(sublist[half:], templates,
+                                         langlinks))
+        sizer.update(len(pages), rvgen.request.response_size,
+                     time.time() - start)
+        return pages
+
+    # token types which do not depend on the page, and stay valid for the
+    # whole session
+    _session_tokens = ("edit", "move", "delete", "protect", "block",
+                       "unblock", "email", "import", "watch")
 
     def token(self, page, tokentype):
         """Return token retrieved from wiki to allow changing page content.
 
+        Tokens of the types listed in _session_tokens are only retrieved
+        once and then reused for all pages, until the user logs in again
+        or the wiki rejects a token (see L{invalidate_tokens}).  When a
+        token is retrieved, the page information is updated as well.
+
         @param page: the Page for which a token should be retrieved
         @param tokentype: the type of token (e.g., "edit", "move", "delete");
             see API documentation for full list of types
 
         """
+        if tokentype in self._tokens:
+            return self._tokens[tokentype]
         query = api.PropertyGenerator("info|revisions",
                                       titles=page.title(withSection=False),
                                       intoken=tokentype,
@@ -1216,8 +1350,16 @@ class APISite(BaseSite):
                      % (page.title(withSection=False, asLink=True),
                         item['title']))
             api.update_page(page, item)
-            pywikibot.debug(unicode(item), _logger)
-            return item[tokentype + "token"]
+            if pywikibot.debugging(_logger):
+                pywikibot.debug(pywikibot.truncated(unicode(item)), _logger)
+            token = item[tokentype + "token"]
+            if tokentype in self._session_tokens:
+                self._tokens[tokentype] = token
+            return token
+
+    def invalidate_tokens(self):
+        """Discard all cached tokens, so that they are retrieved again."""
+        self._tokens.clear()
 
     # following group of methods map more-or-less directly to API queries
 
@@ -2311,6 +2453,16 @@ u"allpages: 'includeRedirects' argument is deprecated; use 'filterredirs'.",
             rngen.request["grnredirect"] = ""
         return rngen
 
+    def _lastrevid(self, page):
+        """Return the id of the latest revision of page on the wiki, without
+        updating the Page object, or None if the page does not exist."""
+        query = self._generator(api.PropertyGenerator, type_arg="info",
+                                titles=page.title(withSection=False
+                                                  ).encode(self.encoding()))
+        for pageitem in query:
+            return pageitem.get("lastrevid")
+        return None
+
     # catalog of editpage error codes, for use in generating messages
     _ep_errors = {
         "noapiwrite": "API editing not enabled on %(site)s wiki",
@@ -2343,9 +2495,15 @@ redirects on %(site)s wiki""",
     }
 
     def editpage(self, page, summary, minor=True, notminor=False,
-                 bot=True, recreate=True, createonly=False, watch=None):
+                 bot=True, recreate=True, createonly=False, watch=None,
+                 checkrevid=None):
         """Submit an edited Page object to be saved to the wiki.
 
+        If the page was loaded before, its latest revision is compared to
+        the current one on the wiki, unless checkrevid is False.  Pages that
+        were not loaded are loaded here, so the text is saved over their
+        current revision; only the server can detect conflicts then.
+
         @param page: The Page to be saved; its .text property will be used
             as the new text to be saved to the wiki
         @param token: the edit token retrieved using Site.token()
@@ -2364,27 +2522,36 @@ redirects on %(site)s wiki""",
             * preferences: use the preference settings (Default)
             * nochange: don't change the watchlist
         @param botflag: if True, mark edit with bot flag
+        @param checkrevid: if True, check with a prop=info query whether the
+            page has been changed since it was loaded, and raise an
+            EditConflict if so; defaults to config.edit_check_lastrevid
         @return: True if edit succeeded, False if it failed
 
         """
         text = page.text
         if not text:
             raise Error("editpage: no text to be saved")
+        if checkrevid is None:
+            checkrevid = config.edit_check_lastrevid
+        # the page was loaded before, and did not exist then
+        missing = getattr(page, "_pageid", None) == 0 \
+                  and not hasattr(page, "_revid")
+        loaded = missing or hasattr(page, "_revid")
         try:
+            if missing:
+                raise NoPage(page)
             lastrev = page.latestRevision()
         except NoPage:
             lastrev = None
             if not recreate:
                 raise
         token = self.token(page, "edit")
-        # getting token also updates the 'lastrevid' value, which allows us to
-        # detect if page has been changed since last time text was retrieved.
-
-        # note that the server can still return an 'editconflict' error
-        # if the page is updated after the token is retrieved but
-        # before the page is saved.
         self.lock_page(page)
-        if lastrev is not None and page.latestRevision() != lastrev:
+        # the token is usually cached, so it does not tell whether the page
+        # has been changed since it was loaded; the server only compares
+        # the basetimestamp to the current revision
+        if checkrevid and loaded and self._lastrevid(page) != lastrev:
+            self.unlock_page(page)
             raise EditConflict(
                 "editpage: Edit conflict detected; saving aborted.")
         params = dict(action="edit",
@@ -2392,7 +2559,7 @@ redirects on %(site)s wiki""",
                       text=text, token=token, summary=summary)
         if bot:
             params["bot"] = ""
-        if lastrev is not None:
+        if lastrev in page._revisions:
             params["basetimestamp"] = page._revisions[lastrev].timestamp
         if minor:
             params['minor'] = ""
@@ -2413,12 +2580,19 @@ redirects on %(site)s wiki""",
 ##        md5hash.update(urllib.quote_plus(text.encode(self.encoding())))
 ##        params['md5'] = md5hash.digest()
         req = api.Request(site=self, **params)
+        newtoken = False
         while True:
             try:
                 result = req.submit()
                 pywikibot.debug(u"editpage response: %s" % result,
                                 _logger)
             except api.APIError, err:
+                if err.code == "badtoken" and not newtoken:
+                    # the cached token has expired; the cache has been
+                    # cleared, so this retrieves a new one
+                    newtoken = True
+                    req['token'] = self.token(page, "edit")
+                    continue
                 self.unlock_page(page)
                 if err.code.endswith("anon") and self.logged_in():
                     pywikibot.debug(
@@ -2750,11 +2924,18 @@ u"([[User talk:%(last_user)s|Talk]]) to last version by %(prev_user)s"
                 for image in self.allimages(sha1=hash_found)]
 
     def upload(self, imagepage, source_filename=None, source_url=None,
-               comment=None, watch=False, ignore_warnings=False):
+               comment=None, watch=False, ignore_warnings=False,
+               chunk_size=None, _file_key=None, _offset=0):
         """Upload a file to the wiki.
 
         Either source_filename or source_url, but not both, must be provided.
 
+        Local files larger than chunk_size are uploaded in chunks, if the
+        wiki supports it.  The chunks are kept in the upload stash of the
+        user until the whole file is uploaded.  If the upload is interrupted,
+        it can be resumed by passing the file key and the offset reported
+        in the error message.
+
         @param imagepage: an ImagePage object from which the wiki-name of the
             file will be obtained.
         @param source_filename: path to the file to be uploaded
@@ -2764,6 +2945,11 @@ u"([[User talk:%(last_user)s|Talk]]) to last version by %(prev_user)s"
         @param watch: If true, add imagepage to the bot user's watchlist
         @param ignore_warnings: if true, ignore API warnings and force
             upload (for example, to overwrite an existing file); default False
+        @param chunk_size: the size of the chunks in bytes; defaults to
+            config.upload_chunk_size. If 0, the file is uploaded in a single
+            request.
+        @param _file_key: the file key of a partial chunked upload to resume
+        @param _offset: the number of bytes of the partial upload
 
         """
         upload_warnings = {
@@ -2810,12 +2996,32 @@ u"([[User talk:%(last_user)s|Talk]]) to last version by %(prev_user)s"
                 raise ValueError("File '%s' does not exist."
                                  % source_filename)
             filesize = os.path.getsize(source_filename)
-            # TODO: if file size exceeds some threshold (to be determined),
-            #       upload by chunks
-            req = api.Request(site=self, action="upload", token=token,
-                              filename=imagepage.title(withNamespace=False),
-                              file=source_filename, comment=comment,
-                              mime=True)
+            if chunk_size is None:
+                chunk_size = config.upload_chunk_size
+            # chunked uploads need MediaWiki 1.19; the version of the
+            # family file may be older than the one the wiki runs
+            version = self.live_version()
+            if _file_key or (chunk_size and filesize > chunk_size
+                             and version is not None
+                             and version[:2] >= (1, 19)):
+                result, digest = self._upload_chunks(
+                                     imagepage, source_filename, filesize,
+                                     chunk_size, token, ignore_warnings,
+                                     _file_key, _offset)
+                if result["result"] == "Warning":
+                    req = None
+                else:
+                    # publish the stashed file
+                    req = api.Request(site=self, action="upload",
+                                      token=token, filekey=result["filekey"],
+                                      filename=imagepage.title(
+                                                   withNamespace=False),
+                                      comment=comment)
+            else:
+                req = api.Request(site=self, action="upload", token=token,
+                                  filename=imagepage.title(withNamespace=False),
+                                  file=source_filename, comment=comment,
+                                  mime=True)
         else:
             # upload by URL
             if "upload_by_url" not in self.userinfo["rights"]:
@@ -2825,16 +3031,18 @@ u"([[User talk:%(last_user)s|Talk]]) to last version by %(prev_user)s"
             req = api.Request(site=self, action="upload", token=token,
                               filename=imagepage.title(withNamespace=False),
                               url=source_url, comment=comment)
-        if watch:
-            req["watch"] = ""
-        if ignore_warnings:
-            req["ignorewarnings"] = ""
-        try:
-            result = req.submit()
-        except api.APIError, err:
-            # TODO: catch and process foreseeable errors
-            raise
-        result = result["upload"]
+        if req is not None:
+            digest = None
+            if watch:
+                req["watch"] = ""
+            if ignore_warnings:
+                req["ignorewarnings"] = ""
+            try:
+                result = req.submit()
+            except api.APIError, err:
+                # TODO: catch and process foreseeable errors
+                raise
+            result = result["upload"]
         pywikibot.debug(result, _logger)
         if "warnings" in result:
             warning = result["warnings"].keys()[0]
@@ -2847,8 +3055,75 @@ u"([[User talk:%(last_user)s|Talk]]) to last version by %(prev_user)s"
         if result["result"] == "Success":
             pywikibot.output(u"Upload successful.")
             imagepage._imageinfo = result["imageinfo"]
+            if digest is not None and "sha1" in result["imageinfo"] \
+                    and result["imageinfo"]["sha1"] != digest:
+                pywikibot.warning(
+                    u"Upload: SHA-1 of %s does not match the local file."
+                    % imagepage.title(asLink=True))
             return
 
+    def _upload_chunks(self, imagepage, source_filename, filesize,
+                       chunk_size, token, ignore_warnings, file_key, offset):
+        """Upload a local file in chunks to the upload stash.
+
+        The SHA-1 of the file is computed from the chunks as they are
+        sent; the file is only read separately for the part that was
+        uploaded before.
+
+        @return: a tuple of the last "upload" result of the API and the
+            hex digest of the file
+
+        """
+        digest = self._file_digest(source_filename, offset)
+        while True:
+            length = min(chunk_size or filesize, filesize - offset)
+            req = api.Request(site=self, action="upload", token=token,
+                              filename=imagepage.title(withNamespace=False),
+                              stash="", filesize=str(filesize),
+                              offset=str(offset), chunk=source_filename,
+                              file_range=(offset, length), mime=True,
+                              digest=digest)
+            if file_key:
+                req["filekey"] = file_key
+            if ignore_warnings:
+                req["ignorewarnings"] = ""
+            try:
+                result = req.submit()["upload"]
+            except api.APIError:
+                if file_key:
+                    pywikibot.error(
+                        u"Chunked upload of %s interrupted at byte %d; "
+                        u"file key %s" % (source_filename, offset, file_key))
+                raise
+            file_key = result.get("filekey", file_key)
+            if result["result"] != "Continue":
+                return result, req.digest.hexdigest()
+            # continue at the offset reported by the wiki
+            newoffset = int(result["offset"])
+            if newoffset == offset + length:
+                digest = req.digest
+            else:
+                digest = self._file_digest(source_filename, newoffset)
+            offset = newoffset
+            pywikibot.output(u"Uploaded %d of %d bytes." % (offset, filesize))
+
+    def _file_digest(self, filename, length, blocksize=65536):
+        """Return the SHA-1 hash object of the first length bytes of a file."""
+        digest = sha1()
+        if not length:
+            return digest
+        f = open(filename, "rb")
+        try:
+            while length > 0:
+                data = f.read(min(blocksize, length))
+                if not data:
+                    break
+                digest.update(data)
+                length -= len(data)
+        finally:
+            f.close()
+        return digest
+
 
 #### METHODS NOT IMPLEMENTED YET ####
 class NotImplementedYet:
@@ -15,6 +15,7 @@ __version__ = '$Id$'
 
 
 import pywikibot
+import bisect
 import re
 
 from pywikibot.i18n import translate
@@ -31,6 +32,285 @@ def unescape(s):
     return s
 
 
+# Regular expressions for the exception names understood by replaceExcept()
+# that do not depend on the site.
+_exceptionRegexes = {
+    'comment':     re.compile(r'(?s)<!--.*?-->'),
+    # section headers
+    'header':      re.compile(r'\r\n=+.+=+ *\r\n'),
+    # preformatted text
+    'pre':         re.compile(r'(?ism)<pre>.*?</pre>'),
+    'source':      re.compile(r'(?is)<source .*?</source>'),
+    # inline references
+    'ref':         re.compile(r'(?ism)<ref[ >].*?</ref>'),
+    # lines that start with a space are shown in a monospace font and
+    # have whitespace preserved.
+    'startspace':  re.compile(r'(?m)^ (.*?)$'),
+    # tables often have whitespace that is used to improve wiki
+    # source code readability.
+    # TODO: handle nested tables.
+    'table':       re.compile(r'(?ims)^{\|.*?^\|}|<table>.*?</table>'),
+    # templates with parameters often have whitespace that is used to
+    # improve wiki source code readability.
+    # 'template':    re.compile(r'(?s){{.*?}}'),
+    # The regex above fails on nested templates. This regex can handle
+    # templates cascaded up to level 2, but no deeper. For arbitrary
+    # depth, we'd need recursion which can't be done in Python's re.
+    # After all, the language of correct parenthesis words is not regular.
+    'template':    re.compile(r'(?s){{(({{.*?}})|.)*}}'),
+    'gallery':     re.compile(r'(?is)<gallery.*?>.*?</gallery>'),
+    # this matches internal wikilinks, but also interwiki, categories, and
+    # images.
+    'link':        re.compile(r'\[\[[^\]\|]*(\|[^\]]*)?\]\]'),
+}
+
+# matches group references such as \2 or \g<name> in replacement strings
+_groupR = re.compile(r'\\(?P<number>\d+)|\\g<(?P<name>.+?)>')
+
+# Caches used by replaceExcept(); they are simply emptied when they grow
+# larger than _MAXCACHE entries.
+_MAXCACHE = 1000
+_siteExceptionRegexes = {}  # (site, exception name) -> compiled regex
+_patternCache = {}          # (pattern, flags) -> compiled regex
+_planCache = {}             # replaceExcept() arguments -> ReplacementPlan
+# the protected regions last computed for each list of exception regexes,
+# so that ReplacementSets with the same exceptions can share them
+_spansCache = {}            # exception regexes -> (text, spans)
+
+
+def clear_exception_cache(site=None):
+    """Forget the compiled exception regexes of site (or of all sites).
+
+    Must be called when the namespaces or language links of a site change.
+
+    """
+    if site is None:
+        _siteExceptionRegexes.clear()
+        _planCache.clear()
+    else:
+        for key in _siteExceptionRegexes.keys():
+            if key[0] == site:
+                _siteExceptionRegexes.pop(key, None)
+        for key in _planCache.keys():
+            if key[-1] == site:
+                _planCache.pop(key, None)
+    _spansCache.clear()
+
+
+def _compile(pattern, flags=0):
+    """Return a compiled regular expression, using a cache."""
+    key = (pattern, flags)
+    try:
+        return _patternCache[key]
+    except KeyError:
+        if len(_patternCache) >= _MAXCACHE:
+            _patternCache.clear()
+        regex = _patternCache[key] = re.compile(pattern, flags)
+        return regex
+
+
+def get_exception_regex(name, site):
+    """Return the compiled regex for the exception name on site.
+
+    The name is one of those that can be given to replaceExcept().  Each
+    regex is built when it is first requested, so that the information
+    about the site it needs (such as the language links for 'interwiki')
+    is only loaded if it is used.
+
+    """
+    if name in _exceptionRegexes:
+        return _exceptionRegexes[name]
+    if name == 'hyperlink':
+        # the same for all sites
+        site = None
+    try:
+        return _siteExceptionRegexes[site, name]
+    except KeyError:
+        pass
+    if name == 'hyperlink':
+        regex = compileLinkR()
+    elif name == 'interwiki':
+        # also finds links to foreign sites with preleading ":"
+        regex = re.compile(r'(?i)\[\[:?(%s)\s?:[^\]]*\]\][\s]*'
+                           % '|'.join(site.validLanguageLinks()
+                                      + site.family.obsolete.keys()))
+    else:
+        raise KeyError(name)
+    _siteExceptionRegexes[site, name] = regex
+    return regex
+
+
+class ReplacementPlan(object):
+    """A precompiled replacement, for use on many texts.
+
+    Takes the same arguments as replaceExcept() (without text and marker),
+    compiles all regular expressions and parses the replacement string
+    once; apply() then performs the replacement on a given text.
+
+    >>> plan = ReplacementPlan(r'colou?r', u'color', ['comment', 'nowiki'])
+    >>> plan.apply(u'colour <!-- colour -->')
+    u'color <!-- colour -->'
+
+    """
+    def __init__(self, old, new, exceptions, caseInsensitive=False,
+                 allowoverlap=False, site=None):
+        if site is None:
+            site = pywikibot.getSite()
+        self.site = site
+        self.allowoverlap = allowoverlap
+
+        # if we got a string, compile it as a regular expression
+        if isinstance(old, basestring):
+            if caseInsensitive:
+                old = _compile(old, re.IGNORECASE | re.UNICODE)
+            else:
+                old = _compile(old)
+        self.old = old
+        self.dontTouchRegexes = self.compileExceptions(exceptions, site)
+
+        if callable(new):
+            # the parameter new can be a function which takes the match
+            # as a parameter.
+            self.new = new
+            self.parts = None
+        else:
+            # it is a little hack to make \n work. It would be better
+            # to fix it previously, but better than nothing.
+            self.new = new.replace('\\n', '\n')
+            # We cannot just insert the new string, as it may contain regex
+            # group references such as \2 or \g<name>.
+            # On the other hand, this approach does not work because it
+            # can't handle lookahead or lookbehind (see bug #1731008):
+            #replacement = old.sub(new, text[match.start():match.end()])
+            #text = text[:match.start()] + replacement + text[match.end():]
+            # So we split the replacement into literal text and group
+            # references here, and fill in the groups for every match.
+            self.parts = []
+            pos = 0
+            for groupMatch in _groupR.finditer(self.new):
+                groupID = groupMatch.group('name') or \
+                          int(groupMatch.group('number'))
+                self.parts.append(self.new[pos:groupMatch.start()])
+                self.parts.append(groupID)
+                pos = groupMatch.end()
+            self.parts.append(self.new[pos:])
+
+    def __getstate__(self):
+        # the site is only needed to compile the exceptions, which is
+        # done; copies in the worker processes of xmlreader do without it
+        state = self.__dict__.copy()
+        state['site'] = None
+        return state
+
+    @staticmethod
+    def compileExceptions(exceptions, site):
+        """Return the list of regexes for an exceptions list."""
+        dontTouchRegexes = []
+        for exc in exceptions:
+            if isinstance(exc, basestring):
+                # assume it's a reference to the exception regexes
+                # dictionary defined above.
+                if exc in _exceptionRegexes \
+                        or exc in ('hyperlink', 'interwiki'):
+                    dontTouchRegexes.append(get_exception_regex(exc, site))
+                else:
+                    # nowiki, noinclude, includeonly, timeline, math ond other
+                    # extensions
+                    dontTouchRegexes.append(_compile(r'(?is)<%s>.*?</%s>'
+                                                     % (exc, exc)))
+                # handle alias
+                if exc == 'source':
+                    dontTouchRegexes.append(_compile(
+                        r'(?is)<syntaxhighlight .*?</syntaxhighlight>'))
+            else:
+                # assume it's a regular expression
+                dontTouchRegexes.append(exc)
+        return dontTouchRegexes
+
+    def replacement(self, match):
+        """Return the replacement text for a match of self.old."""
+        if self.parts is None:
+            return self.new(match)
+        if len(self.parts) == 1:
+            return self.parts[0]
+        result = []
+        for i in xrange(len(self.parts)):
+            if i % 2:
+                result.append(match.group(self.parts[i]))
+            else:
+                result.append(self.parts[i])
+        return u''.join(result)
+
+    def apply(self, text, marker=''):
+        """Return text with the replacement performed.
+
+        @param marker: a string that will be added to the last replacement;
+            if nothing is changed, it is added at the end
+
+        """
+        text, markerpos, count = self._scan(text, 0)
+        return text[:markerpos] + marker + text[markerpos:]
+
+    def _scan(self, text, index):
+        """Perform the replacement on text, starting at index.
+
+        @return: the new text, the position after the last replacement
+            (the end of the text if nothing was replaced) and the number
+            of replacements made
+
+        """
+        old = self.old
+        markerpos = len(text)
+        count = 0
+        # The next match of each exception regex; as long as that match
+        # starts at or after the current search position, it is still
+        # valid and the regex does not need to be searched again.
+        excMatches = [None] * len(self.dontTouchRegexes)
+        while True:
+            match = old.search(text, index)
+            if not match:
+                # nothing left to replace
+                break
+
+            # check which exception will occur next.
+            nextExceptionMatch = None
+            for i in xrange(len(excMatches)):
+                excMatch = excMatches[i]
+                if excMatch is not False and (excMatch is None
+                                              or excMatch.start() < index):
+                    excMatch = self.dontTouchRegexes[i].search(text, index)
+                    if excMatch is None:
+                        # this exception does not occur anymore
+                        excMatch = False
+                    excMatches[i] = excMatch
+                if excMatch and (
+                        nextExceptionMatch is None or
+                        excMatch.start() < nextExceptionMatch.start()):
+                    nextExceptionMatch = excMatch
+
+            if nextExceptionMatch is not None \
+                    and nextExceptionMatch.start() <= match.start():
+                # an HTML comment or text in nowiki tags stands before the next
+                # valid match. Skip.
+                index = nextExceptionMatch.end()
+            else:
+                # We found a valid match. Replace it.
+                replacement = self.replacement(match)
+                text = text[:match.start()] + replacement + text[match.end():]
+                count += 1
+                # the text has changed, so the exception matches found so
+                # far are no longer valid
+                excMatches = [None] * len(excMatches)
+
+                # continue the search on the remaining text
+                if self.allowoverlap:
+                    index = match.start() + 1
+                else:
+                    index = match.start() + len(replacement)
+                markerpos = match.start() + len(replacement)
+        return text, markerpos, count
+
+
 def replaceExcept(text, old, new, exceptions, caseInsensitive=False,
                   allowoverlap=False, marker = '', site = None):
     """
@@ -54,138 +334,189 @@ def replaceExcept(text, old, new, exceptions, caseInsensitive=False,
         marker          - a string that will be added to the last replacement;
                           if nothing is changed, it is added at the end
 
+    The compiled form of each combination of arguments is cached; use
+    ReplacementPlan directly to keep it around explicitly, or if new is a
+    function.
+
     """
     if site is None:
         site = pywikibot.getSite()
+    key = plan = None
+    # functions given as 'new' are often created anew for every call, so
+    # caching them would only keep them alive
+    if isinstance(new, basestring):
+        try:
+            key = (old, new, tuple(exceptions), caseInsensitive,
+                   allowoverlap, site)
+            plan = _planCache.get(key)
+        except TypeError:
+            # unhashable argument
+            key = None
+    if plan is None:
+        plan = ReplacementPlan(old, new, exceptions, caseInsensitive,
+                               allowoverlap, site)
+        if key is not None:
+            if len(_planCache) >= _MAXCACHE:
+                _planCache.clear()
+            _planCache[key] = plan
+    return plan.apply(text, marker)
+
+
+class ReplacementSet(object):
+    """An ordered list of replacements that share the same exceptions.
+
+    This is meant for bots that apply many replacements (such as a fix
+    from fixes.py) to many pages.  Instead of searching all exception
+    regexes again after every match, as replaceExcept() does, the regions
+    protected by the exceptions are computed once as a sorted list of
+    intervals, and the first match of each replacement outside of those
+    intervals is found with a single scan.  Most replacements do not
+    match at all, so the intervals rarely have to be computed again.
+
+    Once a replacement has been made, the rest of the text is searched
+    as it stands after that replacement, exactly as replaceExcept() does,
+    so that patterns with lookbehind or word boundaries see the new text.
+    The replacements are applied in order, and the result is the same as
+    that of repeated replaceExcept() calls.
+
+    >>> rs = ReplacementSet([(u'colour', u'color'), (u'centre', u'center')],
+    ...                     ['comment'])
+    >>> rs.apply(u'colour centre <!-- colour -->')
+    (u'color center <!-- colour -->', [1, 1])
 
-    exceptionRegexes = {
-        'comment':     re.compile(r'(?s)<!--.*?-->'),
-        # section headers
-        'header':      re.compile(r'\r\n=+.+=+ *\r\n'),
-        # preformatted text
-        'pre':         re.compile(r'(?ism)<pre>.*?</pre>'),
-        'source':      re.compile(r'(?is)<source .*?</source>'),
-        # inline references
-        'ref':         re.compile(r'(?ism)<ref[ >].*?</ref>'),
-        # lines that start with a space are shown in a monospace font and
-        # have whitespace preserved.
-        'startspace':  re.compile(r'(?m)^ (.*?)$'),
-        # tables often have whitespace that is used to improve wiki
-        # source code readability.
-        # TODO: handle nested tables.
-        'table':       re.compile(r'(?ims)^{\|.*?^\|}|<table>.*?</table>'),
-        # templates with parameters often have whitespace that is used to
-        # improve wiki source code readability.
-        # 'template':    re.compile(r'(?s){{.*?}}'),
-        # The regex above fails on nested templates. This regex can handle
-        # templates cascaded up to level 2, but no deeper. For arbitrary
-        # depth, we'd need recursion which can't be done in Python's re.
-        # After all, the language of correct parenthesis words is not regular.
-        'template':    re.compile(r'(?s){{(({{.*?}})|.)*}}'),
-        'hyperlink':   compileLinkR(),
-        'gallery':     re.compile(r'(?is)<gallery.*?>.*?</gallery>'),
-        # this matches internal wikilinks, but also interwiki, categories, and
-        # images.
-        'link':        re.compile(r'\[\[[^\]\|]*(\|[^\]]*)?\]\]'),
-        # also finds links to foreign sites with preleading ":"
-        'interwiki':   re.compile(r'(?i)\[\[:?(%s)\s?:[^\]]*\]\][\s]*'
-                                   % '|'.join(site.validLanguageLinks()
-                                              + site.family.obsolete.keys())
-                                  ),
-
-    }
-
-    # if we got a string, compile it as a regular expression
-    if type(old) in  [str, unicode]:
-        if caseInsensitive:
-            old = re.compile(old, re.IGNORECASE | re.UNICODE)
-        else:
-            old = re.compile(old)
-
-    dontTouchRegexes = []
-    for exc in exceptions:
-        if isinstance(exc, str) or isinstance(exc, unicode):
-            # assume it's a reference to the exceptionRegexes dictionary
-            # defined above.
-            if exc in exceptionRegexes:
-                dontTouchRegexes.append(exceptionRegexes[exc])
-            else:
-                # nowiki, noinclude, includeonly, timeline, math ond other
-                # extensions
-                dontTouchRegexes.append(re.compile(r'(?is)<%s>.*?</%s>'
-                                                   % (exc, exc)))
-            # handle alias
-            if exc == 'source':
-                dontTouchRegexes.append(re.compile(
-                    r'(?is)<syntaxhighlight .*?</syntaxhighlight>'))
-        else:
-            # assume it's a regular expression
-            dontTouchRegexes.append(exc)
-    index = 0
-    markerpos = len(text)
-    while True:
-        match = old.search(text, index)
-        if not match:
-            # nothing left to replace
-            break
-
-        # check which exception will occur next.
-        nextExceptionMatch = None
-        for dontTouchR in dontTouchRegexes:
-            excMatch = dontTouchR.search(text, index)
-            if excMatch and (
-                    nextExceptionMatch is None or
-                    excMatch.start() < nextExceptionMatch.start()):
-                nextExceptionMatch = excMatch
-
-        if nextExceptionMatch is not None \
-                and nextExceptionMatch.start() <= match.start():
-            # an HTML comment or text in nowiki tags stands before the next
-            # valid match. Skip.
-            index = nextExceptionMatch.end()
-        else:
-            # We found a valid match. Replace it.
-            if callable(new):
-                # the parameter new can be a function which takes the match
-                # as a parameter.
-                replacement = new(match)
-            else:
-                # it is not a function, but a string.
-
-                # it is a little hack to make \n work. It would be better
-                # to fix it previously, but better than nothing.
-                new = new.replace('\\n', '\n')
-
-                # We cannot just insert the new string, as it may contain regex
-                # group references such as \2 or \g<name>.
-                # On the other hand, this approach does not work because it
-                # can't handle lookahead or lookbehind (see bug #1731008):
-                #replacement = old.sub(new, text[match.start():match.end()])
-                #text = text[:match.start()] + replacement + text[match.end():]
-
-                # So we have to process the group references manually.
-                replacement = new
-
-                groupR = re.compile(r'\\(?P<number>\d+)|\\g<(?P<name>.+?)>')
-                while True:
-                    groupMatch = groupR.search(replacement)
-                    if not groupMatch:
-                        break
-                    groupID = groupMatch.group('name') or \
-                              int(groupMatch.group('number'))
-                    replacement = replacement[:groupMatch.start()] + \
-                                  match.group(groupID) + \
-                                  replacement[groupMatch.end():]
-            text = text[:match.start()] + replacement + text[match.end():]
-
-            # continue the search on the remaining text
-            if allowoverlap:
-                index = match.start() + 1
-            else:
-                index = match.start() + len(replacement)
-            markerpos = match.start() + len(replacement)
-    text = text[:markerpos] + marker + text[markerpos:]
-    return text
+    """
+    def __init__(self, replacements, exceptions, caseInsensitive=False,
+                 allowoverlap=False, site=None):
+        """
+        @param replacements: list of (old, new) tuples, as the old and new
+            arguments of replaceExcept()
+        @param exceptions: list of exceptions, as for replaceExcept()
+        @param allowoverlap: if True, replace overlapping occurences; this
+            uses the replaceExcept() algorithm for every replacement
+
+        """
+        if site is None:
+            site = pywikibot.getSite()
+        self.site = site
+        self.allowoverlap = allowoverlap
+        self.plans = [ReplacementPlan(old, new, exceptions, caseInsensitive,
+                                      allowoverlap, site)
+                      for (old, new) in replacements]
+        self.dontTouchRegexes = ReplacementPlan.compileExceptions(exceptions,
+                                                                  site)
+
+    def __getstate__(self):
+        # see ReplacementPlan.__getstate__
+        state = self.__dict__.copy()
+        state['site'] = None
+        return state
+
+    def protected_spans(self, text):
+        """Return the regions of text in which nothing may be replaced.
+
+        The result for the last text is remembered for all ReplacementSets
+        with the same exceptions, so that applying several of them to the
+        same text computes the regions only once.
+
+        @return: a tuple of two lists (starts, ends) of the same length;
+            the regions do not overlap and are sorted by position.
+
+        """
+        key = tuple(self.dontTouchRegexes)
+        try:
+            cached = _spansCache.get(key)
+        except TypeError:
+            # unhashable exception regex
+            key = cached = None
+        if cached is not None and cached[0] is text:
+            return cached[1]
+        spans = self._find_spans(text)
+        if key is not None:
+            if len(_spansCache) >= _MAXCACHE:
+                _spansCache.clear()
+            _spansCache[key] = (text, spans)
+        return spans
+
+    def _find_spans(self, text):
+        starts = []
+        ends = []
+        nextMatches = [None] * len(self.dontTouchRegexes)
+        index = 0
+        while True:
+            first = None
+            for i in xrange(len(nextMatches)):
+                excMatch = nextMatches[i]
+                if excMatch is not False and (excMatch is None
+                                              or excMatch.start() < index):
+                    excMatch = self.dontTouchRegexes[i].search(text, index)
+                    if excMatch is None:
+                        excMatch = False
+                    nextMatches[i] = excMatch
+                if excMatch and (first is None
+                                 or excMatch.start() < first.start()):
+                    first = excMatch
+            if first is None:
+                return starts, ends
+            starts.append(first.start())
+            ends.append(first.end())
+            index = max(first.end(), first.start() + 1)
+
+    def _replace(self, plan, text, match, starts, ends):
+        """Perform one replacement, skipping the protected regions.
+
+        The protected regions are used to find the first match outside of
+        them; from there on, the text is searched again after every
+        replacement, as ReplacementPlan.apply() does.
+
+        @param match: the first match of plan.old in text
+        @return: the new text and the number of replacements made
+
+        """
+        while match:
+            start = match.start()
+            i = bisect.bisect_right(starts, start) - 1
+            if i >= 0 and (start < ends[i] or start == starts[i]):
+                # the match starts in a protected region; skip the region
+                index = max(ends[i], start + 1)
+                if index > len(text):
+                    break
+                match = plan.old.search(text, index)
+                continue
+            replacement = plan.replacement(match)
+            text = text[:start] + replacement + text[match.end():]
+            text, markerpos, count = plan._scan(text,
+                                                start + len(replacement))
+            return text, count + 1
+        return text, 0
+
+    def apply(self, text):
+        """Apply all replacements to text.
+
+        @return: a tuple of the new text and a list which contains, for
+            each replacement, the number of times it was made (with
+            allowoverlap, 1 if the replacement changed the text)
+
+        """
+        counts = [0] * len(self.plans)
+        spans = None
+        for n in xrange(len(self.plans)):
+            plan = self.plans[n]
+            if self.allowoverlap:
+                newtext = plan.apply(text)
+                if newtext != text:
+                    counts[n] = 1
+                    text = newtext
+                continue
+            match = plan.old.search(text)
+            if not match:
+                continue
+            if spans is None:
+                spans = self.protected_spans(text)
+            newtext, counts[n] = self._replace(plan, text, match, *spans)
+            if newtext != text:
+                spans = None
+                text = newtext
+        return text, counts
 
 
 def removeDisabledParts(text, tags = ['*']):
@@ -124,6 +124,62 @@ def itergroup(iterable, size):
         yield group
 
 
+def prefetch(iterable, size):
+    """Iterate over iterable, retrieving up to size items in advance.
+
+    The items are taken from iterable in a background thread, so that slow
+    operations of the iterable (such as API requests) overlap with the
+    processing of the items already retrieved.  The order of the items is
+    kept, and exceptions raised by iterable are re-raised in the calling
+    thread.  If the caller stops iterating early, the background thread
+    stops after the item it is retrieving.
+
+    >>> print list(prefetch(xrange(5), 2))
+    [0, 1, 2, 3, 4]
+
+    """
+    queue = Queue.Queue(max(1, size))
+    stopped = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stopped.isSet():
+            try:
+                queue.put(item, True, 0.25)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def run():
+        try:
+            for item in iterable:
+                if not put((None, item)):
+                    return
+        except Exception:
+            put((sys.exc_info(), None))
+            return
+        put((None, done))
+
+    thread = threading.Thread(target=run, name="PrefetchThread")
+    thread.setDaemon(True)
+    thread.start()
+    try:
+        while True:
+            # use a timeout, so that KeyboardInterrupt is not blocked
+            try:
+                exc_info, item = queue.get(True, 0.25)
+            except Queue.Empty:
+                continue
+            if exc_info is not None:
+                raise exc_info[0], exc_info[1], exc_info[2]
+            if item is done:
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
 class ThreadList(list):
     """A simple threadpool class to limit the number of simultaneous threads.
 
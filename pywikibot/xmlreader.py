@@ -0,0 +1,370 @@
+# -*- coding: utf-8  -*-
+"""
+Streaming reader for MediaWiki XML dumps.
+
+Dumps can be downloaded from http://download.wikimedia.org/ and are read
+with the XmlDump class:
+
+    >>> from pywikibot import xmlreader
+    >>> dump = xmlreader.XmlDump('dewiki-latest-pages-articles.xml.bz2')
+    >>> for entry in dump.parse():
+    ...     if 'Foobar' in entry.text:
+    ...         print entry.title
+
+The file is parsed incrementally and every page element is discarded as
+soon as its entry has been yielded, so memory use does not grow with the
+size of the dump.  Files ending in .bz2 and .gz are decompressed on the
+fly; .7z files are piped through the external 7za program.
+
+Searching a whole dump is mostly CPU bound.  XmlDump.scan() splits the
+dump into chunks of pages and lets a pool of worker processes parse and
+search them, yielding the titles of matching pages in dump order.
+"""
+#
+# (C) Pywikipedia bot team, 2005-2010
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import bz2
+from collections import deque
+from cStringIO import StringIO
+import gzip
+import os
+import re
+import signal
+import subprocess
+import threading
+from xml.sax.saxutils import escape, unescape
+try:
+    from xml.etree.cElementTree import iterparse
+except ImportError:
+    from xml.etree.ElementTree import iterparse
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+import pywikibot
+from pywikibot import config
+
+_titleR = re.compile(r"<title>(.*?)</title>")
+_entities = {"&quot;": '"', "&#039;": "'"}
+
+# state of a dump scanning worker process, set by _init_worker()
+_worker = None
+
+
+def _init_worker(roottag, namespaces, allrevisions, matcher):
+    global _worker
+    # the bot process handles Ctrl-C and terminates the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker = (roottag, namespaces, allrevisions, matcher)
+
+
+def _scan_chunk(data, state=None):
+    """Return the titles of the entries in data accepted by the matcher."""
+    roottag, namespaces, allrevisions, matcher = state or _worker
+    dump = XmlDump(None, allrevisions)
+    dump.namespaces = namespaces
+    source = StringIO(roottag + data + "</mediawiki>")
+    return [entry.title for entry in dump._parse(source) if matcher(entry)]
+
+
+def _tag(elem):
+    """Return the tag name of elem without its XML namespace."""
+    tag = elem.tag
+    if tag[0] == "{":
+        return tag[tag.index("}") + 1:]
+    return tag
+
+
+def _text(elem):
+    """Return the text content of elem as unicode."""
+    if elem.text is None:
+        return u""
+    return unicode(elem.text)
+
+
+class XmlEntry(object):
+    """A single revision of a page read from an XML dump."""
+
+    __slots__ = ("title", "ns", "id", "revisionid", "timestamp", "username",
+                 "ipedit", "comment", "redirect", "text")
+
+    def __init__(self, title, ns, id, revisionid, timestamp, username,
+                 ipedit, comment, redirect, text):
+        self.title = title
+        self.ns = ns
+        self.id = id
+        self.revisionid = revisionid
+        self.timestamp = timestamp
+        self.username = username
+        self.ipedit = ipedit
+        self.comment = comment
+        self.redirect = redirect
+        self.text = text
+
+    def __repr__(self):
+        return "XmlEntry(%r, revisionid=%r)" % (self.title, self.revisionid)
+
+
+class XmlDump(object):
+    """Represents an XML dump file.
+
+    Usage example:
+
+        >>> dump = XmlDump('enwiki-latest-pages-articles.xml.bz2')
+        >>> for entry in dump.parse():
+        ...     print entry.title
+
+    """
+    def __init__(self, filename, allrevisions=False):
+        """
+        @param filename: path of the dump file; .bz2, .gz and .7z files
+            are decompressed while reading
+        @param allrevisions: if True, yield an entry for every revision
+            in the dump; otherwise only the last revision of each page
+        @type allrevisions: bool
+
+        """
+        self.filename = filename
+        self.allrevisions = allrevisions
+        # namespace prefix -> number, read from the dump's <siteinfo>
+        self.namespaces = {}
+        self.resume = None
+
+    def open(self):
+        """Return a file-like object reading the uncompressed dump."""
+        if self.filename.endswith(".bz2"):
+            return bz2.BZ2File(self.filename, "rb")
+        elif self.filename.endswith(".gz"):
+            return gzip.open(self.filename, "rb")
+        elif self.filename.endswith(".7z"):
+            try:
+                proc = subprocess.Popen(["7za", "e", "-bd", "-so",
+                                         self.filename],
+                                        stdout=subprocess.PIPE,
+                                        stderr=open(os.devnull, "w"))
+            except OSError:
+                raise pywikibot.Error(
+                    u"7za is required to read %s" % self.filename)
+            return proc.stdout
+        return open(self.filename, "rb")
+
+    def parse(self):
+        """Yield an L{XmlEntry} for each page (or revision) in the dump."""
+        source = self.open()
+        try:
+            for entry in self._parse(source):
+                yield entry
+        finally:
+            source.close()
+
+    def scan(self, matcher, start=None, processes=None,
+             chunksize=4 * 1024 * 1024):
+        """Yield the titles of all entries for which matcher(entry) is true.
+
+        The dump is split into chunks of whole pages, which are searched by
+        a pool of worker processes.  Titles are yielded in dump order.  The
+        matcher is sent to the workers, so it has to be picklable: a module
+        level function, or an instance of a module level class.  The
+        workers cannot use the HTTP threads of the bot, so the matcher must
+        not need to query the wiki.
+
+        Worker processes are only started when scan() is called from the
+        main thread, because forking while other threads hold locks can
+        leave the children stuck; in other threads the dump is searched in
+        this process.
+
+        While iterating, the resume attribute holds the title of a page from
+        which the scan can be restarted without missing any matches.
+
+        @param start: skip all pages before the page with this title
+        @param processes: number of worker processes; defaults to
+            config.xml_dump_processes, or to the number of CPUs
+        @param chunksize: approximate number of bytes per chunk
+
+        """
+        if processes is None:
+            processes = config.xml_dump_processes
+        if not processes and multiprocessing is not None:
+            processes = multiprocessing.cpu_count()
+        self.resume = start
+        source = self.open()
+        try:
+            roottag, buf = self._readHeader(source)
+            state = (roottag, dict(self.namespaces), self.allrevisions,
+                     matcher)
+            chunks = self._chunks(source, buf, start, chunksize)
+            if processes <= 1 or multiprocessing is None \
+                    or threading.currentThread().getName() != "MainThread":
+                for first, data in chunks:
+                    self.resume = first
+                    for title in _scan_chunk(data, state):
+                        yield title
+                return
+            pool = multiprocessing.Pool(processes, _init_worker, state)
+            try:
+                # keep a few chunks ahead of the consumer, but do not read
+                # the whole dump into memory if the consumer is slow
+                pending = deque()
+                for first, data in chunks:
+                    pending.append((first,
+                                    pool.apply_async(_scan_chunk, (data,))))
+                    if len(pending) >= 2 * processes:
+                        first, result = pending.popleft()
+                        self.resume = first
+                        for title in result.get():
+                            yield title
+                while pending:
+                    first, result = pending.popleft()
+                    self.resume = first
+                    for title in result.get():
+                        yield title
+                pool.close()
+            finally:
+                pool.terminate()
+                pool.join()
+        finally:
+            source.close()
+
+    def _readHeader(self, source):
+        """Read everything up to the first page of the dump.
+
+        Return the <mediawiki> start tag and the data read after the header.
+        The namespaces of the site are stored in self.namespaces.
+
+        """
+        buf = ""
+        while "<page>" not in buf:
+            block = source.read(65536)
+            if not block:
+                break
+            buf += block
+        pos = buf.find("<page>")
+        if pos < 0:
+            pos = buf.find("</mediawiki>")
+        if pos < 0:
+            pos = len(buf)
+        header, buf = buf[:pos], buf[pos:]
+        for entry in self._parse(StringIO(header + "</mediawiki>")):
+            pass
+        roottag = re.search("<mediawiki[^>]*>", header)
+        if roottag is None:
+            raise pywikibot.Error(u"%s is not a MediaWiki XML dump"
+                                  % self.filename)
+        return roottag.group(), buf
+
+    def _title(self, data, pos=0):
+        match = _titleR.search(data, pos)
+        if match:
+            return unicode(unescape(match.group(1), _entities), "utf-8")
+
+    def _chunks(self, source, buf, start, chunksize):
+        """Yield (first title, data) tuples of chunks of whole pages."""
+        if start:
+            key = "<title>%s</title>" % escape(start.encode("utf-8"),
+                                               {'"': "&quot;"})
+            while key not in buf:
+                block = source.read(chunksize)
+                if not block:
+                    return
+                # keep the page which may contain the title
+                pos = buf.rfind("<page>")
+                buf = buf[max(pos, 0):] + block
+            pos = buf.find(key)
+            buf = buf[buf.rfind("<page>", 0, pos):]
+        while True:
+            block = source.read(chunksize)
+            buf += block
+            end = buf.rfind("</page>")
+            if end < 0:
+                if block:
+                    continue
+                return
+            end += len("</page>")
+            if block and end < chunksize / 2:
+                continue
+            data, buf = buf[:end], buf[end:]
+            yield self._title(data), data
+            if not block:
+                return
+
+    def _parse(self, source):
+        context = iterparse(source, events=("start", "end"))
+        root = None
+        title = ns = pageid = None
+        redirect = False
+        revision = None
+        for event, elem in context:
+            if root is None:
+                root = elem
+            if event == "start":
+                if _tag(elem) == "page":
+                    title = ns = pageid = revision = None
+                    redirect = False
+                continue
+            tag = _tag(elem)
+            if tag == "revision":
+                revision = self._revision(elem, title, ns, pageid, redirect)
+                elem.clear()
+                if self.allrevisions:
+                    yield revision
+            elif tag == "page":
+                if revision is not None and not self.allrevisions:
+                    yield revision
+                elem.clear()
+                # drop the references the root keeps to finished pages
+                root.clear()
+            elif tag == "title":
+                title = _text(elem)
+                ns = self._namespace(title)
+            elif tag == "ns":
+                ns = int(elem.text)
+            elif tag == "id" and pageid is None:
+                # only the first <id> in a page is the page id; the
+                # revision and contributor ids are read by _revision()
+                pageid = elem.text
+            elif tag == "redirect":
+                redirect = True
+            elif tag == "namespace":
+                key = elem.get("key")
+                if key is not None and elem.text:
+                    self.namespaces[_text(elem)] = int(key)
+            elif tag == "siteinfo":
+                elem.clear()
+
+    def _namespace(self, title):
+        """Guess the namespace number of title, for dumps without <ns>."""
+        if ":" in title:
+            prefix = title[:title.index(":")]
+            if prefix in self.namespaces:
+                return self.namespaces[prefix]
+        return 0
+
+    def _revision(self, elem, title, ns, pageid, redirect):
+        revisionid = timestamp = username = comment = None
+        ipedit = False
+        text = u""
+        for child in elem:
+            tag = _tag(child)
+            if tag == "id":
+                revisionid = child.text
+            elif tag == "timestamp":
+                timestamp = child.text
+            elif tag == "contributor":
+                for info in child:
+                    infotag = _tag(info)
+                    if infotag == "username":
+                        username = _text(info)
+                    elif infotag == "ip":
+                        username = _text(info)
+                        ipedit = True
+            elif tag == "comment":
+                comment = _text(child)
+            elif tag == "text":
+                text = _text(child)
+        return XmlEntry(title, ns, pageid, revisionid, timestamp, username,
+                        ipedit, comment, redirect, text)
@@ -37,6 +37,8 @@ Options for "remove" action:
 
 Options for several actions:
  * -rebuild    - reset the database
+ * -refresh    - update the database with the changes made on the wiki since
+                 the last refresh
  * -from:      - The category to move from (for the move option)
                  Also, the category to remove from in the remove option
                  Also, the category to make a list of in the listify option
@@ -56,9 +58,11 @@ Options for several actions:
                  move and remove actions).
 
 For the actions tidy and tree, the bot will store the category structure
-locally in category.dump. This saves time and server load, but if it uses
-these data later, they may be outdated; use the -rebuild parameter in this
-case.
+locally in a database file in the data directory, named after the site (for
+example category-wikipedia-en.db). This saves time and server load, but if it
+uses these data later, they may be outdated; use the -refresh parameter to
+update them with the recent changes on the wiki, or the -rebuild parameter to
+start again from scratch.
 
 For example, to create a new category from a list of persons, type:
 
@@ -88,10 +92,13 @@ __version__ = '$Id$'
 # Distributed under the terms of the MIT license.
 #
 
-import os, re, pickle, bz2
+import os, re, time
+import sqlite3
 import pywikibot
 from pywikibot import catlib, config, pagegenerators
 from pywikibot import i18n
+from pywikibot.data import api
+from pywikibot.tools import itergroup
 import sys
 
 # This is required for the text that is shown when you run this script
@@ -112,109 +119,256 @@ cfd_templates = {
     }
 }
 
+# the CategoryDatabase of main(), saved when the script exits
+catDB = None
+
 
 class CategoryDatabase:
-    '''This is a temporary knowledge base saving for each category the contained
-    subcategories and articles, so that category pages do not need to be loaded
-    over and over again
+    '''This is a knowledge base saving for each category the contained
+    subcategories and articles, and for each page its supercategories, so
+    that category pages do not need to be loaded over and over again.
+
+    The category graph of one site is kept in an SQLite file.  Every page
+    is stored once, as a row with an integer id, and the memberships are
+    stored as pairs of ids, indexed in both directions.  Each category
+    records when its members were loaded, and each page when its
+    supercategories were loaded; nothing is read from the file until it is
+    needed, so the database may hold far more categories than fit into
+    memory.
 
     '''
-    def __init__(self, rebuild = False, filename = 'category.dump.bz2'):
+    # increase when the layout of the tables changes
+    version = 1
+
+    def __init__(self, rebuild=False, filename=None, site=None, maxage=None):
+        '''
+        @param rebuild: if True, start with an empty database
+        @param filename: the database file; by default, a file named after
+            the site in the data directory
+        @param site: the Site whose categories are stored (default: the
+            default site)
+        @param maxage: if not None, reload members and supercategories that
+            were loaded more than this number of seconds ago
+        '''
+        self.site = site or pywikibot.getSite()
+        if filename is None:
+            filename = 'category-%s-%s.db' % (self.site.family.name,
+                                               self.site.code)
+        if not os.path.isabs(filename):
+            filename = config.datafilepath(filename)
+        self.filename = filename
+        self.maxage = maxage
+        self._db = None
         if rebuild:
             self.rebuild()
-        else:
-            try:
-                if not os.path.isabs(filename):
-                    filename = config.datafilepath(filename)
-                f = bz2.BZ2File(filename, 'r')
-                pywikibot.output(u'Reading dump from %s'
-                                 % config.shortpath(filename))
-                databases = pickle.load(f)
-                f.close()
-                # keys are categories, values are 2-tuples with lists as entries.
-                self.catContentDB = databases['catContentDB']
-                # like the above, but for supercategories
-                self.superclassDB = databases['superclassDB']
-                del databases
-            except:
-                # If something goes wrong, just rebuild the database
-                self.rebuild()
+
+    @property
+    def db(self):
+        '''The database connection; the file is opened on first use.'''
+        if self._db is None:
+            self._open()
+        return self._db
+
+    def _open(self):
+        self._db = sqlite3.connect(self.filename)
+        version = None
+        try:
+            if self._db.execute("SELECT name FROM sqlite_master "
+                                "WHERE name = 'meta'").fetchone():
+                version = self._getmeta('version')
+        except sqlite3.DatabaseError, e:
+            pywikibot.warning(u'Could not read %s (%s), rebuilding it.'
+                              % (config.shortpath(self.filename), e))
+            self._db.close()
+            os.remove(self.filename)
+            self._db = sqlite3.connect(self.filename)
+        if version == str(self.version):
+            return
+        if version is not None:
+            pywikibot.output(u'%s has an old format, rebuilding it.'
+                             % config.shortpath(self.filename))
+        self.rebuild()
 
     def rebuild(self):
-        self.catContentDB={}
-        self.superclassDB={}
+        '''Remove all stored data.'''
+        db = self.db
+        db.executescript('''
+            DROP TABLE IF EXISTS meta;
+            DROP TABLE IF EXISTS page;
+            DROP TABLE IF EXISTS member;
+            CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE page (id INTEGER PRIMARY KEY,
+                               title TEXT UNIQUE NOT NULL,
+                               ns INTEGER NOT NULL,
+                               members REAL,
+                               supercats REAL);
+            CREATE TABLE member (cat INTEGER NOT NULL,
+                                 page INTEGER NOT NULL,
+                                 PRIMARY KEY (cat, page));
+            CREATE INDEX member_page ON member (page);
+        ''')
+        self._setmeta('version', str(self.version))
+        db.commit()
+
+    def _getmeta(self, name):
+        row = self.db.execute('SELECT value FROM meta WHERE name = ?',
+                               (name,)).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    def _setmeta(self, name, value):
+        self.db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                        (name, value))
+
+    def _row(self, title):
+        '''Return the (id, members, supercats) row of a page, or None.'''
+        return self.db.execute(
+            'SELECT id, members, supercats FROM page WHERE title = ?',
+            (title,)).fetchone()
+
+    def _id(self, title, ns):
+        '''Return the id of a page, adding the page if it is not known.'''
+        row = self._row(title)
+        if row is not None:
+            return row[0]
+        return self.db.execute('INSERT INTO page (title, ns) VALUES (?, ?)',
+                               (title, ns)).lastrowid
+
+    def _startChanges(self):
+        '''Record the time of the latest change before data is loaded
+        into an empty database, so that refresh() catches up from there.'''
+        if self._getmeta('rcstamp') is None:
+            for change in self.site.recentchanges(total=1):
+                self._setmeta('rcstamp', change['timestamp'])
+
+    def _current(self, loaded):
+        '''Return True if data loaded at the given time can be used.'''
+        if loaded is None:
+            return False
+        return self.maxage is None or time.time() - loaded <= self.maxage
+
+    def _members(self, cat):
+        '''Return a list of (title, ns) for the members of a category.'''
+        title = cat.title(withSection=False)
+        row = self._row(title)
+        if row is None or not self._current(row[1]):
+            self._startChanges()
+            catid = self._id(title, 14)
+            db = self.db
+            db.execute('DELETE FROM member WHERE cat = ?', (catid,))
+            for group in itergroup(self.site.categorymembers(cat), 500):
+                db.executemany('INSERT OR IGNORE INTO member VALUES (?, ?)',
+                               [(catid, self._id(page.title(),
+                                                 page.namespace()))
+                                for page in group])
+            db.execute('UPDATE page SET members = ? WHERE id = ?',
+                       (time.time(), catid))
+            db.commit()
+        return self.db.execute(
+            'SELECT p.title, p.ns FROM page p JOIN member m ON p.id = m.page '
+            'JOIN page c ON c.id = m.cat WHERE c.title = ? ORDER BY p.title',
+            (title,)).fetchall()
+
+    def _setSupercats(self, pageid, cats):
+        '''Replace the supercategories of a page by cats, a list of titles.'''
+        db = self.db
+        db.execute('DELETE FROM member WHERE page = ?', (pageid,))
+        db.executemany('INSERT OR IGNORE INTO member VALUES (?, ?)',
+                       [(self._id(title, 14), pageid) for title in cats])
+        db.execute('UPDATE page SET supercats = ? WHERE id = ?',
+                   (time.time(), pageid))
 
     def getSubcats(self, supercat):
         '''For a given supercategory, return a list of Categorys for all its
-        subcategories. Saves this list in a temporary database so that it won't
-        be loaded from the server next time it's required.
+        subcategories. Saves this list in the database so that it won't be
+        loaded from the server next time it's required.
 
         '''
-        # if we already know which subcategories exist here
-        if supercat in self.catContentDB:
-            return self.catContentDB[supercat][0]
-        else:
-            subcatset = set(supercat.subcategories())
-            articleset = set(supercat.articles())
-            # add to dictionary
-            self.catContentDB[supercat] = (subcatset, articleset)
-            return subcatset
+        return [pywikibot.Category(self.site, title)
+                for title, ns in self._members(supercat) if ns == 14]
 
     def getArticles(self, cat):
         '''For a given category, return a list of Pages for all its articles.
-        Saves this list in a temporary database so that it won't be loaded from the
+        Saves this list in the database so that it won't be loaded from the
         server next time it's required.
 
         '''
-        # if we already know which articles exist here
-        if cat in self.catContentDB:
-            return self.catContentDB[cat][1]
-        else:
-            subcatset = set(cat.subcategories())
-            articleset = set(cat.articles())
-            # add to dictionary
-            self.catContentDB[cat] = (subcatset, articleset)
-            return articleset
+        return [pywikibot.Page(self.site, title)
+                for title, ns in self._members(cat) if ns != 14]
 
     def getSupercats(self, subcat):
-        # if we already know which subcategories exist here
-        if subcat in self.superclassDB:
-            return self.superclassDB[subcat]
-        else:
-            supercatset = set(subcat.categories())
-            # add to dictionary
-            self.superclassDB[subcat] = supercatset
-            return supercatset
+        '''For a given category, return a list of Categorys for all its
+        supercategories. Saves this list in the database so that it won't
+        be loaded from the server next time it's required.
 
-    def dump(self, filename = 'category.dump.bz2'):
-        '''Saves the contents of the dictionaries superclassDB and catContentDB
-        to disk.
+        '''
+        title = subcat.title(withSection=False)
+        row = self._row(title)
+        if row is None or not self._current(row[2]):
+            self._startChanges()
+            self._setSupercats(self._id(title, subcat.namespace()),
+                               [cat.title() for cat in subcat.categories()])
+            self.db.commit()
+        return [pywikibot.Category(self.site, title) for (title,)
+                in self.db.execute(
+            'SELECT c.title FROM page c JOIN member m ON c.id = m.cat '
+            'JOIN page p ON p.id = m.page WHERE p.title = ? ORDER BY c.title',
+            (title,))]
+
+    def refresh(self):
+        '''Update the database with the changes made since the last refresh.
+
+        The categories of every page changed in the meantime are reloaded,
+        so that the stored members and supercategories stay current without
+        loading whole categories again.  The time of the latest change is
+        recorded when data is first loaded; if nothing has been loaded yet,
+        refresh() only records it.
 
         '''
-        if not os.path.isabs(filename):
-            filename = config.datafilepath(filename)
-        if self.catContentDB or self.superclassDB:
-            pywikibot.output(u'Dumping to %s, please wait...'
-                             % config.shortpath(filename))
-            f = bz2.BZ2File(filename, 'w')
-            databases = {
-                'catContentDB': self.catContentDB,
-                'superclassDB': self.superclassDB
-            }
-            # store dump to disk in binary format
-            try:
-                pickle.dump(databases, f, protocol=pickle.HIGHEST_PROTOCOL)
-            except pickle.PicklingError:
-                pass
-            f.close()
+        last = self._getmeta('rcstamp')
+        newest = last
+        titles = set()
+        if last is None:
+            for change in self.site.recentchanges(total=1):
+                newest = change['timestamp']
         else:
-            try:
-                os.remove(filename)
-            except EnvironmentError:
-                pass
-            else:
-                pywikibot.output(u'Database is empty. %s removed'
-                                 % config.shortpath(filename))
+            for change in self.site.recentchanges(start=last, reverse=True):
+                titles.add(change['title'])
+                if 'move' in change:
+                    titles.add(change['move']['new_title'])
+                newest = change['timestamp']
+        if titles:
+            pywikibot.output(u'Updating the categories of %d changed pages.'
+                             % len(titles))
+        for group in itergroup(sorted(titles), api.titles_limit(self.site)):
+            for title, (ns, supercats) in self._categories(group).iteritems():
+                row = self._row(title)
+                # only store pages that are connected to the stored graph
+                if row is None and not [cat for cat in supercats
+                                        if self._row(cat) is not None]:
+                    continue
+                self._setSupercats(self._id(title, ns), supercats)
+        if newest is not None:
+            self._setmeta('rcstamp', newest)
+        self.db.commit()
+
+    def _categories(self, titles):
+        '''Return a dict mapping each of the titles to a tuple of its
+        namespace and the list of the titles of its categories.'''
+        cats = {}
+        for item in api.PropertyGenerator('categories', site=self.site,
+                                          titles=u'|'.join(titles)):
+            page = cats.setdefault(item['title'], (item['ns'], []))
+            page[1].extend(cat['title'] for cat in item.get('categories', []))
+        return cats
+
+    def dump(self):
+        '''Save all changes and close the database file.'''
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
 
 
 class AddCategory:
@@ -694,9 +848,10 @@ class CategoryTidyRobot:
     def run(self):
         cat = catlib.Category(pywikibot.Link('Category:' + self.catTitle))
 
-        articles = set(cat.articles())
+        articles = self.catDB.getArticles(cat)
         if len(articles) == 0:
-            pywikibot.output(u'There are no articles in category ' + catTitle)
+            pywikibot.output(u'There are no articles in category '
+                             + self.catTitle)
         else:
             preloadingGen = pagegenerators.PreloadingGenerator(iter(articles))
             for article in preloadingGen:
@@ -743,9 +898,7 @@ class CategoryTreeRobot:
         result = u'#' * currentDepth
         result += '[[:%s|%s]]' % (cat.title(), cat.title().split(':', 1)[1])
         result += ' (%d)' % len(self.catDB.getArticles(cat))
-        # We will remove an element of this array, but will need the original array
-        # later, so we create a shallow copy with [:]
-        supercats = self.catDB.getSupercats(cat)[:]
+        supercats = self.catDB.getSupercats(cat)
         # Find out which other cats are supercats of the current cat
         try:
             supercats.remove(parent)
@@ -815,7 +968,8 @@ def main(*args):
     # If this is set to true then the custom edit summary given for removing
     # categories from articles will also be used as the deletion reason.
     useSummaryForDeletion = True
-    catDB = CategoryDatabase()
+    rebuild = False
+    refresh = False
     action = None
     sort_by_last_name = False
     restore = False
@@ -836,7 +990,9 @@ def main(*args):
         elif arg == '-person':
             sort_by_last_name = True
         elif arg == '-rebuild':
-            catDB.rebuild()
+            rebuild = True
+        elif arg == '-refresh':
+            refresh = True
         elif arg.startswith('-from:'):
             oldCatTitle = arg[len('-from:'):].replace('_', ' ')
             fromGiven = True
@@ -874,6 +1030,10 @@ def main(*args):
         else:
             genFactory.handleArg(arg)
 
+    # the database belongs to the site selected by the arguments
+    catDB = CategoryDatabase(rebuild=rebuild)
+    if refresh:
+        catDB.refresh()
     gen = genFactory.getCombinedGenerator()
     if action == 'add':
         if not gen:
@@ -935,5 +1095,6 @@ if __name__ == "__main__":
     except pywikibot.Error:
         pywikibot.error("Fatal error:", exc_info=True)
     finally:
-        catDB.dump()
+        if catDB is not None:
+            catDB.dump()
         pywikibot.stopme()
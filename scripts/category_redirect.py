@@ -23,14 +23,108 @@ __version__ = '$Id$'
 
 import pywikibot
 from pywikibot import pagegenerators, i18n
+import codecs
 import cPickle
 import math
+import os
 import re
 import sys, traceback
 import time
 from datetime import datetime, timedelta
 
 
+class CategoryRecord(object):
+    """Record of the number of pages found in each redirected category.
+
+    For each category title, the record holds a dict that maps the dates
+    on which the category was checked to the number of pages found in it
+    (or None).  The record is kept in a text file with one tab-separated
+    line per change; changes are appended to the file, which is only
+    rewritten when most of its lines are obsolete.
+
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.data = {}
+        self.changes = []
+        self.lines = 0
+        if os.path.exists(filename):
+            f = codecs.open(filename, "r", "utf-8")
+            try:
+                for line in f:
+                    self._apply(line.rstrip(u"\n").split(u"\t"))
+                    self.lines += 1
+            finally:
+                f.close()
+
+    def _apply(self, fields):
+        if fields[0] == u"+":
+            title, date, found = fields[1:]
+            self.data.setdefault(title, {})[date] = \
+                found and int(found) or None
+        elif fields[0] == u"-":
+            self.data.pop(fields[1], None)
+
+    def _change(self, *fields):
+        self._apply(fields)
+        self.changes.append(fields)
+
+    def __contains__(self, title):
+        return title in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def titles(self):
+        """Return a list of the recorded category titles."""
+        return self.data.keys()
+
+    def add(self, title, date, found=None):
+        """Record the number of pages found in a category on a date."""
+        self._change(u"+", title, date, found and unicode(found) or u"")
+
+    def remove(self, title):
+        """Remove all entries for a category."""
+        self._change(u"-", title)
+
+    def convert(self, filename):
+        """Add the entries of the pickled record kept by older versions of
+        this bot; they are written to the record file by save()."""
+        inp = open(filename, "rb")
+        try:
+            for title, dates in cPickle.load(inp).iteritems():
+                for date, found in dates.iteritems():
+                    self.add(title, date, found)
+        finally:
+            inp.close()
+
+    def save(self):
+        """Write the changes to the record file."""
+        entries = sum(len(dates) for dates in self.data.itervalues())
+        if self.lines + len(self.changes) > 2 * entries + 100:
+            # rewrite the file without the obsolete lines
+            lines = [(u"+", title, date, found and unicode(found) or u"")
+                     for title, dates in sorted(self.data.iteritems())
+                     for date, found in sorted(dates.iteritems())]
+            f = codecs.open(self.filename + ".new", "w", "utf-8")
+        else:
+            lines = self.changes
+            f = codecs.open(self.filename, "a", "utf-8")
+        try:
+            for fields in lines:
+                f.write(u"\t".join(fields) + u"\n")
+        finally:
+            f.close()
+        if lines is not self.changes:
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+            os.rename(self.filename + ".new", self.filename)
+            self.lines = len(lines)
+        else:
+            self.lines += len(lines)
+        self.changes = []
+
+
 class CategoryRedirectBot(object):
     def __init__(self):
         self.cooldown = 7 # days
@@ -181,6 +275,19 @@ class CategoryRedirectBot(object):
             except:
                 return (None, None)
 
+    def preload(self, pages):
+        """Load text, templates, category sizes and existence of pages.
+
+        All pages are retrieved with a few batched queries, so that the
+        checks done on each redirected category and its target do not need
+        a request per page.
+
+        """
+        pages = list(pages)
+        if pages:
+            for page in self.site.preloadpages(pages, templates=True):
+                pass
+
     def readyToEdit(self, cat):
         """Return True if cat not edited during cooldown period, else False."""
         dateformat ="%Y-%m-%dT%H:%M:%SZ"
@@ -239,14 +346,9 @@ class CategoryRedirectBot(object):
                             u"User:%(user)s/category edit requests" % locals())
         datafile = pywikibot.config.datafilepath(
                    "%s-catmovebot-data" % self.site.dbName())
-        try:
-            inp = open(datafile, "rb")
-            record = cPickle.load(inp)
-            inp.close()
-        except IOError:
-            record = {}
-        if record:
-            cPickle.dump(record, open(datafile + ".bak", "wb"), -1)
+        record = CategoryRecord(datafile + ".txt")
+        if not os.path.exists(record.filename) and os.path.exists(datafile):
+            record.convert(datafile)
 
         try:
             template_list = self.site.family.category_redirect_templates[self.site.code]
@@ -316,7 +418,7 @@ class CategoryRedirectBot(object):
 
         comment = i18n.twtranslate(self.site.lang, self.move_comment)
         counts, destmap, catmap = {}, {}, {}
-        catlist, nonemptypages = [], []
+        catlist, nonemptypages, newcats = [], [], []
         redircat = pywikibot.Category(
                        pywikibot.Link(
                            self.cat_redirect_cat[self.site.family.name]
@@ -346,26 +448,39 @@ class CategoryRedirectBot(object):
                     nonemptypages.append(cat)
             if cat_title not in record:
                 # make sure every redirect has a record entry
-                record[cat_title] = {today: None}
-                try:
-                    newredirs.append("*# %s -> %s"
-                                   % (cat.title(asLink=True, textlink=True),
-                                      cat.getCategoryRedirectTarget().title(
-                                            asLink=True, textlink=True)))
-                except pywikibot.Error:
-                    pass
+                record.add(cat_title, today)
+                newcats.append(cat)
+
+        # load the redirect pages to be checked, then their targets
+        self.preload(set(nonemptypages + newcats))
+        for cat in newcats:
+            try:
+                newredirs.append("*# %s -> %s"
+                               % (cat.title(asLink=True, textlink=True),
+                                  cat.getCategoryRedirectTarget().title(
+                                        asLink=True, textlink=True)))
+            except pywikibot.Error:
+                pass
+        dests = {}
+        for cat in nonemptypages:
+            try:
+                if cat.isCategoryRedirect():
+                    dests[cat] = cat.getCategoryRedirectTarget()
+            except pywikibot.Error:
+                pass
+        self.preload(set(dests.values()))
 
         # delete record entries for non-existent categories
-        for cat_name in record.keys():
+        for cat_name in record.titles():
             if pywikibot.Category(self.site, self.catprefix + cat_name
                                  ) not in catpages:
-                del record[cat_name]
+                record.remove(cat_name)
 
         pywikibot.output(u"")
         pywikibot.output(u"Moving pages out of %s redirected categories."
                          % len(nonemptypages))
 
-        for cat in pagegenerators.PreloadingGenerator(nonemptypages):
+        for cat in nonemptypages:
             try:
                 if not cat.isCategoryRedirect():
                     self.log_text.append(u"* False positive: %s"
@@ -383,7 +498,7 @@ class CategoryRedirectBot(object):
                     u"* Skipping %s; in cooldown period."
                      % cat.title(asLink=True, textlink=True))
                 continue
-            dest = cat.getCategoryRedirectTarget()
+            dest = dests.get(cat) or cat.getCategoryRedirectTarget()
             if not dest.exists():
                 problems.append("# %s redirects to %s"
                                 % (cat.title(asLink=True, textlink=True),
@@ -437,7 +552,7 @@ class CategoryRedirectBot(object):
                     u"* [[:%s%s]]: error in move_contents"
                     % (self.catprefix, cat_title))
             elif found:
-                record[cat_title][today] = found
+                record.add(cat_title, today, found)
                 self.log_text.append(
                     u"* [[:%s%s]]: %d found, %d moved"
                     % (self.catprefix, cat_title, found, moved))
@@ -449,7 +564,7 @@ class CategoryRedirectBot(object):
                 pass
             continue
 
-        cPickle.dump(record, open(datafile, "wb"), -1)
+        record.save()
 
         pywikibot.setAction(i18n.twtranslate(self.site.lang,
                                              self.maint_comment))
@@ -37,6 +37,7 @@ import isbn
 from pywikibot import pagegenerators, i18n
 import sys
 import re
+import time
 
 warning = """ATTENTION: You can run this script as a stand-alone for testing purposes.
 However, the changes are that are made are only minor, and other users
@@ -113,7 +114,37 @@ deprecatedTemplates = {
     }
 }
 
+# The passes of CosmeticChangesToolkit.change(), in the order in which they
+# are run. Each pass is listed with the strings of which at least one must
+# occur in a text for the pass to change anything, or with None if the pass
+# has to be run on every text.
+passes = [
+    ('fixSelfInterwiki',                    ('[[',)),
+    ('standardizePageFooter',               None),
+    ('cleanUpLinks',                        ('[[',)),
+    ('cleanUpSectionHeaders',               ('\n=',)),
+    ('putSpacesInLists',                    ('*', '#')),
+    ('translateAndCapitalizeNamespaces',    ('[[',)),
+    ('replaceDeprecatedTemplates',          ('{{',)),
+    ('resolveHtmlEntities',                 ('&',)),
+    ('validXhtml',                          ('<',)),
+    ('removeUselessSpaces',                 (' ',)),
+    ('removeNonBreakingSpaceBeforePercent', ('&nbsp;%',)),
+    ('fixSyntaxSave',                       ('[http',)),
+    ('fixHtml',                             ('<',)),
+    ('fixStyle',                            ('prettytable',)),
+    ('fixTypo',                             ('ccm', u'º', u'°')),
+    ('fixArabicLetters',                    None),
+    ('hyphenateIsbnNumbers',                ('ISBN ',)),
+]
+
 class CosmeticChangesToolkit:
+    # The compiled replacements of the passes, by site and name. They are
+    # shared by all toolkits, so creating a toolkit for each page is cheap.
+    _replacementSets = {}
+    # The total time spent in each pass, by name.
+    timing = {}
+
     def __init__(self, site, debug=False, redirect=False, namespace=None, pageTitle=None):
         self.site = site
         self.debug = debug
@@ -129,31 +160,46 @@ class CosmeticChangesToolkit:
         """
         oldText = text
         if self.site.sitename()== u'commons:commons' and self.namespace == 6:
-            text = self.commonsfiledesc(text)
-        text = self.fixSelfInterwiki(text)
-        text = self.standardizePageFooter(text)
-        text = self.cleanUpLinks(text)
-        text = self.cleanUpSectionHeaders(text)
-        text = self.putSpacesInLists(text)
-        text = self.translateAndCapitalizeNamespaces(text)
-        text = self.replaceDeprecatedTemplates(text)
-        text = self.resolveHtmlEntities(text)
-        text = self.validXhtml(text)
-        text = self.removeUselessSpaces(text)
-        text = self.removeNonBreakingSpaceBeforePercent(text)
-        text = self.fixSyntaxSave(text)
-        text = self.fixHtml(text)
-        text = self.fixStyle(text)
-        text = self.fixTypo(text)
-        text = self.fixArabicLetters(text)
-        try:
-            text = isbn.hyphenateIsbnNumbers(text)
-        except isbn.InvalidIsbnException, error:
-            pass
+            text = self.runPass('commonsfiledesc', text)
+        for (name, triggers) in passes:
+            if triggers is not None:
+                for trigger in triggers:
+                    if trigger in text:
+                        break
+                else:
+                    # this pass would not change anything
+                    continue
+            text = self.runPass(name, text)
         if self.debug:
             pywikibot.showDiff(oldText, text)
         return text
 
+    def runPass(self, name, text):
+        """Run the pass with the given method name on text, timing it."""
+        start = time.time()
+        text = getattr(self, name)(text)
+        self.timing[name] = self.timing.get(name, 0.0) + time.time() - start
+        return text
+
+    def replaceSet(self, text, name, replacements, exceptions,
+                   caseInsensitive=False):
+        """Apply a list of replacements, like consecutive replaceExcept()
+        calls with the same exceptions.
+
+        The replacements are compiled into a ReplacementSet once per site,
+        and stored under the given name; replacements can also be a
+        function that returns the list, which is then only called once.
+        """
+        key = (self.site, name)
+        replacementSet = self._replacementSets.get(key)
+        if replacementSet is None:
+            if callable(replacements):
+                replacements = replacements()
+            replacementSet = pywikibot.ReplacementSet(
+                replacements, exceptions, caseInsensitive, site=self.site)
+            self._replacementSets[key] = replacementSet
+        return replacementSet.apply(text)[0]
+
     def fixSelfInterwiki(self, text):
         """
         Interwiki links to the site itself are displayed like local links.
@@ -182,10 +228,14 @@ class CosmeticChangesToolkit:
         # arz uses english stylish codes
         if self.site.sitename() == 'wikipedia:arz':
             return text
-        family = self.site.family
         # wiki links aren't parsed here.
         exceptions = ['nowiki', 'comment', 'math', 'pre']
+        return self.replaceSet(text, 'translateAndCapitalizeNamespaces',
+                               self.namespaceReplacements, exceptions)
 
+    def namespaceReplacements(self):
+        family = self.site.family
+        replacements = []
         for nsNumber in family.namespaces:
             if not family.isDefinedNSLanguage(nsNumber, self.site.lang):
                 # Skip undefined namespaces
@@ -200,8 +250,8 @@ class CosmeticChangesToolkit:
                         namespaces.remove(image)
             # skip main (article) namespace
             if thisNs and namespaces:
-                text = pywikibot.replaceExcept(text, r'\[\[\s*(' + '|'.join(namespaces) + ') *:(?P<nameAndLabel>.*?)\]\]', r'[[' + thisNs + ':\g<nameAndLabel>]]', exceptions)
-        return text
+                replacements.append((r'\[\[\s*(' + '|'.join(namespaces) + ') *:(?P<nameAndLabel>.*?)\]\]', r'[[' + thisNs + ':\g<nameAndLabel>]]'))
+        return replacements
 
     def cleanUpLinks(self, text):
         # helper function which works on one link and either returns it
@@ -326,18 +376,15 @@ class CosmeticChangesToolkit:
         return text
 
     def validXhtml(self, text):
-        text = pywikibot.replaceExcept(text, r'(?i)<br[ /]*>', r'<br />', ['comment', 'math', 'nowiki', 'pre'])
+        text = self.replaceSet(text, 'validXhtml',
+                               [(r'(?i)<br[ /]*>', r'<br />')],
+                               ['comment', 'math', 'nowiki', 'pre'])
         return text
 
     def removeUselessSpaces(self, text):
-        result = []
-        multipleSpacesR = re.compile('  +')
-        spaceAtLineEndR = re.compile(' $')
-
         exceptions = ['comment', 'math', 'nowiki', 'pre', 'startspace', 'table', 'template']
-        text = pywikibot.replaceExcept(text, multipleSpacesR, ' ', exceptions)
-        text = pywikibot.replaceExcept(text, spaceAtLineEndR, '', exceptions)
-
+        text = self.replaceSet(text, 'removeUselessSpaces',
+                               [('  +', ' '), (' $', '')], exceptions)
         return text
 
     def removeNonBreakingSpaceBeforePercent(self, text):
@@ -346,7 +393,8 @@ class CosmeticChangesToolkit:
         front of a percent sign, so it is no longer required to place it
         manually.
         '''
-        text = pywikibot.replaceExcept(text, r'(\d)&nbsp;%', r'\1 %', ['timeline'])
+        text = self.replaceSet(text, 'removeNonBreakingSpaceBeforePercent',
+                               [(r'(\d)&nbsp;%', r'\1 %')], ['timeline'])
         return text
 
     def cleanUpSectionHeaders(self, text):
@@ -359,9 +407,12 @@ class CosmeticChangesToolkit:
         German Wikipedia. It might be that it is not wanted on other wikis.
         If there are any complaints, please file a bug report.
         """
+        replacements = []
         for level in range(1, 7):
             equals = '=' * level
-            text = pywikibot.replaceExcept(text, r'\n' + equals + ' *(?P<title>[^=]+?) *' + equals + ' *\r\n', '\n' + equals + ' \g<title> ' + equals + '\r\n', ['comment', 'math', 'nowiki', 'pre'])
+            replacements.append((r'\n' + equals + ' *(?P<title>[^=]+?) *' + equals + ' *\r\n', '\n' + equals + ' \g<title> ' + equals + '\r\n'))
+        text = self.replaceSet(text, 'cleanUpSectionHeaders', replacements,
+                               ['comment', 'math', 'nowiki', 'pre'])
         return text
 
     def putSpacesInLists(self, text):
@@ -376,87 +427,104 @@ class CosmeticChangesToolkit:
         exceptions = ['comment', 'math', 'nowiki', 'pre', 'source', 'timeline']
         if not (self.redirect or self.template) and \
            pywikibot.calledModuleName() != 'capitalize_redirects':
-            text = pywikibot.replaceExcept(
-                text,
-                r'(?m)^(?P<bullet>[:;]*(\*+|#+)[:;\*#]*)(?P<char>[^\s\*#:;].+?)', '\g<bullet> \g<char>',
+            text = self.replaceSet(
+                text, 'putSpacesInLists',
+                [(r'(?m)^(?P<bullet>[:;]*(\*+|#+)[:;\*#]*)(?P<char>[^\s\*#:;].+?)', '\g<bullet> \g<char>')],
                 exceptions)
         return text
 
     def replaceDeprecatedTemplates(self, text):
         exceptions = ['comment', 'math', 'nowiki', 'pre']
         if self.site.family.name in deprecatedTemplates and self.site.lang in deprecatedTemplates[self.site.family.name]:
-            for template in deprecatedTemplates[self.site.family.name][self.site.lang]:
-                old = template[0]
-                new = template[1]
-                if new == None:
-                    new = ''
-                else:
-                    new = '{{'+new+'}}'
-                if not self.site.nocapitalize:
-                    old = '[' + old[0].upper() + old[0].lower() + ']' + old[1:]
-                text = pywikibot.replaceExcept(text, r'\{\{([mM][sS][gG]:)?' + old + '(?P<parameters>\|[^}]+|)}}', new, exceptions)
+            text = self.replaceSet(text, 'replaceDeprecatedTemplates',
+                                   self.templateReplacements, exceptions)
         return text
 
+    def templateReplacements(self):
+        replacements = []
+        for template in deprecatedTemplates[self.site.family.name][self.site.lang]:
+            old = template[0]
+            new = template[1]
+            if new == None:
+                new = ''
+            else:
+                new = '{{'+new+'}}'
+            if not self.site.nocapitalize:
+                old = '[' + old[0].upper() + old[0].lower() + ']' + old[1:]
+            replacements.append((r'\{\{([mM][sS][gG]:)?' + old + '(?P<parameters>\|[^}]+|)}}', new))
+        return replacements
+
     #from fixes.py
     def fixSyntaxSave(self, text):
         exceptions = ['nowiki', 'comment', 'math', 'pre', 'source', 'startspace']
-        # external link in double brackets
-        text = pywikibot.replaceExcept(text, r'\[\[(?P<url>https?://[^\]]+?)\]\]', r'[\g<url>]', exceptions)
-        # external link starting with double bracket
-        text = pywikibot.replaceExcept(text, r'\[\[(?P<url>https?://.+?)\]', r'[\g<url>]', exceptions)
-        # external link and description separated by a dash, with
-        # whitespace in front of the dash, so that it is clear that
-        # the dash is not a legitimate part of the URL.
-        text = pywikibot.replaceExcept(text, r'\[(?P<url>https?://[^\|\] \r\n]+?) +\| *(?P<label>[^\|\]]+?)\]', r'[\g<url> \g<label>]', exceptions)
-        # dash in external link, where the correct end of the URL can
-        # be detected from the file extension. It is very unlikely that
-        # this will cause mistakes.
-        text = pywikibot.replaceExcept(text, r'\[(?P<url>https?://[^\|\] ]+?(\.pdf|\.html|\.htm|\.php|\.asp|\.aspx|\.jsp)) *\| *(?P<label>[^\|\]]+?)\]', r'[\g<url> \g<label>]', exceptions)
+        text = self.replaceSet(text, 'fixSyntaxSave', [
+            # external link in double brackets
+            (r'\[\[(?P<url>https?://[^\]]+?)\]\]', r'[\g<url>]'),
+            # external link starting with double bracket
+            (r'\[\[(?P<url>https?://.+?)\]', r'[\g<url>]'),
+            # external link and description separated by a dash, with
+            # whitespace in front of the dash, so that it is clear that
+            # the dash is not a legitimate part of the URL.
+            (r'\[(?P<url>https?://[^\|\] \r\n]+?) +\| *(?P<label>[^\|\]]+?)\]', r'[\g<url> \g<label>]'),
+            # dash in external link, where the correct end of the URL can
+            # be detected from the file extension. It is very unlikely that
+            # this will cause mistakes.
+            (r'\[(?P<url>https?://[^\|\] ]+?(\.pdf|\.html|\.htm|\.php|\.asp|\.aspx|\.jsp)) *\| *(?P<label>[^\|\]]+?)\]', r'[\g<url> \g<label>]'),
+        ], exceptions)
         return text
 
     def fixHtml(self, text):
         # Everything case-insensitive (?i)
         # Keep in mind that MediaWiki automatically converts <br> to <br />
         exceptions = ['nowiki', 'comment', 'math', 'pre', 'source', 'startspace']
-        text = pywikibot.replaceExcept(text, r'(?i)<b>(.*?)</b>', r"'''\1'''" , exceptions)
-        text = pywikibot.replaceExcept(text, r'(?i)<strong>(.*?)</strong>', r"'''\1'''" , exceptions)
-        text = pywikibot.replaceExcept(text, r'(?i)<i>(.*?)</i>', r"''\1''" , exceptions)
-        text = pywikibot.replaceExcept(text, r'(?i)<em>(.*?)</em>', r"''\1''" , exceptions)
-        # horizontal line without attributes in a single line
-        text = pywikibot.replaceExcept(text, r'(?i)([\r\n])<hr[ /]*>([\r\n])', r'\1----\2', exceptions)
-        # horizontal line with attributes; can't be done with wiki syntax
-        # so we only make it XHTML compliant
-        text = pywikibot.replaceExcept(text, r'(?i)<hr ([^>/]+?)>', r'<hr \1 />', exceptions)
+        replacements = [
+            (r'(?i)<b>(.*?)</b>', r"'''\1'''"),
+            (r'(?i)<strong>(.*?)</strong>', r"'''\1'''"),
+            (r'(?i)<i>(.*?)</i>', r"''\1''"),
+            (r'(?i)<em>(.*?)</em>', r"''\1''"),
+            # horizontal line without attributes in a single line
+            (r'(?i)([\r\n])<hr[ /]*>([\r\n])', r'\1----\2'),
+            # horizontal line with attributes; can't be done with wiki syntax
+            # so we only make it XHTML compliant
+            (r'(?i)<hr ([^>/]+?)>', r'<hr \1 />'),
+        ]
         # a header where only spaces are in the same line
         for level in range(1, 7):
             equals = '\\1%s \\2 %s\\3' % ("="*level, "="*level)
-            text = pywikibot.replaceExcept(text,
-                                           r'(?i)([\r\n]) *<h%d> *([^<]+?) *</h%d> *([\r\n])'%(level, level),
-                                           r'%s'%equals, exceptions)
+            replacements.append(
+                (r'(?i)([\r\n]) *<h%d> *([^<]+?) *</h%d> *([\r\n])'%(level, level),
+                 r'%s'%equals))
         #remove empty <ref/>-tag
-        text = pywikibot.replaceExcept(text, r'(?i)<ref\s*/>', r'', exceptions)
+        replacements.append((r'(?i)<ref\s*/>', r''))
         # TODO: maybe we can make the bot replace <p> tags with \r\n's.
+        text = self.replaceSet(text, 'fixHtml', replacements, exceptions)
         return text
 
     def fixStyle(self, text):
         exceptions = ['nowiki', 'comment', 'math', 'pre', 'source', 'startspace']
         # convert prettytable to wikitable class
         if self.site.language in ('de', 'en'):
-           text = pywikibot.replaceExcept(text, ur'(class="[^"]*)prettytable([^"]*")', ur'\1wikitable\2', exceptions)
+           text = self.replaceSet(text, 'fixStyle',
+                                  [(ur'(class="[^"]*)prettytable([^"]*")', ur'\1wikitable\2')],
+                                  exceptions)
         return text
 
     def fixTypo(self, text):
         exceptions = ['nowiki', 'comment', 'math', 'pre', 'source', 'startspace', 'gallery', 'hyperlink', 'interwiki', 'link']
         # change <number> ccm -> <number> cm³
-        text = pywikibot.replaceExcept(text, ur'(\d)\s*&nbsp;ccm', ur'\1&nbsp;cm³', exceptions)
-        text = pywikibot.replaceExcept(text, ur'(\d)\s*ccm', ur'\1&nbsp;cm³', exceptions)
+        text = self.replaceSet(text, 'fixTypo', [
+            (ur'(\d)\s*&nbsp;ccm', ur'\1&nbsp;cm³'),
+            (ur'(\d)\s*ccm', ur'\1&nbsp;cm³'),
+        ], exceptions)
         # Solve wrong Nº sign with °C or °F
         # additional exception requested on fr-wiki for this stuff
         pattern = re.compile(u'«.*?»', re.UNICODE)
         exceptions.append(pattern)
-        text = pywikibot.replaceExcept(text, ur'(\d)\s*&nbsp;[º°]([CF])', ur'\1&nbsp;°\2', exceptions)
-        text = pywikibot.replaceExcept(text, ur'(\d)\s*[º°]([CF])', ur'\1&nbsp;°\2', exceptions)
-        text = pywikibot.replaceExcept(text, ur'º([CF])', ur'°\1', exceptions)
+        text = self.replaceSet(text, 'fixTypo-degrees', [
+            (ur'(\d)\s*&nbsp;[º°]([CF])', ur'\1&nbsp;°\2'),
+            (ur'(\d)\s*[º°]([CF])', ur'\1&nbsp;°\2'),
+            (ur'º([CF])', ur'°\1'),
+        ], exceptions)
         return text
 
     def fixArabicLetters(self, text):
@@ -481,25 +549,20 @@ class CosmeticChangesToolkit:
             pattern = re.compile(u'\[\[(' + '|'.join(namespaces) + '):.+?\..+?\]\]',
                                  re.UNICODE)
             exceptions.append(pattern)
-            text = pywikibot.replaceExcept(text, u',', u'،', exceptions)
+            replacements = [(u',', u'،')]
             if self.site.lang=='ckb':
-                text = pywikibot.replaceExcept(text,
-                                               ur'ه([.،_<\]\s])',
-                                               ur'ە\1', exceptions)
-                text = pywikibot.replaceExcept(text, u'ه‌', u'ە', exceptions)
-                text = pywikibot.replaceExcept(text, u'ه', u'ھ', exceptions)
-            text = pywikibot.replaceExcept(text, u'ك', u'ک', exceptions)
-            text = pywikibot.replaceExcept(text, ur'[ىي]', u'ی', exceptions)
+                replacements += [(ur'ه([.،_<\]\s])', ur'ە\1'),
+                                 (u'ه‌', u'ە'),
+                                 (u'ه', u'ھ')]
+            replacements += [(u'ك', u'ک'), (ur'[ىي]', u'ی')]
             # replace persian digits
             for i in range(0,10):
                 if self.site.lang=='ckb':
-                    text = pywikibot.replaceExcept(text,
-                                                   u'۰۱۲۳۴۵۶۷۸۹'[i],
-                                                   u'٠١٢٣٤٥٦٧٨٩'[i], exceptions)
+                    replacements.append((u'۰۱۲۳۴۵۶۷۸۹'[i], u'٠١٢٣٤٥٦٧٨٩'[i]))
                 else:
-                    text = pywikibot.replaceExcept(text,
-                                                   u'٠١٢٣٤٥٦٧٨٩'[i],
-                                                   u'۰۱۲۳۴۵۶۷۸۹'[i], exceptions)
+                    replacements.append((u'٠١٢٣٤٥٦٧٨٩'[i], u'۰۱۲۳۴۵۶۷۸۹'[i]))
+            text = self.replaceSet(text, 'fixArabicLetters', replacements,
+                                   exceptions)
             # do not change digits in class, style and table params
             pattern = re.compile(u'=".*?"', re.UNICODE)
             exceptions.append(pattern)
@@ -507,13 +570,14 @@ class CosmeticChangesToolkit:
             pattern = re.compile(u'<[/]*?[^</]+?[/]*?>', re.UNICODE)
             exceptions.append(pattern)
             exceptions.append('table') #exclude tables for now
+            replacements = []
             for i in range(0,10):
                 if self.site.lang=='ckb':
-                    text = pywikibot.replaceExcept(text, str(i),
-                                                   u'٠١٢٣٤٥٦٧٨٩'[i], exceptions)
+                    replacements.append((str(i), u'٠١٢٣٤٥٦٧٨٩'[i]))
                 else:
-                    text = pywikibot.replaceExcept(text, str(i),
-                                                   u'۰۱۲۳۴۵۶۷۸۹'[i], exceptions)
+                    replacements.append((str(i), u'۰۱۲۳۴۵۶۷۸۹'[i]))
+            text = self.replaceSet(text, 'fixArabicLetters-digits',
+                                   replacements, exceptions)
         return text
 
     # Retrieved from "http://commons.wikimedia.org/wiki/Commons:Tools/pywiki_file_description_cleanup"
@@ -521,49 +585,42 @@ class CosmeticChangesToolkit:
         # section headers to {{int:}} versions
         exceptions = ['comment', 'includeonly', 'math', 'noinclude', 'nowiki',
                       'pre', 'source', 'ref', 'timeline']
-        text = pywikibot.replaceExcept(text,
-                                       r"([\r\n]|^)\=\= *Summary *\=\=",
-                                       r"\1== {{int:filedesc}} ==",
-                                       exceptions, True)
-        text = pywikibot.replaceExcept(
-            text,
-            r"([\r\n])\=\= *\[\[Commons:Copyright tags\|Licensing\]\]: *\=\=",
-            r"\1== {{int:license}} ==", exceptions, True)
-        text = pywikibot.replaceExcept(
-            text,
-            r"([\r\n])\=\= *(Licensing|License information|{{int:license-header}}) *\=\=",
-            r"\1== {{int:license}} ==", exceptions, True)
-
-        # frequent field values to {{int:}} versions
-        text = pywikibot.replaceExcept(
-            text,
-            r'([\r\n]\|[Ss]ource *\= *)(?:[Oo]wn work by uploader|[Oo]wn work|[Ee]igene [Aa]rbeit) *([\r\n])',
-            r'\1{{own}}\2', exceptions, True)
-        text = pywikibot.replaceExcept(
-            text,
-            r'(\| *Permission *\=) *(?:[Ss]ee below|[Ss]iehe unten) *([\r\n])',
-            r'\1\2', exceptions, True)
-
-        # added to transwikied pages
-        text = pywikibot.replaceExcept(text, r'__NOTOC__', '', exceptions, True)
+        text = self.replaceSet(text, 'commonsfiledesc', [
+            # section headers to {{int:}} versions
+            (r"([\r\n]|^)\=\= *Summary *\=\=",
+             r"\1== {{int:filedesc}} =="),
+            (r"([\r\n])\=\= *\[\[Commons:Copyright tags\|Licensing\]\]: *\=\=",
+             r"\1== {{int:license}} =="),
+            (r"([\r\n])\=\= *(Licensing|License information|{{int:license-header}}) *\=\=",
+             r"\1== {{int:license}} =="),
+            # frequent field values to {{int:}} versions
+            (r'([\r\n]\|[Ss]ource *\= *)(?:[Oo]wn work by uploader|[Oo]wn work|[Ee]igene [Aa]rbeit) *([\r\n])',
+             r'\1{{own}}\2'),
+            (r'(\| *Permission *\=) *(?:[Ss]ee below|[Ss]iehe unten) *([\r\n])',
+             r'\1\2'),
+            # added to transwikied pages
+            (r'__NOTOC__', ''),
+        ], exceptions, True)
 
         # tracker element for js upload form
-        text = pywikibot.replaceExcept(
-            text,
-            r'<!-- *{{ImageUpload\|(?:full|basic)}} *-->',
-            '', exceptions[1:], True)
-        text = pywikibot.replaceExcept(text, r'{{ImageUpload\|(?:basic|full)}}',
-                                       '', exceptions, True)
-
-        # duplicated section headers
-        text = pywikibot.replaceExcept(
-            text,
-            r'([\r\n]|^)\=\= *{{int:filedesc}} *\=\=(?:[\r\n ]*)\=\= *{{int:filedesc}} *\=\=',
-            r'\1== {{int:filedesc}} ==', exceptions, True)
-        text = pywikibot.replaceExcept(
-            text,
-            r'([\r\n]|^)\=\= *{{int:license}} *\=\=(?:[\r\n ]*)\=\= *{{int:license}} *\=\=',
-            r'\1== {{int:license}} ==', exceptions, True)
+        text = self.replaceSet(text, 'commonsfiledesc-comments', [
+            (r'<!-- *{{ImageUpload\|(?:full|basic)}} *-->', ''),
+        ], exceptions[1:], True)
+        text = self.replaceSet(text, 'commonsfiledesc-tail', [
+            (r'{{ImageUpload\|(?:basic|full)}}', ''),
+            # duplicated section headers
+            (r'([\r\n]|^)\=\= *{{int:filedesc}} *\=\=(?:[\r\n ]*)\=\= *{{int:filedesc}} *\=\=',
+             r'\1== {{int:filedesc}} =='),
+            (r'([\r\n]|^)\=\= *{{int:license}} *\=\=(?:[\r\n ]*)\=\= *{{int:license}} *\=\=',
+             r'\1== {{int:license}} =='),
+        ], exceptions, True)
+        return text
+
+    def hyphenateIsbnNumbers(self, text):
+        try:
+            text = isbn.hyphenateIsbnNumbers(text)
+        except isbn.InvalidIsbnException, error:
+            pass
         return text
 
 class CosmeticChangesBot:
@@ -583,8 +640,9 @@ class CosmeticChangesBot:
             ccToolkit = CosmeticChangesToolkit(page.site, debug=True,
                                                namespace=page.namespace(),
                                                pageTitle=page.title())
-            changedText = ccToolkit.change(page.get())
-            if changedText.strip() != page.get().strip():
+            text = page.get()
+            changedText = ccToolkit.change(text)
+            if changedText.strip() != text.strip():
                 if not self.acceptall:
                     choice = pywikibot.inputChoice(
                         u'Do you want to accept these changes?',
@@ -619,6 +677,14 @@ class CosmeticChangesBot:
         except KeyboardInterrupt:
             raise
             #pywikibot.output('\nQuitting program...')
+        finally:
+            self.showTiming()
+
+    def showTiming(self):
+        """Log the time spent in each pass of the cosmetic changes."""
+        timing = CosmeticChangesToolkit.timing
+        for name in sorted(timing, key=timing.get, reverse=True):
+            pywikibot.log(u'%-36s %8.3f s' % (name, timing[name]))
 
 def main():
     #page generator
@@ -348,7 +348,7 @@ class XmlDumpLmoLinkPageGenerator:
         self.xmlFilename = xmlFilename
 
     def __iter__(self):
-        import xmlreader
+        from pywikibot import xmlreader
         mysite = pywikibot.getSite()
         dump = xmlreader.XmlDump(self.xmlFilename)
         r = re.compile(r'\d')
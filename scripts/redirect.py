@@ -58,10 +58,137 @@ __version__='$Id: redirect.py 7789 2009-12-17 19:20:12Z xqt $'
 #
 import re, sys, datetime
 import pywikibot
-from pywikibot import config, i18n
+from pywikibot import config, i18n, pagegenerators
+from pywikibot.data import api
+from pywikibot.tools import itergroup
 # import xmlreader
 
 
+class RedirectResolver(object):
+    """Resolve the targets of many redirects with a few API requests.
+
+    Titles are queried in batches using the API's redirects option.  If a
+    chain is not resolved completely by one response, the intermediate
+    targets that are still unknown are queried in follow-up batches, so a
+    chain of n redirects costs at most n requests for the whole batch.
+    Resolved redirects are remembered, so that targets shared by several
+    redirects are only requested once.
+
+    """
+    def __init__(self, site, maxlen=8, cachesize=100000):
+        """Constructor.
+
+        @param maxlen: redirect chains are followed up to this length
+        @param cachesize: maximum number of titles remembered
+
+        """
+        self.site = site
+        self.maxlen = maxlen
+        self.cachesize = cachesize
+        self._targets = {}      # redirect title -> target title
+        self._pages = {}        # other title -> exists (None if unknown)
+        self._normalized = {}   # requested title -> normalized title
+
+    def resolve(self, titles):
+        """Yield (redirect, chain_length, final_target) for every title.
+
+        chain_length is the number of redirects which are followed from
+        redirect to final_target: 0 if redirect is not a redirect page, 1
+        if it links to a page which is not a redirect, or None if the
+        chain forms a loop or is longer than maxlen; final_target is the
+        title where following the chain stopped.  Use L{exists} to find
+        out whether final_target exists.
+
+        """
+        for group in itergroup(titles, api.titles_limit(self.site)):
+            if len(self._targets) + len(self._pages) >= self.cachesize:
+                self._targets.clear()
+                self._pages.clear()
+                self._normalized.clear()
+            self._query(group)
+            for title in group:
+                yield self._follow(title)
+
+    def target(self, title):
+        """Return the title the redirect title links to, or None."""
+        return self._targets.get(self._normalized.get(title, title))
+
+    def chain(self, title):
+        """Return the titles from redirect title to the end of its chain.
+
+        The list starts with title and ends with the title where following
+        the chain stopped, like the final_target of L{resolve}.
+
+        """
+        chain = [self._normalized.get(title, title)]
+        while chain[-1] in self._targets:
+            target = self._targets[chain[-1]]
+            looped = target in chain
+            chain.append(target)
+            if looped or len(chain) > self.maxlen + 1:
+                break
+        return chain
+
+    def exists(self, title):
+        """Return whether the (non-redirect) page title exists.
+
+        Returns None if this is unknown, e.g. for interwiki links.
+
+        """
+        return self._pages.get(self._normalized.get(title, title))
+
+    def _follow(self, title):
+        chain = self.chain(title)
+        length = len(chain) - 1
+        if length > self.maxlen or chain[-1] in chain[:-1]:
+            length = None
+        return chain[0], length, chain[-1]
+
+    def _query(self, titles):
+        pending = set(title for title in titles
+                      if title not in self._targets
+                      and title not in self._pages)
+        for i in range(self.maxlen + 1):
+            if not pending:
+                return
+            for group in itergroup(sorted(pending),
+                                   api.titles_limit(self.site)):
+                self._request(group)
+            # continue with the ends of chains which are not resolved yet
+            pending = set()
+            for title in titles:
+                redirect, length, final = self._follow(title)
+                if length is not None and final not in self._pages:
+                    pending.add(final)
+
+    def _request(self, titles):
+        req = api.Request(site=self.site, action="query", redirects="",
+                          prop="info", titles=titles)
+        self._update(titles, req.submit())
+
+    def _update(self, titles, data):
+        """Store the information of an API response about titles."""
+        if 'query' not in data:
+            raise RuntimeError("No results given.")
+        query = data['query']
+        for item in query.get('normalized', []):
+            self._normalized[item['from']] = item['to']
+        for item in query.get('redirects', []):
+            self._targets[item['from']] = item['to']
+        for page in query.get('pages', {}).values():
+            if 'redirect' in page:
+                # an intermediate target which the API did not resolve; it
+                # is requested in the next batch unless already known
+                continue
+            self._pages[page['title']] = 'missing' not in page \
+                                         and 'invalid' not in page
+        for title in titles:
+            title = self._normalized.get(title, title)
+            if title not in self._targets and title not in self._pages:
+                # not resolvable, e.g. an interwiki link
+                self._pages[title] = None
+
+
 class RedirectGenerator:
     def __init__(self, xmlFilename=None, namespaces=[], offset=-1,
                  use_move_log=False, use_api=False, start=None, until=None,
@@ -171,20 +298,6 @@ class RedirectGenerator:
                     return
                 yield p
 
-    def _next_redirect_group(self):
-        """
-        Return a generator that retrieves pageids from the API 500 at a time
-        and yields them as a list
-        """
-        apiQ = []
-        for page in self.get_redirect_pages_via_api():
-            apiQ.append(str(page._pageid))
-            if len(apiQ) >= 500:
-                yield apiQ
-                apiQ = []
-        if apiQ:
-            yield apiQ
-
     def get_redirects_via_api(self, maxlen=8):
         """
         Return a generator that yields tuples of data about redirect Pages:
@@ -194,54 +307,31 @@ class RedirectGenerator:
                          1 - normal redirect, target page exists and is not a
                              redirect
                  2..maxlen - start of a redirect chain of that many redirects
-                             (currently, the API seems not to return sufficient
-                             data to make these return values possible, but
-                             that may change)
                   maxlen+1 - start of an even longer chain, or a loop
-                             (currently, the API seems not to return sufficient
-                             data to allow this return values, but that may
-                             change)
-                      None - start of a redirect chain of unknown length, or loop
+                      None - redirect to a target of unknown status, e.g.
+                             an interwiki link
             2 - target page title of the redirect, or chain (may not exist)
             3 - target page of the redirect, or end of chain, or page title where
                 chain or loop detecton was halted, or None if unknown
         """
-        for apiQ in self._next_redirect_group():
-            gen = pywikibot.data.api.Request(action="query", redirects="",
-                                             pageids=apiQ)
-            data = gen.submit()
-            if 'error' in data:
-                raise RuntimeError("API query error: %s" % data)
-            if data == [] or 'query' not in data:
-                raise RuntimeError("No results given.")
-            redirects = {}
-            pages = {}
-            redirects = dict((x['from'], x['to'])
-                             for x in data['query']['redirects'])
-
-            for pagetitle in data['query']['pages'].values():
-                if 'missing' in pagetitle and 'pageid' not in pagetitle:
-                    pages[pagetitle['title']] = False
+        resolver = RedirectResolver(self.site, maxlen)
+        titles = (page.title() for page in self.get_redirect_pages_via_api())
+        for (redirect, length, final) in resolver.resolve(titles):
+            if length == 0:
+                # not a redirect (any more)
+                continue
+            target = resolver.target(redirect)
+            if length is None:
+                result = maxlen + 1
+            elif length == 1 and resolver.exists(final) is not True:
+                if resolver.exists(final) is False:
+                    result = 0
                 else:
-                    pages[pagetitle['title']] = True
-            for redirect in redirects:
-                target = redirects[redirect]
-                result = 0
-                final = None
-                try:
-                    if pages[target]:
-                        final = target
-                        try:
-                            while result <= maxlen:
-                               result += 1
-                               final = redirects[final]
-                            # result = None
-                        except KeyError:
-                            pass
-                except KeyError:
                     result = None
-                    pass
-                yield (redirect, result, target, final)
+                    final = None
+            else:
+                result = length
+            yield (redirect, result, target, final)
 
     def retrieve_broken_redirects(self):
         if self.use_api:
@@ -282,20 +372,35 @@ class RedirectGenerator:
 ##                    yield key
 
     def retrieve_double_redirects(self):
+        """Return a generator that yields tuples of data about double
+        redirects:
+            0 - page title of the redirect page
+            1 - the titles of its redirect chain, from the redirect page to
+                the existing page at its end (see L{RedirectResolver.chain}),
+                or None if the chain is not known, ends at a missing page,
+                or forms a loop
+            2 - the title of the final target, or None if unknown
+        """
         if self.use_move_log:
             for redir_page in self.get_moved_pages_redirects():
-                yield redir_page.title()
+                yield redir_page.title(), None, None
             return
         else:
             count = 0
-            for (pagetitle, type, target, final) \
-                    in self.get_redirects_via_api(maxlen=2):
-                if type != 0 and type != 1:
-                    yield pagetitle
-                    if self.api_number:
-                        count += 1
-                        if count >= self.api_number:
-                            break
+            resolver = RedirectResolver(self.site)
+            titles = (page.title()
+                      for page in self.get_redirect_pages_via_api())
+            for (redirect, length, final) in resolver.resolve(titles):
+                if length is not None and length < 2:
+                    continue
+                if length is not None and resolver.exists(final):
+                    yield redirect, resolver.chain(redirect), final
+                else:
+                    yield redirect, None, final
+                if self.api_number:
+                    count += 1
+                    if count >= self.api_number:
+                        break
 
 # TODO: API cannot yet deliver contents of "special" pages
 ##        elif self.xmlFilename == None:
@@ -443,17 +548,89 @@ class RedirectRobot:
         pywikibot.output(u'')
 
     def fix_double_redirects(self):
-        for redir_name in self.generator.retrieve_double_redirects():
-            self.fix_1_double_redirect(redir_name)
+        # the redirect pages, by id, with their chains
+        redirects = {}
+
+        def pages():
+            for (redir_name, chain, final) \
+                    in self.generator.retrieve_double_redirects():
+                redir = pywikibot.Page(self.site, redir_name)
+                if chain is not None:
+                    chain = [redir] + [pywikibot.Page(self.site, title)
+                                       for title in chain[1:]]
+                    # the intermediate redirects are preloaded first, to
+                    # look for __STATICREDIRECT__ in them
+                    for page in chain[1:-1]:
+                        yield page
+                redirects[id(redir)] = (redir, chain)
+                yield redir
+
+        for page in pagegenerators.PreloadingGenerator(pages()):
+            if id(page) not in redirects:
+                continue
+            redir, chain = redirects.pop(id(page))
+            self.fix_1_double_redirect(redir, chain)
             if self.exiting:
                 break
 
-    def fix_1_double_redirect(self,  redir_name):
-            redir = pywikibot.Page(self.site, redir_name)
-            # Show the title of the page we're working on.
-            # Highlight the title in purple.
-            pywikibot.output(u"\n\n>>> \03{lightpurple}%s\03{default} <<<"
-                              % redir.title())
+    def fix_1_double_redirect(self, redir, chain=None):
+        """Make redirect redir link to the end of its redirect chain.
+
+        @param redir: the redirect, a Page or a page title
+        @param chain: (optional) the Pages from redir to the existing page
+            at the end of its chain; the chain is only followed page by page
+            again if the text of redir does not link to its second Page
+
+        """
+        if not isinstance(redir, pywikibot.Page):
+            redir = pywikibot.Page(self.site, redir)
+        # Show the title of the page we're working on.
+        # Highlight the title in purple.
+        pywikibot.output(u"\n\n>>> \03{lightpurple}%s\03{default} <<<"
+                          % redir.title())
+        if chain is not None:
+            targetPage = self._chain_target(redir, chain)
+            if targetPage is not None:
+                self._retarget(redir, targetPage)
+                return
+        self._follow_chain(redir)
+
+    def _chain_target(self, redir, chain):
+        """Return the page that redir should link to according to chain, or
+        None if the text of redir does not agree with chain."""
+        try:
+            match = self.site.redirectRegex().match(
+                        redir.get(get_redirect=True))
+        except pywikibot.Error:
+            return None
+        if match is None:
+            return None
+        try:
+            target = pywikibot.Page(self.site, match.group(1))
+        except pywikibot.Error:
+            return None
+        if target.site != self.site or target.title(withSection=False) \
+                != chain[1].title(withSection=False):
+            return None
+        if self.site.sitename() == 'wikipedia:en':
+            mw_msg = self.site.mediawiki_message(
+                         'wikieditor-toolbar-tool-redirect-example')
+        else:
+            mw_msg = None
+        for targetPage in chain[1:]:
+            pywikibot.output(u'   Links to: %s.'
+                             % targetPage.title(asLink=True))
+            if targetPage.title() == mw_msg:
+                pywikibot.output(
+                    u"Skipping toolbar example: Redirect source is potentially vandalized.")
+                return None
+            if targetPage is not chain[-1] and targetPage.isStaticRedirect():
+                pywikibot.output(u"   Redirect target is STATICREDIRECT.")
+                break
+        return targetPage
+
+    def _follow_chain(self, redir):
+            """Follow the chain of redir page by page, and fix redir."""
             newRedir = redir
             redirList = []  # bookkeeping to detect loops
             while True:
@@ -566,44 +743,48 @@ class RedirectRobot:
                         else:
                             newRedir = targetPage
                             continue
-                try:
-                    oldText = redir.get(get_redirect=True)
-                except pywikibot.BadTitle:
-                    pywikibot.output(u"Bad Title Error")
-                    break
-                text = self.site.redirectRegex().sub(
-                    '#%s %s' % (self.site.redirect(True),
-                                targetPage.title(asLink=True)), oldText)
-                if text == oldText:
-                    pywikibot.output(u"Note: Nothing left to do on %s"
-                                     % redir.title(asLink=True))
-                    break
-                summary = i18n.twtranslate(self.site, 'redirect-fix-double',
-                                           {'to': targetPage.title(asLink=True)}
-                                           )
-                pywikibot.showDiff(oldText, text)
-                if self.prompt(u'Do you want to accept the changes?'):
-                    try:
-                        redir.put(text, summary)
-                    except pywikibot.LockedPage:
-                        pywikibot.output(u'%s is locked.' % redir.title())
-                    except pywikibot.SpamfilterError, error:
-                        pywikibot.output(
-                            u"Saving page [[%s]] prevented by spam filter: %s"
-                            % (redir.title(), error.url))
-                    except pywikibot.PageNotSaved, error:
-                        pywikibot.output(u"Saving page [[%s]] failed: %s"
-                                         % (redir.title(), error))
-                    except pywikibot.NoUsername:
-                        pywikibot.output(
-                            u"Page [[%s]] not saved; sysop privileges required."
-                            % redir.title())
-                    except pywikibot.Error, error:
-                        pywikibot.output(
-                            u"Unexpected error occurred trying to save [[%s]]: %s"
-                            % (redir.title(), error))
+                self._retarget(redir, targetPage)
                 break
 
+    def _retarget(self, redir, targetPage):
+        """Make redir link to targetPage, after asking the user."""
+        try:
+            oldText = redir.get(get_redirect=True)
+        except pywikibot.BadTitle:
+            pywikibot.output(u"Bad Title Error")
+            return
+        text = self.site.redirectRegex().sub(
+            '#%s %s' % (self.site.redirect(True),
+                        targetPage.title(asLink=True)), oldText)
+        if text == oldText:
+            pywikibot.output(u"Note: Nothing left to do on %s"
+                             % redir.title(asLink=True))
+            return
+        summary = i18n.twtranslate(self.site, 'redirect-fix-double',
+                                   {'to': targetPage.title(asLink=True)}
+                                   )
+        pywikibot.showDiff(oldText, text)
+        if self.prompt(u'Do you want to accept the changes?'):
+            try:
+                redir.put(text, summary)
+            except pywikibot.LockedPage:
+                pywikibot.output(u'%s is locked.' % redir.title())
+            except pywikibot.SpamfilterError, error:
+                pywikibot.output(
+                    u"Saving page [[%s]] prevented by spam filter: %s"
+                    % (redir.title(), error.url))
+            except pywikibot.PageNotSaved, error:
+                pywikibot.output(u"Saving page [[%s]] failed: %s"
+                                 % (redir.title(), error))
+            except pywikibot.NoUsername:
+                pywikibot.output(
+                    u"Page [[%s]] not saved; sysop privileges required."
+                    % redir.title())
+            except pywikibot.Error, error:
+                pywikibot.output(
+                    u"Unexpected error occurred trying to save [[%s]]: %s"
+                    % (redir.title(), error))
+
     def fix_double_or_delete_broken_redirects(self):
         # TODO: part of this should be moved to generator, the rest merged into self.run()
         # get reason for deletion text
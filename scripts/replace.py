@@ -139,61 +139,31 @@ docuReplacements = {
 }
 
 
-class XmlDumpReplacePageGenerator:
+class XmlDumpReplaceMatcher(object):
     """
-    Iterator that will yield Pages that might contain text to replace.
+    Callable which decides whether a dump entry contains text to replace.
 
-    These pages will be retrieved from a local XML dump file.
-    Arguments:
-        * xmlFilename  - The dump's path, either absolute or relative
-        * xmlStart     - Skip all articles in the dump before this one
-        * replacements - A list of 2-tuples of original text (as a
-                         compiled regular expression) and replacement
-                         text (as a string).
-        * exceptions   - A dictionary which defines when to ignore an
-                         occurence. See docu of the ReplaceRobot
-                         constructor below.
+    Instances are sent to the worker processes which search the dump.  The
+    worker processes cannot query the wiki, so all regular expressions,
+    including those that depend on the site, are compiled here.
 
     """
-    def __init__(self, xmlFilename, xmlStart, replacements, exceptions):
-        self.xmlFilename = xmlFilename
-        self.replacements = replacements
+    def __init__(self, replacements, exceptions, site):
         self.exceptions = exceptions
-        self.xmlStart = xmlStart
-        self.skipping = bool(xmlStart)
 
-        self.excsInside = []
+        excsInside = []
         if "inside-tags" in self.exceptions:
-            self.excsInside += self.exceptions['inside-tags']
+            excsInside += self.exceptions['inside-tags']
         if "inside" in self.exceptions:
-            self.excsInside += self.exceptions['inside']
-        import xmlreader
-        self.site = pywikibot.getSite()
-        dump = xmlreader.XmlDump(self.xmlFilename)
-        self.parser = dump.parse()
+            excsInside += self.exceptions['inside']
+        self.replacementSet = pywikibot.ReplacementSet(replacements,
+                                                       excsInside, site=site)
 
-    def __iter__(self):
-        try:
-            for entry in self.parser:
-                if self.skipping:
-                    if entry.title != self.xmlStart:
-                        continue
-                    self.skipping = False
-                if not self.isTitleExcepted(entry.title) \
-                        and not self.isTextExcepted(entry.text):
-                    new_text = entry.text
-                    for old, new in self.replacements:
-                        new_text = pywikibot.replaceExcept(new_text, old, new, self.excsInside, self.site)
-                    if new_text != entry.text:
-                        yield pywikibot.Page(self.site, entry.title)
-        except KeyboardInterrupt:
-            try:
-                if not self.skipping:
-                    pywikibot.output(
-                        u'To resume, use "-xmlstart:%s" on the command line.'
-                        % entry.title)
-            except NameError:
-                pass
+    def __call__(self, entry):
+        if self.isTitleExcepted(entry.title) \
+                or self.isTextExcepted(entry.text):
+            return False
+        return self.replacementSet.apply(entry.text)[0] != entry.text
 
     def isTitleExcepted(self, title):
         if "title" in self.exceptions:
@@ -215,6 +185,46 @@ class XmlDumpReplacePageGenerator:
         return False
 
 
+class XmlDumpReplacePageGenerator:
+    """
+    Iterator that will yield Pages that might contain text to replace.
+
+    These pages will be retrieved from a local XML dump file, which is
+    searched by several processes in parallel (see config.xml_dump_processes).
+    Arguments:
+        * xmlFilename  - The dump's path, either absolute or relative
+        * xmlStart     - Skip all articles in the dump before this one
+        * replacements - A list of 2-tuples of original text (as a
+                         compiled regular expression) and replacement
+                         text (as a string).
+        * exceptions   - A dictionary which defines when to ignore an
+                         occurence. See docu of the ReplaceRobot
+                         constructor below.
+
+    """
+    def __init__(self, xmlFilename, xmlStart, replacements, exceptions):
+        self.xmlFilename = xmlFilename
+        self.replacements = replacements
+        self.exceptions = exceptions
+        self.xmlStart = xmlStart
+
+        from pywikibot import xmlreader
+        self.site = pywikibot.getSite()
+        self.matcher = XmlDumpReplaceMatcher(self.replacements,
+                                             self.exceptions, self.site)
+        self.dump = xmlreader.XmlDump(self.xmlFilename)
+
+    def __iter__(self):
+        try:
+            for title in self.dump.scan(self.matcher, start=self.xmlStart):
+                yield pywikibot.Page(self.site, title)
+        except KeyboardInterrupt:
+            if self.dump.resume:
+                pywikibot.output(
+                    u'To resume, use "-xmlstart:%s" on the command line.'
+                    % self.dump.resume)
+
+
 class ReplaceRobot:
     """
     A bot that can do text replacements.
@@ -261,6 +271,16 @@ class ReplaceRobot:
         self.exceptions = exceptions
         self.acceptall = acceptall
         self.allowoverlap = allowoverlap
+        inside = []
+        if "inside-tags" in self.exceptions:
+            inside += self.exceptions['inside-tags']
+        if "inside" in self.exceptions:
+            inside += self.exceptions['inside']
+        self.replacementSet = pywikibot.ReplacementSet(
+                                  replacements, inside,
+                                  allowoverlap=allowoverlap)
+        # number of times each replacement has been made
+        self.counts = [0] * len(replacements)
         self.recursive = recursive
         if addedCat:
             site = pywikibot.getSite()
@@ -300,23 +320,35 @@ class ReplaceRobot:
         Returns the text which is generated by applying all replacements to
         the given text.
         """
-        new_text = original_text
-        exceptions = []
-        if "inside-tags" in self.exceptions:
-            exceptions += self.exceptions['inside-tags']
-        if "inside" in self.exceptions:
-            exceptions += self.exceptions['inside']
-        for old, new in self.replacements:
-            if self.sleep != None:
-                time.sleep(self.sleep)
-            new_text = pywikibot.replaceExcept(new_text, old, new, exceptions,
-                                               allowoverlap=self.allowoverlap)
+        if self.sleep != None:
+            time.sleep(self.sleep * len(self.replacements))
+        new_text, counts = self.replacementSet.apply(original_text)
+        for i in xrange(len(counts)):
+            self.counts[i] += counts[i]
         return new_text
 
+    def showStatistics(self):
+        """Output how often each of the replacements has been made."""
+        if len(self.replacements) < 2 or not any(self.counts):
+            return
+        pywikibot.output(u'\nReplacements made:')
+        for i in xrange(len(self.replacements)):
+            if self.counts[i]:
+                old = self.replacements[i][0]
+                pywikibot.output(u'%7i  %s'
+                                 % (self.counts[i],
+                                    getattr(old, 'pattern', old)))
+
     def run(self):
         """
         Starts the robot.
         """
+        try:
+            self.treatPages()
+        finally:
+            self.showStatistics()
+
+    def treatPages(self):
         # Run the generator which will yield Pages which might need to be
         # changed.
         for page in self.generator:
@@ -669,10 +701,9 @@ LIMIT 200""" % (whereClause, exceptClause)
         pywikibot.showHelp('replace')
         return
     if xmlFilename:
-        # XML parsing can be quite slow, so use smaller batches and
-        # longer lookahead.
-        preloadingGen = pagegenerators.PreloadingGenerator(gen,
-                                            pageNumber=20, lookahead=100)
+        # matching pages are found slowly in the dump, so use smaller
+        # batches to start working on them sooner
+        preloadingGen = pagegenerators.PreloadingGenerator(gen, step=20)
     else:
         preloadingGen = pagegenerators.PreloadingGenerator(gen)
     bot = ReplaceRobot(preloadingGen, replacements, exceptions, acceptall,
@@ -94,6 +94,19 @@ from pywikibot import config, pagegenerators, catlib
 from scripts import replace
 import re, sys, string
 
+class XmlDumpTemplateMatcher(object):
+    """
+    Callable which tells whether a dump entry uses one of the templates.
+
+    This is a module level class so that it can be sent to the processes
+    which search the dump.
+    """
+    def __init__(self, templateRegex):
+        self.templateRegex = templateRegex
+
+    def __call__(self, entry):
+        return self.templateRegex.search(entry.text) is not None
+
 class XmlDumpTemplatePageGenerator:
     """
     Generator which will yield Pages to pages that might contain the chosen
@@ -107,7 +120,6 @@ class XmlDumpTemplatePageGenerator:
                               templates
             * xmlfilename   - The dump's path, either absolute or relative
         """
-        raise NotImplementedError("Sorry, no XML reader in rewrite yet.")
         self.templates = templates
         self.xmlfilename = xmlfilename
 
@@ -115,7 +127,7 @@ class XmlDumpTemplatePageGenerator:
         """
         Yield page objects until the entire XML dump has been read.
         """
-        import xmlreader
+        from pywikibot import xmlreader
         mysite = pywikibot.getSite()
         dump = xmlreader.XmlDump(self.xmlfilename)
         # regular expression to find the original template.
@@ -131,10 +143,10 @@ class XmlDumpTemplatePageGenerator:
             templatePatterns.append(templatePattern)
         templateRegex = re.compile(r'\{\{ *([mM][sS][gG]:)?(?:%s) *(?P<parameters>\|[^}]+|) *}}' % '|'.join(templatePatterns))
 
-        for entry in dump.parse():
-            if templateRegex.search(entry.text):
-                page = pywikibot.Page(mysite, entry.title)
-                yield page
+        matcher = XmlDumpTemplateMatcher(templateRegex)
+        for title in dump.scan(matcher):
+            page = pywikibot.Page(mysite, title)
+            yield page
 
 class TemplateRobot:
     """
@@ -66,59 +66,77 @@ class UploadRobot:
         return "://" in self.url or os.path.exists(self.url)
 
     def read_file_content(self):
-        """Return name of temp file in which remote file is saved."""
+        """Return name of temp file in which remote file is saved.
+
+        The file is written to disk as it is downloaded, so that large files
+        are not held in memory.
+
+        """
         pywikibot.output(u'Reading file %s' % self.url)
-        resume = False
         dt = 15
-        uo = urllib.URLopener()
         retrieved = False
+        handle, tempname = tempfile.mkstemp()
+        t = os.fdopen(handle, "wb")
+        start = 0   # the offset at which the current download starts
 
-        while not retrieved:
-            if resume:
-                pywikibot.output(u"Resume download...")
-                uo.addheader('Range', 'bytes=%s-' % rlen)
+        try:
+            while not retrieved:
+                uo = urllib.URLopener()
+                if start:
+                    pywikibot.output(u"Resume download...")
+                    uo.addheader('Range', 'bytes=%s-' % start)
 
-            infile = uo.open(self.url)
+                infile = uo.open(self.url)
 
-            if 'text/html' in infile.info().getheader('Content-Type'):
-                print \
+                if 'text/html' in infile.info().getheader('Content-Type'):
+                    print \
 "Couldn't download the image: the requested URL was not found on server."
-                return
-
-            content_len = infile.info().getheader('Content-Length')
-            accept_ranges = infile.info().getheader('Accept-Ranges') == 'bytes'
-
-            if resume:
-                _contents += infile.read()
-            else:
-                _contents = infile.read()
-
-            infile.close()
-            retrieved = True
-
-            if content_len:
-                rlen = len(_contents)
-                content_len = int(content_len)
-                if rlen < content_len:
-                    retrieved = False
-                    pywikibot.output(
-                        u"Connection closed at byte %s (%s left)"
-                         % (rlen, content_len))
-                    if accept_ranges and rlen > 0:
-                        resume = True
-                    pywikibot.output(u"Sleeping for %d seconds..." % dt)
-                    time.sleep(dt)
-                    if dt <= 60:
-                        dt += 15
-                    elif dt < 360:
-                        dt += 60
-            else:
-                pywikibot.log(
+                    infile.close()
+                    t.close()
+                    os.remove(tempname)
+                    return
+
+                content_len = infile.info().getheader('Content-Length')
+                accept_ranges = \
+                    infile.info().getheader('Accept-Ranges') == 'bytes'
+
+                t.seek(start)
+                t.truncate()
+                rlen = start
+                while True:
+                    data = infile.read(65536)
+                    if not data:
+                        break
+                    t.write(data)
+                    rlen += len(data)
+
+                infile.close()
+                retrieved = True
+
+                if content_len:
+                    # a resumed download only sends the rest of the file
+                    content_len = start + int(content_len)
+                    if rlen < content_len:
+                        retrieved = False
+                        pywikibot.output(
+                            u"Connection closed at byte %s (%s left)"
+                             % (rlen, content_len))
+                        if accept_ranges and rlen > 0:
+                            start = rlen
+                        else:
+                            start = 0
+                        pywikibot.output(u"Sleeping for %d seconds..." % dt)
+                        time.sleep(dt)
+                        if dt <= 60:
+                            dt += 15
+                        elif dt < 360:
+                            dt += 60
+                else:
+                    pywikibot.log(
                     u"WARNING: No check length to retrieved data is possible.")
-        handle, tempname = tempfile.mkstemp()
-        t = os.fdopen(handle, "wb")
-        t.write(_contents)
-        t.close()
+        finally:
+            if not t.closed:
+                t.close()
         return tempname
 
     def process_filename(self):
@@ -6,9 +6,18 @@
 #
 __version__ = '$Id$'
 
+import cgi
+import hashlib
+import httplib2
+import json
+import tempfile
+import threading
 import unittest
+import urlparse
+from StringIO import StringIO
 import pywikibot
 import pywikibot.data.api as api
+from pywikibot.comms import fakeapi, http
 
 mysite = pywikibot.Site('en', 'wikipedia')
 
@@ -33,6 +42,375 @@ class TestApiFunctions(unittest.TestCase):
         self.assert_(all(len(item) == 2 for item in req.iteritems()))
 
 
+class TestBatchSizer(unittest.TestCase):
+
+    def testSmallPages(self):
+        """Test that the batch size grows up to the maximum for small pages"""
+        sizer = api.BatchSizer(500)
+        for i in range(10):
+            sizer.update(sizer.get(), sizer.get() * 2000, 1.0)
+        self.assertEqual(sizer.get(), 500)
+
+    def testLargePages(self):
+        """Test that the batch size shrinks for large or slow responses"""
+        sizer = api.BatchSizer(500)
+        for i in range(10):
+            sizer.update(sizer.get(), sizer.get() * 300000, 1.0)
+        self.assertEqual(sizer.get(), 6)
+        sizer = api.BatchSizer(500)
+        sizer.update(50, 50000, 60.0)
+        self.assertEqual(sizer.get(), 25)
+
+    def testFailure(self):
+        sizer = api.BatchSizer(50)
+        sizer.failed()
+        self.assertEqual(sizer.get(), 25)
+        for i in range(10):
+            sizer.failed()
+        self.assertEqual(sizer.get(), 1)
+
+
+class TestBatchSizerUse(unittest.TestCase):
+    """Test which queries adapt the shared batch size, with the fake API"""
+
+    def setUp(self):
+        self.api = fakeapi.FakeAPI()
+        for i in range(5):
+            self.api.add_page(u"History", u"%i" % i * 300000)
+        self.api.add_page(u"Other", u"text")
+        self.transports = [thread.http for thread in http.threads]
+        for thread in http.threads:
+            thread.http = self.api
+        self.loginstatus = mysite._loginstatus
+        mysite._loginstatus = -1
+        self.sizer = api._sizers.pop(mysite, None)
+
+    def tearDown(self):
+        for thread, old in zip(http.threads, self.transports):
+            thread.http = old
+        mysite._loginstatus = self.loginstatus
+        api._sizers.pop(mysite, None)
+        if self.sizer is not None:
+            api._sizers[mysite] = self.sizer
+
+    def testHistory(self):
+        """Test that a history of large revisions leaves the size alone"""
+        size = api.batch_sizer(mysite).get()
+        page = pywikibot.Page(mysite, u"History")
+        mysite.loadrevisions(page, getText=True, total=5, step=5)
+        self.assertEqual(len(page._revisions), 5)
+        self.assertEqual(api.batch_sizer(mysite).get(), size)
+
+    def testGenerator(self):
+        """Test that a generator with content adapts the size"""
+        gen = api.PageGenerator("allpages", g_content=True, site=mysite)
+        self.assertEqual(sorted(page.title() for page in gen),
+                         [u"History", u"Other"])
+        self.assertTrue(api.batch_sizer(mysite).get() < 50)
+
+
+class TestMultipartBody(unittest.TestCase):
+
+    def testBody(self):
+        """Test that a part of a file is sent in small blocks"""
+        f = tempfile.NamedTemporaryFile()
+        f.write("0123456789" * 10)
+        f.flush()
+        body = api.MultipartBody()
+        body.add_field("action", "upload")
+        body.add_file("chunk", f.name, "image/png", 15, 20)
+        body.close()
+        blocks = list(iter(lambda: body.read(8), ""))
+        self.assertEqual(len("".join(blocks)), len(body))
+        self.assertTrue(max(len(block) for block in blocks) <= 8)
+        form = cgi.FieldStorage(fp=StringIO("".join(blocks)),
+                    environ={'REQUEST_METHOD': 'POST',
+                             'CONTENT_TYPE': 'multipart/form-data; '
+                                             'boundary=%s' % body.boundary,
+                             'CONTENT_LENGTH': str(len(body))})
+        self.assertEqual(form.getvalue("action"), "upload")
+        self.assertEqual(form["chunk"].value, "56789012345678901234")
+        f.close()
+
+    def testRewind(self):
+        """Test that a rewound body is read again from the start"""
+        f = tempfile.NamedTemporaryFile()
+        f.write("0123456789" * 10)
+        f.flush()
+        start = hashlib.sha1("first")
+        body = api.MultipartBody(start)
+        body.add_field("action", "upload")
+        body.add_file("chunk", f.name, "image/png", 15, 20)
+        body.close()
+        data = "".join(iter(lambda: body.read(8), ""))
+        self.assertEqual(body.digest.hexdigest(),
+                         hashlib.sha1("first56789012345678901234").hexdigest())
+        # rewind in the middle of the file part
+        body.seek(0)
+        while body._file is None:
+            body.read(8)
+        body.seek(0)
+        self.assertEqual(body._file, None)
+        self.assertEqual("".join(iter(lambda: body.read(8), "")), data)
+        self.assertEqual(body.digest.hexdigest(),
+                         hashlib.sha1("first56789012345678901234").hexdigest())
+        # the digest the body was created with is not changed
+        self.assertEqual(start.hexdigest(), hashlib.sha1("first").hexdigest())
+        self.assertRaises(IOError, body.seek, 10)
+        f.close()
+
+
+class UploadAPI(fakeapi.FakeAPI):
+    """FakeAPI that stores the chunks of a stashed upload"""
+
+    def __init__(self):
+        fakeapi.FakeAPI.__init__(self)
+        self.stash = ""
+
+    def request(self, uri, method="GET", body=None, *args, **kwargs):
+        if not isinstance(body, api.MultipartBody):
+            return fakeapi.FakeAPI.request(self, uri, method, body,
+                                           *args, **kwargs)
+        # the first attempt to send the body is cut off, like on a
+        # keep-alive connection that was closed by the server
+        body.read(100)
+        body.seek(0)
+        form = cgi.FieldStorage(fp=StringIO("".join(iter(body.read, ""))),
+                    environ={'REQUEST_METHOD': 'POST',
+                             'CONTENT_TYPE': 'multipart/form-data; '
+                                             'boundary=%s' % body.boundary,
+                             'CONTENT_LENGTH': str(len(body))})
+        assert int(form.getvalue("offset")) == len(self.stash)
+        self.stash += form["chunk"].value
+        result = {"result": "Success", "filekey": "key"}
+        if len(self.stash) < int(form.getvalue("filesize")):
+            result.update(result="Continue", offset=len(self.stash))
+        return (httplib2.Response({"status": "200"}),
+                json.dumps({"upload": result}))
+
+
+class TestChunkedUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.api = UploadAPI()
+        self.transports = [thread.http for thread in http.threads]
+        for thread in http.threads:
+            thread.http = self.api
+        self.loginstatus = mysite._loginstatus
+        mysite._loginstatus = -1
+        self.writedelay = mysite.throttle.writedelay
+        mysite.throttle.writedelay = 0
+        self.file = tempfile.NamedTemporaryFile()
+        self.data = "".join(chr(i) for i in range(256)) * 4
+        self.file.write(self.data)
+        self.file.flush()
+        self.page = pywikibot.ImagePage(mysite, u"File:Test.png")
+
+    def tearDown(self):
+        self.file.close()
+        mysite.throttle.writedelay = self.writedelay
+        mysite._loginstatus = self.loginstatus
+        for thread, old in zip(http.threads, self.transports):
+            thread.http = old
+
+    def testDigest(self):
+        """Test that the digest is computed from the chunks that are sent"""
+        result, digest = mysite._upload_chunks(self.page, self.file.name,
+                                               len(self.data), 300, u"+\\",
+                                               False, None, 0)
+        self.assertEqual(result["result"], "Success")
+        self.assertEqual(self.api.stash, self.data)
+        self.assertEqual(digest, hashlib.sha1(self.data).hexdigest())
+
+    def testResume(self):
+        self.api.stash = self.data[:500]
+        result, digest = mysite._upload_chunks(self.page, self.file.name,
+                                               len(self.data), 300, u"+\\",
+                                               False, "key", 500)
+        self.assertEqual(self.api.stash, self.data)
+        self.assertEqual(digest, hashlib.sha1(self.data).hexdigest())
+
+
+class GatedAPI(fakeapi.FakeAPI):
+    """FakeAPI that holds back the answers for a host until its gate is
+    opened, and that can fail requests"""
+
+    def __init__(self):
+        fakeapi.FakeAPI.__init__(self)
+        self.gates = {}     # host -> threading.Event
+        self.failures = []  # results returned instead of the next answers
+        self.calls = 0
+
+    def request(self, uri, *args, **kwargs):
+        host = urlparse.urlparse(uri)[1]
+        if host in self.gates:
+            self.gates[host].wait(10)
+        self.lock.acquire()
+        try:
+            self.calls += 1
+            if self.failures:
+                return self.failures.pop(0)
+        finally:
+            self.lock.release()
+        return fakeapi.FakeAPI.request(self, uri, *args, **kwargs)
+
+
+class TestAsync(unittest.TestCase):
+    """Test the asynchronous requests with the fake API"""
+
+    def setUp(self):
+        self.api = GatedAPI()
+        self.transports = [thread.http for thread in http.threads]
+        for thread in http.threads:
+            thread.http = self.api
+        # one request per host is sent at a time, so use several sites
+        self.sites = [pywikibot.Site(code, 'wikipedia')
+                      for code in ('en', 'de', 'fr')]
+        self.loginstatus = [site._loginstatus for site in self.sites]
+        for site in self.sites:
+            site._loginstatus = -1
+
+    def tearDown(self):
+        for thread, old in zip(http.threads, self.transports):
+            thread.http = old
+        for site, loginstatus in zip(self.sites, self.loginstatus):
+            site._loginstatus = loginstatus
+
+    def request(self, site, **params):
+        params.setdefault("action", "query")
+        params.setdefault("meta", "userinfo")
+        req = api.Request(site=site, **params)
+        req.retry_wait = 0
+        return req
+
+    def testRequestAsync(self):
+        """Test that get_response() returns the data or raises the error"""
+        site = mysite
+        uri = site.scriptpath() + "/api.php?action=query&meta=userinfo" \
+                                  "&format=json"
+        done = threading.Event()
+        request = http.request_async(site, uri,
+                                     callback=lambda request: done.set())
+        data = json.loads(http.get_response(site, request))
+        self.assertTrue("userinfo" in data["query"])
+        done.wait(10)
+        self.assertTrue(done.isSet())
+        self.api.failures.append(ValueError("connection reset"))
+        request = http.request_async(site, uri)
+        self.assertRaises(ValueError, http.get_response, site, request)
+
+    def testGather(self):
+        """Test that gather() yields the futures as their answers arrive"""
+        for site in self.sites:
+            self.api.gates[site.hostname()] = threading.Event()
+        futures = api.gather([self.request(site) for site in self.sites]
+                             + [self.request(mysite, action="unknown")])
+        self.api.gates[mysite.hostname()].set()
+        first, second = futures.next(), futures.next()
+        # a request that fails raises its error only in result()
+        for future in (first, second):
+            self.assertEqual(future.request.site, mysite)
+            self.assertTrue(future.done())
+        for site in self.sites[2:0:-1]:
+            self.api.gates[site.hostname()].set()
+            future = futures.next()
+            self.assertEqual(future.request.site, site)
+            self.assertTrue("userinfo" in future.result()["query"])
+        self.assertRaises(StopIteration, futures.next)
+
+    def testSubmitAsync(self):
+        """Test that the results are those of the requests"""
+        futures = [self.request(site, meta="siteinfo").submit_async()
+                   for site in self.sites]
+        self.assertEqual([future.result()["query"]["general"]["lang"]
+                          for future in futures], ["en", "en", "en"])
+        futures = [self.request(site, titles=title, prop="info")
+                   .submit_async() for site in self.sites
+                   for title in ("A", "B")]
+        self.assertEqual([future.result()["query"]["pages"].values()[0]
+                          ["title"] for future in futures],
+                         ["A", "B"] * 3)
+
+    def testException(self):
+        """Test that result() raises the error of the request every time"""
+        future = self.request(mysite, action="unknown").submit_async()
+        for i in range(2):
+            try:
+                future.result()
+            except api.APIError, err:
+                self.assertEqual(err.code, "unknown_action")
+            else:
+                self.fail("APIError not raised")
+        self.assertEqual(self.api.calls, 1)
+
+    def testRetry(self):
+        """Test that result() repeats a request that failed"""
+        self.api.failures.append(ValueError("connection reset"))
+        future = self.request(mysite).submit_async()
+        self.assertTrue("userinfo" in future.result()["query"])
+        self.assertEqual(self.api.calls, 2)
+
+        self.api.failures.extend([ValueError("connection reset")] * 3)
+        req = self.request(mysite)
+        req.max_retries = 1
+        future = req.submit_async()
+        self.assertRaises(api.TimeoutError, future.result)
+        self.assertEqual(self.api.calls, 4)
+
+
+class TestListGenerator(unittest.TestCase):
+    def setUp(self):
+        # do not query the paraminfo, but leave no trace in the module data
+        self.modules = api._modules.copy()
+        api._modules.setdefault("usercontribs",
+                                {"name": "usercontribs", "prefix": "uc",
+                                 "parameters": []})
+        self.gen = api.ListGenerator("usercontribs", site=mysite,
+                                     ucuser="Example")
+        data = {"query": {"usercontribs": [
+                    {"revid": 12, "user": "Example",
+                     "timestamp": "2010-01-01T00:00:00Z"},
+                    {"revid": 15, "user": "Example",
+                     "timestamp": "2010-01-02T00:00:00Z"},
+                    {"revid": 19, "user": "Example"}]}}
+        self.gen.request.submit = lambda: data
+
+    def tearDown(self):
+        api._modules.clear()
+        api._modules.update(self.modules)
+
+    def testColumns(self):
+        """Test that columns() yields the values of each key per batch"""
+        batches = list(self.gen.columns("revid", "timestamp"))
+        self.assertEqual(batches, [{"revid": [12, 15, 19],
+                                    "timestamp": ["2010-01-01T00:00:00Z",
+                                                  "2010-01-02T00:00:00Z",
+                                                  None]}])
+
+    def testLimit(self):
+        """Test that iteration stops at the item limit"""
+        self.gen.set_maximum_items(2)
+        self.assertEqual([item["revid"] for item in self.gen], [12, 15])
+
+    def testDebug(self):
+        """Test that the received items are only formatted for debugging"""
+        messages = []
+        debug, debugging = pywikibot.debug, pywikibot.debugging
+        pywikibot.debug = lambda text, layer: messages.append(text)
+        try:
+            pywikibot.debugging = lambda layer: False
+            list(self.gen)
+            self.assertFalse([text for text in messages
+                              if "received" in text])
+            pywikibot.debugging = lambda layer: True
+            list(self.gen)
+            received = [text for text in messages if "received" in text]
+            self.assertEqual(len(received), 1)
+            self.assertTrue("'revid': 12" in received[0])
+        finally:
+            pywikibot.debug, pywikibot.debugging = debug, debugging
+
+
 class TestPageGenerator(unittest.TestCase):
     def setUp(self):
         self.gen = api.PageGenerator(site=mysite,
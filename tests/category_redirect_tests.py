@@ -0,0 +1,104 @@
+# -*- coding: utf-8  -*-
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import codecs
+import cPickle
+import os
+import shutil
+import tempfile
+import unittest
+from scripts import category_redirect
+
+
+class TestCategoryRecord(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, "record.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def record(self):
+        return category_redirect.CategoryRecord(self.filename)
+
+    def lines(self):
+        f = codecs.open(self.filename, "r", "utf-8")
+        try:
+            return f.read().splitlines()
+        finally:
+            f.close()
+
+    def testRecord(self):
+        record = self.record()
+        self.assertEqual(len(record), 0)
+        record.add(u"Category:Á", "2011-01-01", 3)
+        record.add(u"Category:Á", "2011-01-02")
+        record.add(u"Category:B", "2011-01-01", 5)
+        record.remove(u"Category:B")
+        self.assertTrue(u"Category:Á" in record)
+        self.assertFalse(u"Category:B" in record)
+        self.assertFalse(os.path.exists(self.filename))
+        record.save()
+        self.assertEqual(record.changes, [])
+        # the changes are appended, and replayed when the file is read
+        self.assertEqual(len(self.lines()), 4)
+        record = self.record()
+        self.assertEqual(record.titles(), [u"Category:Á"])
+        self.assertEqual(record.data[u"Category:Á"],
+                         {"2011-01-01": 3, "2011-01-02": None})
+        record.add(u"Category:C", "2011-01-03", 1)
+        record.save()
+        self.assertEqual(len(self.lines()), 5)
+        self.assertEqual(sorted(self.record().titles()),
+                         [u"Category:C", u"Category:Á"])
+
+    def testRewrite(self):
+        """Test that the file is rewritten when most lines are obsolete"""
+        record = self.record()
+        for i in range(60):
+            record.add(u"Category:A", "2011-01-01", i + 1)
+        record.save()
+        # 60 lines for 1 entry are kept, as they are below the threshold
+        self.assertEqual(len(self.lines()), 60)
+        self.assertEqual(record.lines, 60)
+        for i in range(42):
+            record.add(u"Category:A", "2011-01-01", i + 1)
+        record.save()
+        self.assertEqual(len(self.lines()), 102)
+        # one more line exceeds 2 * entries + 100
+        record.add(u"Category:A", "2011-01-01", 7)
+        record.save()
+        self.assertEqual(self.lines(), [u"+\tCategory:A\t2011-01-01\t7"])
+        self.assertEqual(record.lines, 1)
+        self.assertFalse(os.path.exists(self.filename + ".new"))
+        self.assertEqual(self.record().data, record.data)
+
+    def testConvert(self):
+        """Test that the pickled record of older versions is converted"""
+        old = {u"Category:A": {"2011-01-01": 3, "2011-01-02": None},
+               u"Category:B": {"2011-01-01": 1}}
+        datafile = os.path.join(self.dir, "record")
+        f = open(datafile, "wb")
+        try:
+            cPickle.dump(old, f, -1)
+        finally:
+            f.close()
+        record = self.record()
+        record.convert(datafile)
+        self.assertEqual(record.data, old)
+        record.save()
+        self.assertEqual(self.record().data, old)
+        self.assertEqual(len(self.lines()), 3)
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
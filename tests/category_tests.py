@@ -0,0 +1,170 @@
+# -*- coding: utf-8  -*-
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import os
+import shutil
+import tempfile
+import unittest
+import pywikibot
+from pywikibot.site import APISite
+from scripts import category
+
+
+class StubSite(APISite):
+    """Site that answers category queries from dicts instead of the API"""
+
+    def __init__(self, *args, **kwargs):
+        APISite.__init__(self, *args, **kwargs)
+        # titles of the categories of each page, and its namespace
+        self.pages = {u'Category:Top': (14, []),
+                      u'Category:Sub': (14, [u'Category:Top']),
+                      u'Article': (0, [u'Category:Top', u'Category:Sub'])}
+        self.changes = [{'title': u'Other',
+                         'timestamp': u'2011-01-01T00:00:00Z'}]
+        self.requests = []
+
+    def logged_in(self, sysop=False):
+        return False
+
+    def categorymembers(self, category, **kwargs):
+        self.requests.append(('categorymembers', category.title()))
+        for title, (ns, cats) in sorted(self.pages.items()):
+            if category.title() in cats:
+                yield pywikibot.Page(self, title, ns)
+
+    def pagecategories(self, page, **kwargs):
+        self.requests.append(('pagecategories', page.title()))
+        for title in self.pages[page.title()][1]:
+            yield pywikibot.Category(self, title)
+
+    def recentchanges(self, start=None, reverse=False, total=None, **kwargs):
+        self.requests.append(('recentchanges', start))
+        changes = self.changes
+        if start is not None:
+            changes = [change for change in changes
+                       if change['timestamp'] >= start]
+        if not reverse:
+            changes = changes[::-1]
+        return iter(changes[:total])
+
+
+class StubDatabase(category.CategoryDatabase):
+    """CategoryDatabase that takes the categories of pages from its
+    StubSite instead of a PropertyGenerator"""
+
+    def _categories(self, titles):
+        self.site.requests.append(('categories', list(titles)))
+        return dict((title, self.site.pages[title]) for title in titles
+                    if title in self.site.pages)
+
+
+class TestCategoryDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.site = StubSite('en', 'wikipedia')
+        self.db = StubDatabase(filename=os.path.join(self.dir, 'test.db'),
+                               site=self.site)
+
+    def tearDown(self):
+        self.db.dump()
+        shutil.rmtree(self.dir)
+
+    def testMembers(self):
+        top = pywikibot.Category(self.site, u'Category:Top')
+        self.assertEqual([cat.title() for cat in self.db.getSubcats(top)],
+                         [u'Category:Sub'])
+        self.assertEqual([page.title() for page in self.db.getArticles(top)],
+                         [u'Article'])
+        self.assertEqual(self.site.requests,
+                         [('recentchanges', None),
+                          ('categorymembers', u'Category:Top')])
+        # the stored members survive reopening the file
+        self.db.dump()
+        db = StubDatabase(filename=self.db.filename, site=self.site)
+        self.assertEqual([cat.title() for cat in db.getSubcats(top)],
+                         [u'Category:Sub'])
+        self.assertEqual(len(self.site.requests), 2)
+        db.dump()
+
+    def testMaxage(self):
+        top = pywikibot.Category(self.site, u'Category:Top')
+        self.db.maxage = -1
+        self.db.getSubcats(top)
+        self.db.getArticles(top)
+        self.assertEqual(self.site.requests,
+                         [('recentchanges', None),
+                          ('categorymembers', u'Category:Top'),
+                          ('categorymembers', u'Category:Top')])
+
+    def testSupercats(self):
+        sub = pywikibot.Category(self.site, u'Category:Sub')
+        self.assertEqual([cat.title() for cat in self.db.getSupercats(sub)],
+                         [u'Category:Top'])
+        self.assertEqual([cat.title() for cat in self.db.getSupercats(sub)],
+                         [u'Category:Top'])
+        self.assertEqual(self.site.requests,
+                         [('recentchanges', None),
+                          ('pagecategories', u'Category:Sub')])
+
+    def testRefresh(self):
+        top = pywikibot.Category(self.site, u'Category:Top')
+        sub = pywikibot.Category(self.site, u'Category:Sub')
+        # loading the first data records the latest change, so that the
+        # first refresh catches up from there
+        self.assertEqual(len(self.db.getArticles(top)), 1)
+        self.assertEqual(self.site.requests[0], ('recentchanges', None))
+        self.assertEqual(self.db._getmeta('rcstamp'),
+                         u'2011-01-01T00:00:00Z')
+        self.assertEqual(len(self.db.getSupercats(sub)), 1)
+        self.assertEqual(len(self.db.getArticles(sub)), 1)
+
+        # Sub leaves Top, and a new page is added to Sub
+        self.site.pages[u'Category:Sub'] = (14, [])
+        self.site.pages[u'New'] = (0, [u'Category:Sub'])
+        self.site.pages[u'Unrelated'] = (0, [u'Category:Unknown'])
+        self.site.changes += [
+            {'title': u'Category:Sub', 'timestamp': u'2011-01-02T00:00:00Z'},
+            {'title': u'New', 'timestamp': u'2011-01-03T00:00:00Z'},
+            {'title': u'Unrelated', 'timestamp': u'2011-01-04T00:00:00Z'}]
+        del self.site.requests[:]
+        self.db.refresh()
+        self.assertEqual(self.site.requests[0],
+                         ('recentchanges', u'2011-01-01T00:00:00Z'))
+        self.assertEqual(self.site.requests[1],
+                         ('categories', [u'Category:Sub', u'New', u'Other',
+                                         u'Unrelated']))
+        self.assertEqual(self.db.getSupercats(sub), [])
+        self.assertEqual([cat.title() for cat in self.db.getSubcats(top)],
+                         [])
+        self.assertEqual([page.title() for page in self.db.getArticles(sub)],
+                         [u'Article', u'New'])
+        # pages outside of the stored graph are not added
+        self.assertEqual(self.db._row(u'Unrelated'), None)
+        self.assertEqual(self.db._getmeta('rcstamp'),
+                         u'2011-01-04T00:00:00Z')
+        # everything else was updated without loading it again
+        self.assertEqual(len(self.site.requests), 2)
+
+    def testRefreshEmpty(self):
+        """Test that refreshing an empty database records the latest change"""
+        self.db.refresh()
+        self.assertEqual(self.site.requests, [('recentchanges', None)])
+        self.assertEqual(self.db._getmeta('rcstamp'),
+                         u'2011-01-01T00:00:00Z')
+        top = pywikibot.Category(self.site, u'Category:Top')
+        self.db.getArticles(top)
+        self.assertEqual(self.site.requests[1:],
+                         [('categorymembers', u'Category:Top')])
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
@@ -0,0 +1,67 @@
+# -*- coding: utf-8  -*-
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import unittest
+import pywikibot
+from pywikibot import textlib
+from scripts import cosmetic_changes
+
+mysite = pywikibot.Site('en', 'wikipedia')
+
+PAGE = u"""'''Foo''' is a <b>bar</b> of 5ccm and 20 ºC.<br>
+==Header==\r
+==Next header==\r
+*item  with   spaces
+*#nested<br/>
+[http://example.org/a.pdf|label] <!-- <b>kept</b>  -->
+{| class="prettytable"
+|}
+"""
+
+
+class SequentialToolkit(cosmetic_changes.CosmeticChangesToolkit):
+    """The toolkit as it worked before ReplacementSet, with one
+    replaceExcept() call per replacement"""
+
+    def replaceSet(self, text, name, replacements, exceptions,
+                   caseInsensitive=False):
+        if callable(replacements):
+            replacements = replacements()
+        for old, new in replacements:
+            text = textlib.replaceExcept(text, old, new, exceptions,
+                                         caseInsensitive, site=self.site)
+        return text
+
+
+class TestCosmeticChanges(unittest.TestCase):
+
+    def testSameOutput(self):
+        """Test that the passes give the same result as replaceExcept()"""
+        new = cosmetic_changes.CosmeticChangesToolkit(mysite, namespace=0)
+        old = SequentialToolkit(mysite, namespace=0)
+        result = new.change(PAGE)
+        self.assertNotEqual(result, PAGE)
+        self.assertEqual(result, old.change(PAGE))
+
+    def testReplaceSet(self):
+        """Test replaceSet() with lookbehind and word boundary rules"""
+        rules = [(u'(?<!b)a', u'b'), (ur'\bb', u'c')]
+        text = u'aa aba <!-- aa --> ab a'
+        new = cosmetic_changes.CosmeticChangesToolkit(mysite, namespace=0)
+        old = SequentialToolkit(mysite, namespace=0)
+        self.assertEqual(new.replaceSet(text, 'test-rewritten', rules,
+                                        ['comment']),
+                         old.replaceSet(text, 'test-rewritten', rules,
+                                        ['comment']))
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
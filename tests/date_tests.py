@@ -0,0 +1,48 @@
+# -*- coding: utf-8  -*-
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import unittest
+from pywikibot import date
+
+
+class TestGetAutoFormat(unittest.TestCase):
+
+    def testFormats(self):
+        self.assertEqual(date.getAutoFormat('en', u'1990s'),
+                         ('DecadeAD', 1990))
+        self.assertEqual(date.getAutoFormat('en', u'December'),
+                         ('MonthName', 12))
+        self.assertEqual(date.getAutoFormat('af', u'5de eeu'),
+                         ('CenturyAD', 5))
+        self.assertEqual(date.getAutoFormat('de', u'März 2005'),
+                         ('Year_March', 2005))
+
+    def testFirstLetterCase(self):
+        self.assertEqual(date.getAutoFormat('de', u'märz 2005'),
+                         ('Year_March', 2005))
+        self.assertEqual(date.getAutoFormat('de', u'märz 2005',
+                                            ignoreFirstLetterCase=False),
+                         (None, None))
+
+    def testNoMatch(self):
+        self.assertEqual(date.getAutoFormat('en', u'Zebra'), (None, None))
+        self.assertEqual(date.getAutoFormat('en', u''), (None, None))
+
+
+class TestFormats(unittest.TestCase):
+
+    def testConsistency(self):
+        """Test that the first value of every format converts both ways"""
+        date.test(quick=True)
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
@@ -85,6 +85,16 @@ class TestTWTranslate(unittest.TestCase):
         self.assertRaises(i18n.TranslationError, i18n.twtranslate, 'en', 'test-no-english')
 
 
+class TestMessageCatalogue(unittest.TestCase):
+    def testLookup(self):
+        catalogue = i18n.catalogue('test')
+        self.assert_(i18n.catalogue('test') is catalogue)
+        self.assertEqual(catalogue.translate('fy', 'test-semi-localized'),
+                         u'test-semi-localized NL')
+        self.assert_(catalogue.has_key('nl', 'test-semi-localized'))
+        self.assertFalse(catalogue.has_key('fy', 'test-semi-localized'))
+
+
 if __name__ == '__main__':
     try:
         unittest.main()
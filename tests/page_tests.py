@@ -106,6 +106,21 @@ class TestLinkObject(unittest.TestCase):
         self.assertNotEqual(l1, other)
         self.assertNotEqual(hash(l1), hash(other))
 
+    def testCache(self):
+        """Test that repeated links are parsed once and share their title"""
+        l1 = pywikibot.page.Link(u"Help_talk:Some  page#Top", self.enwiki)
+        l2 = pywikibot.page.Link(u"help talk:Some_page#Top", self.enwiki)
+        self.assertEqual((l1.namespace, l1.title, l1.section),
+                         (13, u"Some page", u"Top"))
+        self.assertEqual((l2.namespace, l2.title, l2.section),
+                         (13, u"Some page", u"Top"))
+        self.assertTrue(l1.title is l2.title)
+        # the default namespace is part of the cache key
+        l3 = pywikibot.page.Link(u"Some page", self.enwiki, 10)
+        l4 = pywikibot.page.Link(u"Some page", self.enwiki)
+        self.assertEqual((l3.namespace, l4.namespace), (10, 0))
+        self.assertTrue(l3.title is l1.title)
+
 class TestPageObject(unittest.TestCase):
     def testGeneral(self):
         self.assertEqual(str(mainpage), "[[%s:%s]]"
@@ -0,0 +1,224 @@
+# -*- coding: utf-8  -*-
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import unittest
+import pywikibot
+from pywikibot.data import api
+from pywikibot.site import APISite
+from scripts import redirect
+
+mysite = pywikibot.Site('en', 'wikipedia')
+
+
+class StubResolver(redirect.RedirectResolver):
+    """RedirectResolver that answers from a dict of redirects instead of
+    the API; like the API, it follows only one redirect per title"""
+
+    redirects = {u'A': u'B', u'B': u'C', u'C': u'D',
+                 u'Loop1': u'Loop2', u'Loop2': u'Loop1',
+                 u'Self': u'Self', u'Broken': u'Nowhere'}
+    existing = set([u'D', u'Plain'])
+
+    def __init__(self, *args, **kwargs):
+        super(StubResolver, self).__init__(*args, **kwargs)
+        self.requests = []
+
+    def _request(self, titles):
+        self.requests.append(list(titles))
+        query = {'redirects': [], 'pages': {}}
+        for n, title in enumerate(titles):
+            if title in self.redirects:
+                query['redirects'].append({'from': title,
+                                           'to': self.redirects[title]})
+                title = self.redirects[title]
+            page = {'title': title}
+            if title in self.redirects:
+                page['redirect'] = ''
+            elif title not in self.existing:
+                page['missing'] = ''
+            query['pages'][str(-n)] = page
+        self._update(titles, {'query': query})
+
+
+class TestRedirectResolver(unittest.TestCase):
+
+    def setUp(self):
+        # small batches, and no userinfo request
+        self.titles_limit = redirect.api.titles_limit
+        redirect.api.titles_limit = lambda site: 2
+
+    def tearDown(self):
+        redirect.api.titles_limit = self.titles_limit
+
+    def testChain(self):
+        """Test that chains are followed with one request per step"""
+        resolver = StubResolver(mysite)
+        self.assertEqual(list(resolver.resolve([u'A', u'Plain', u'Broken'])),
+                         [(u'A', 3, u'D'), (u'Plain', 0, u'Plain'),
+                          (u'Broken', 1, u'Nowhere')])
+        # A needs one request for each step of the chain, Broken another
+        self.assertEqual(len(resolver.requests), 4)
+        self.assertTrue(resolver.exists(u'D'))
+        self.assertFalse(resolver.exists(u'Nowhere'))
+        self.assertEqual(resolver.target(u'B'), u'C')
+        # known titles are not requested again
+        self.assertEqual(list(resolver.resolve([u'B'])), [(u'B', 2, u'D')])
+        self.assertEqual(len(resolver.requests), 4)
+        self.assertEqual(resolver.chain(u'A'), [u'A', u'B', u'C', u'D'])
+        self.assertEqual(resolver.chain(u'Plain'), [u'Plain'])
+
+    def testLoop(self):
+        resolver = StubResolver(mysite)
+        result = list(resolver.resolve([u'Loop1', u'Self']))
+        self.assertEqual([(title, length) for title, length, final in result],
+                         [(u'Loop1', None), (u'Self', None)])
+        self.assertEqual(resolver.chain(u'Loop1'),
+                         [u'Loop1', u'Loop2', u'Loop1'])
+
+    def testMaxlen(self):
+        resolver = StubResolver(mysite, maxlen=2)
+        self.assertEqual(list(resolver.resolve([u'A'])),
+                         [(u'A', None, u'D')])
+        resolver = StubResolver(mysite, maxlen=3)
+        self.assertEqual(list(resolver.resolve([u'A'])), [(u'A', 3, u'D')])
+
+
+class StubSite(APISite):
+    """Site that knows its magic words without asking the API"""
+
+    def logged_in(self, sysop=False):
+        return False
+
+    def getmagicwords(self, word):
+        return {'redirect': [u'#REDIRECT'],
+                'staticredirect': [u'__STATICREDIRECT__']}[word]
+
+
+class TestDoubleRedirects(unittest.TestCase):
+    """Test fixing double redirects with the chains of the resolver"""
+
+    texts = {u'A': u'#REDIRECT [[B]]', u'B': u'#REDIRECT [[C]]',
+             u'C': u'#REDIRECT [[D]]', u'D': u'Text',
+             u'Static': u'#REDIRECT [[D]] __STATICREDIRECT__',
+             u'ToStatic': u'#REDIRECT [[Static]]'}
+
+    def setUp(self):
+        self.titles_limit = redirect.api.titles_limit
+        redirect.api.titles_limit = lambda site: 2
+        self.site = StubSite('de', 'wikipedia')
+        self.robot = redirect.RedirectRobot('double', None, always=True)
+        self.robot.site = self.site
+        self.retargeted = []
+        self.followed = []
+        self.robot._retarget = lambda redir, target: \
+            self.retargeted.append((redir.title(), target.title()))
+        self.robot._follow_chain = lambda redir: \
+            self.followed.append(redir.title())
+        self.loaded = []
+
+    def tearDown(self):
+        redirect.api.titles_limit = self.titles_limit
+
+    def load(self, page):
+        """Store the text of page, like preloading does"""
+        self.loaded.append(page.title())
+        text = self.texts[page.title()]
+        api.update_page(page, {'title': page.title(), 'ns': 0,
+                               'pageid': len(self.loaded),
+                               'lastrevid': len(self.loaded),
+                               'revisions': [{'revid': len(self.loaded),
+                                              'timestamp':
+                                                  u'2011-01-01T00:00:00Z',
+                                              '*': text}]})
+        if text.startswith(u'#REDIRECT'):
+            page._isredir = True
+        return page
+
+    def chain(self, *titles):
+        return [self.load(pywikibot.Page(self.site, title))
+                for title in titles]
+
+    def testChain(self):
+        """Test that a chain which agrees with the text is not followed"""
+        chain = self.chain(u'A', u'B', u'C', u'D')
+        self.robot.fix_1_double_redirect(chain[0], chain)
+        self.assertEqual(self.retargeted, [(u'A', u'D')])
+        self.assertEqual(self.followed, [])
+
+    def testChanged(self):
+        """Test that the chain is followed again if the text disagrees"""
+        chain = self.chain(u'A', u'B', u'C', u'D')
+        self.texts = dict(self.texts)
+        self.texts[u'A'] = u'#REDIRECT [[C]]'
+        self.load(chain[0])
+        self.robot.fix_1_double_redirect(chain[0], chain)
+        self.assertEqual(self.retargeted, [])
+        self.assertEqual(self.followed, [u'A'])
+
+    def testStatic(self):
+        chain = self.chain(u'ToStatic', u'Static', u'D')
+        self.robot.fix_1_double_redirect(chain[0], chain)
+        self.assertEqual(self.retargeted, [(u'ToStatic', u'Static')])
+
+    def testPreload(self):
+        """Test that the redirects and their chains are preloaded"""
+        test = self
+
+        class Generator(object):
+            def retrieve_double_redirects(self):
+                yield u'A', [u'A', u'B', u'C', u'D'], u'D'
+                yield u'B', [u'B', u'C', u'D'], u'D'
+                yield u'Loop', None, u'Loop'
+
+        def preload(pages):
+            for page in pages:
+                if page.title() in test.texts:
+                    test.load(page)
+                yield page
+
+        fixed = []
+        self.robot.generator = Generator()
+        self.robot.fix_1_double_redirect = lambda redir, chain: \
+            fixed.append((redir.title(),
+                          chain and [page.title() for page in chain],
+                          hasattr(redir, '_revid')))
+        PreloadingGenerator = redirect.pagegenerators.PreloadingGenerator
+        redirect.pagegenerators.PreloadingGenerator = preload
+        try:
+            self.robot.fix_double_redirects()
+        finally:
+            redirect.pagegenerators.PreloadingGenerator = PreloadingGenerator
+        self.assertEqual(fixed, [(u'A', [u'A', u'B', u'C', u'D'], True),
+                                 (u'B', [u'B', u'C', u'D'], True),
+                                 (u'Loop', None, False)])
+        # the intermediate redirects come before the redirect page
+        self.assertEqual(self.loaded, [u'B', u'C', u'A', u'C', u'B'])
+
+    def testRetrieve(self):
+        """Test that the generator yields the chains of double redirects"""
+        generator = redirect.RedirectGenerator(use_api=True)
+        generator.site = mysite
+        generator.get_redirect_pages_via_api = lambda: (
+            pywikibot.Page(mysite, title)
+            for title in (u'A', u'B', u'Broken', u'Loop1', u'Plain'))
+        RedirectResolver = redirect.RedirectResolver
+        redirect.RedirectResolver = StubResolver
+        try:
+            result = list(generator.retrieve_double_redirects())
+        finally:
+            redirect.RedirectResolver = RedirectResolver
+        self.assertEqual(result, [(u'A', [u'A', u'B', u'C', u'D'], u'D'),
+                                  (u'B', [u'B', u'C', u'D'], u'D'),
+                                  (u'Loop1', None, u'Loop1')])
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
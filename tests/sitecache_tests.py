@@ -0,0 +1,179 @@
+# -*- coding: utf-8  -*-
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import pywikibot
+from pywikibot import config
+from pywikibot.comms import fakeapi, http
+from pywikibot.data import api, sitecache
+
+mysite = pywikibot.Site('en', 'wikipedia')
+
+SITEINFO = {"general": {"generator": "MediaWiki 1.17"},
+            "namespaces": {"0": {"id": 0, "*": ""}}}
+PARAMINFO = [{"name": "allpages", "prefix": "ap", "parameters": []}]
+
+
+class TestSiteCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.expiry = config.metadata_cache_expiry
+        config.metadata_cache_expiry = 24
+
+    def tearDown(self):
+        config.metadata_cache_expiry = self.expiry
+        shutil.rmtree(self.dir)
+
+    def cache(self):
+        """Return a new SiteCache object for the test file"""
+        cache = sitecache.SiteCache("test")
+        cache.filename = os.path.join(self.dir, "test.json")
+        return cache
+
+    def testStore(self):
+        cache = self.cache()
+        self.assertEqual(cache.get_siteinfo(), None)
+        cache.set_siteinfo(SITEINFO)
+        cache.set_paraminfo(PARAMINFO)
+        cache = self.cache()
+        self.assertEqual(cache.get_siteinfo(), SITEINFO)
+        self.assertEqual(cache.get_paraminfo("allpages"), PARAMINFO[0])
+        self.assertEqual(cache.get_paraminfo("revisions"), None)
+        cache.clear()
+        self.assertFalse(os.path.exists(cache.filename))
+        self.assertEqual(cache.get_siteinfo(), None)
+
+    def testExpiry(self):
+        cache = self.cache()
+        cache.set_siteinfo(SITEINFO)
+        cache.set_paraminfo(PARAMINFO)
+        self.assertFalse(cache.expired())
+        cache._load()["time"] = time.time() - 25 * 3600
+        self.assertTrue(cache.expired())
+        self.assertEqual(cache.get_siteinfo(), None)
+        self.assertEqual(cache.get_paraminfo("allpages"), None)
+        # timestamps in the future are not trusted either
+        cache._load()["time"] = time.time() + 3600
+        self.assertTrue(cache.expired())
+
+    def testDisabled(self):
+        config.metadata_cache_expiry = 0
+        cache = self.cache()
+        cache.set_siteinfo(SITEINFO)
+        self.assertEqual(cache.get_siteinfo(), None)
+        self.assertFalse(os.path.exists(cache.filename))
+
+    def testVersion(self):
+        """Test that paraminfo is dropped when the version changes"""
+        cache = self.cache()
+        cache.set_siteinfo(SITEINFO)
+        cache.set_paraminfo(PARAMINFO)
+        cache.set_siteinfo(SITEINFO)
+        self.assertEqual(cache.get_paraminfo("allpages"), PARAMINFO[0])
+        upgraded = {"general": {"generator": "MediaWiki 1.18"},
+                    "namespaces": SITEINFO["namespaces"]}
+        cache.set_siteinfo(upgraded)
+        self.assertEqual(cache.get_paraminfo("allpages"), None)
+        self.assertEqual(self.cache().get_siteinfo(), upgraded)
+
+    def testCorrupt(self):
+        """Test that unreadable or outdated files are ignored"""
+        for content in ('{"format": 1, "siteinfo"', '[1, 2]',
+                        '{"format": 0, "time": %d, "siteinfo": {}}'
+                        % time.time()):
+            f = open(os.path.join(self.dir, "test.json"), "wb")
+            f.write(content)
+            f.close()
+            cache = self.cache()
+            self.assertEqual(cache.get_siteinfo(), None)
+            cache.set_siteinfo(SITEINFO)
+            self.assertEqual(self.cache().get_siteinfo(), SITEINFO)
+
+
+class CountingAPI(fakeapi.FakeAPI):
+    """FakeAPI that counts the siteinfo and paraminfo requests"""
+
+    def __init__(self):
+        fakeapi.FakeAPI.__init__(self)
+        self.siteinfo = self.paraminfo = 0
+
+    def _siteinfo(self, params):
+        self.siteinfo += 1
+        return fakeapi.FakeAPI._siteinfo(self, params)
+
+    def _action_paraminfo(self, params):
+        self.paraminfo += 1
+        return fakeapi.FakeAPI._action_paraminfo(self, params)
+
+
+class TestSiteCacheUse(unittest.TestCase):
+    """Test the use of the cache by the site and the query generators"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.expiry = config.metadata_cache_expiry
+        config.metadata_cache_expiry = 24
+        self.api = CountingAPI()
+        self.transports = [thread.http for thread in http.threads]
+        for thread in http.threads:
+            thread.http = self.api
+        self.loginstatus = mysite._loginstatus
+        mysite._loginstatus = -1
+        self.key = "%s-%s" % (mysite.family.name, mysite.code)
+        self.oldcache = sitecache._caches.get(self.key)
+        self.cache = sitecache.SiteCache(self.key)
+        self.cache.filename = os.path.join(self.dir, "test.json")
+        sitecache._caches[self.key] = self.cache
+        self.modules = api._modules.copy()
+
+    def tearDown(self):
+        api._modules.clear()
+        api._modules.update(self.modules)
+        if self.oldcache is None:
+            del sitecache._caches[self.key]
+        else:
+            sitecache._caches[self.key] = self.oldcache
+        mysite._loginstatus = self.loginstatus
+        for thread, old in zip(http.threads, self.transports):
+            thread.http = old
+        config.metadata_cache_expiry = self.expiry
+        shutil.rmtree(self.dir)
+
+    def testSiteinfo(self):
+        mysite._getsiteinfo()
+        self.assertEqual(self.api.siteinfo, 1)
+        self.assertEqual(self.cache.get_siteinfo()["general"]["sitename"],
+                         mysite.siteinfo["sitename"])
+        mysite._getsiteinfo()
+        self.assertEqual(self.api.siteinfo, 1)
+        mysite._getsiteinfo(force=True)
+        self.assertEqual(self.api.siteinfo, 2)
+
+    def testParaminfo(self):
+        # paraminfo expires together with the siteinfo
+        mysite._getsiteinfo(force=True)
+        api._modules.pop("allpages", None)
+        api.ListGenerator("allpages", site=mysite)
+        self.assertEqual(self.api.paraminfo, 1)
+        self.assertEqual(self.cache.get_paraminfo("allpages")["prefix"], "ap")
+        api._modules.pop("allpages")
+        api.ListGenerator("allpages", site=mysite)
+        self.assertEqual(self.api.paraminfo, 1)
+        self.assertEqual(api._modules["allpages"]["prefix"], "ap")
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
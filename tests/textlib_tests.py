@@ -0,0 +1,123 @@
+# -*- coding: utf-8  -*-
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import re
+import unittest
+import pywikibot
+from pywikibot import textlib
+
+mysite = pywikibot.Site('en', 'wikipedia')
+
+
+class StubFamily(object):
+    obsolete = {'old': None}
+
+
+class StubSite(object):
+    """Site whose language links may only be used if allowed"""
+
+    family = StubFamily()
+
+    def __init__(self, allowed):
+        self.allowed = allowed
+
+    def validLanguageLinks(self):
+        if not self.allowed:
+            raise AssertionError("language links requested")
+        return ['de', 'fr']
+
+
+class TestReplaceExcept(unittest.TestCase):
+
+    def testSimple(self):
+        self.assertEqual(textlib.replaceExcept(u'colour', u'colou?r', u'color',
+                                               [], site=mysite),
+                         u'color')
+
+    def testExceptions(self):
+        text = u'foo <!-- foo --> <nowiki>foo</nowiki> {{foo}} foo'
+        self.assertEqual(textlib.replaceExcept(text, u'foo', u'bar',
+                                               ['comment', 'nowiki',
+                                                'template'],
+                                               site=mysite),
+                         u'bar <!-- foo --> <nowiki>foo</nowiki> {{foo}} bar')
+
+    def testGroupReferences(self):
+        self.assertEqual(textlib.replaceExcept(u'ab ab', u'(a)(?P<x>b)',
+                                               ur'\g<x>\1\n', [],
+                                               site=mysite),
+                         u'ba\n ba\n')
+
+    def testFunction(self):
+        self.assertEqual(textlib.replaceExcept(u'a1 b2', re.compile(r'\d'),
+                                               lambda m: str(int(m.group()) + 1),
+                                               [], site=mysite),
+                         u'a2 b3')
+
+    def testMarker(self):
+        self.assertEqual(textlib.replaceExcept(u'a b', u'a', u'c', [],
+                                               marker=u'@', site=mysite),
+                         u'c@ b')
+        self.assertEqual(textlib.replaceExcept(u'a b', u'x', u'c', [],
+                                               marker=u'@', site=mysite),
+                         u'a b@')
+
+    def testPlan(self):
+        plan = textlib.ReplacementPlan(u'x', u'y', ['comment'], site=mysite)
+        self.assertEqual(plan.apply(u'x<!--x-->x'), u'y<!--x-->y')
+        self.assertEqual(plan.apply(u'<!--x-->'), u'<!--x-->')
+
+    def testReplacementSet(self):
+        rs = textlib.ReplacementSet([(u'a', u'b'), (u'b', u'c')],
+                                    ['comment'], site=mysite)
+        self.assertEqual(rs.apply(u'ab<!--a-->'), (u'cc<!--a-->', [1, 2]))
+        self.assertEqual(rs.apply(u'<!--ab-->'), (u'<!--ab-->', [0, 0]))
+
+    def testReplacementSetRewrittenText(self):
+        """Test that ReplacementSet searches the text as rewritten so far"""
+        rs = textlib.ReplacementSet([(u'(?<!b)a', u'b')], [], site=mysite)
+        self.assertEqual(rs.apply(u'aa'), (u'ba', [1]))
+        rules = [(u'(?<!b)a', u'b'), (ur'\ba', u'c '), (ur'b\b', u'a'),
+                 (u'(?<=a)c', u'<!--'), (u'c', u'ab')]
+        texts = [u'aa aba a', u'aaa <!-- aa --> ba ab', u'cac a-b c',
+                 u'a<!--a-->a ac bb']
+        for n in range(1, len(rules) + 1):
+            rs = textlib.ReplacementSet(rules[:n], ['comment'], site=mysite)
+            for text in texts:
+                expected = text
+                for old, new in rules[:n]:
+                    expected = textlib.replaceExcept(expected, old, new,
+                                                     ['comment'], site=mysite)
+                self.assertEqual(rs.apply(text)[0], expected)
+
+    def testLazyExceptions(self):
+        """Test that the language links are only loaded for 'interwiki'"""
+        text = u'a http://a.org/a [[de:a]] [[old:a]] [[es:a]]'
+        site = StubSite(False)
+        self.assertEqual(textlib.replaceExcept(text, u'a', u'b',
+                                               ['hyperlink', 'comment'],
+                                               site=site),
+                         u'b http://a.org/a [[de:b]] [[old:b]] [[es:b]]')
+        site = StubSite(True)
+        self.assertEqual(textlib.replaceExcept(text, u'a', u'b',
+                                               ['hyperlink', 'interwiki'],
+                                               site=site),
+                         u'b http://a.org/a [[de:a]] [[old:a]] [[es:b]]')
+        site.allowed = False
+        # the regex is kept until the cache is cleared
+        textlib.ReplacementPlan(u'a', u'b', ['interwiki'], site=site)
+        textlib.clear_exception_cache(site)
+        self.assertRaises(AssertionError, textlib.ReplacementPlan,
+                          u'a', u'b', ['interwiki'], site=site)
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
@@ -0,0 +1,86 @@
+# -*- coding: utf-8  -*-
+#
+# (C) Pywikipedia bot team, 2007
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import unittest
+from StringIO import StringIO
+from pywikibot.comms import threadedhttp
+
+
+class TestRequestQueue(unittest.TestCase):
+
+    def request(self, uri, priority=threadedhttp.NORMAL_PRIORITY):
+        return threadedhttp.HttpRequest(uri, priority=priority)
+
+    def testPriority(self):
+        """Test that high priority requests are served first"""
+        queue = threadedhttp.RequestQueue()
+        read = self.request('http://en.wikipedia.org/w/api.php')
+        write = self.request('http://de.wikipedia.org/w/api.php',
+                             threadedhttp.HIGH_PRIORITY)
+        queue.put(read)
+        queue.put(write)
+        self.assertEqual(queue.get(), write)
+        self.assertEqual(queue.get(), read)
+
+    def testHostLimit(self):
+        """Test that a busy host does not block requests to other hosts"""
+        queue = threadedhttp.RequestQueue(host_limit=1)
+        first = self.request('http://en.wikipedia.org/w/api.php')
+        second = self.request('http://en.wikipedia.org/w/index.php')
+        other = self.request('http://fr.wikipedia.org/w/api.php')
+        for item in (first, second, other):
+            queue.put(item)
+        self.assertEqual(queue.get(), first)
+        self.assertEqual(queue.get(), other)
+        self.assertEqual(queue.qsize(), 1)
+        queue.release(first)
+        self.assertEqual(queue.get(), second)
+
+    def testShutdown(self):
+        """Test that None is only returned when no requests are pending"""
+        queue = threadedhttp.RequestQueue()
+        item = self.request('http://en.wikipedia.org/w/api.php')
+        queue.put(None)
+        queue.put(item)
+        self.assertEqual(queue.get(), item)
+        self.assertEqual(queue.get(), None)
+
+
+class FakeSocket(object):
+    """Socket that collects the data sent through it"""
+
+    def __init__(self):
+        self.data = []
+
+    def sendall(self, data):
+        self.data.append(data)
+
+    def close(self):
+        pass
+
+
+class TestConnection(unittest.TestCase):
+
+    def testRewind(self):
+        """Test that a file-like body is sent in full every time"""
+        body = StringIO("x=1&y=2")
+        for i in range(2):
+            # httplib2 sends the request again on a new connection
+            conn = threadedhttp.HTTPConnection("en.wikipedia.org")
+            conn.sock = FakeSocket()
+            conn.request("POST", "/w/api.php", body,
+                         {"Content-Length": "7"})
+            self.assertEqual("".join(conn.sock.data).split("\r\n\r\n")[1],
+                             "x=1&y=2")
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
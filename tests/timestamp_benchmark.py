@@ -0,0 +1,73 @@
+# -*- coding: utf-8  -*-
+"""
+Compare the speed of Timestamp parsing and arithmetic with the previous
+strptime based implementation.
+
+Run this script directly; it prints the time taken by each variant.
+"""
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import datetime
+import timeit
+from pywikibot import Timestamp
+
+REPEAT = 3
+NUMBER = 20000
+
+
+class OldTimestamp(datetime.datetime):
+    """The strptime based implementation, for reference"""
+
+    @classmethod
+    def fromISOformat(cls, ts):
+        return cls.strptime(ts, Timestamp.ISO8601Format)
+
+    @classmethod
+    def fromtimestampformat(cls, ts):
+        return cls.strptime(ts, Timestamp.mediawikiTSFormat)
+
+    def __add__(self, other):
+        newdt = datetime.datetime.__add__(self, other)
+        return OldTimestamp(newdt.year, newdt.month, newdt.day, newdt.hour,
+                            newdt.minute, newdt.second, newdt.microsecond,
+                            newdt.tzinfo)
+
+
+def timestamps(count):
+    """Return count distinct ISO 8601 timestamps"""
+    start = datetime.datetime(2011, 1, 1)
+    return [(start + datetime.timedelta(seconds=17 * i))
+            .strftime(Timestamp.ISO8601Format) for i in xrange(count)]
+
+
+def measure(func):
+    return min(timeit.repeat(func, repeat=REPEAT, number=1))
+
+
+def main():
+    # distinct values defeat the cache; repeated ones show its benefit
+    distinct = timestamps(NUMBER)
+    repeated = timestamps(50) * (NUMBER // 50)
+    compact = [ts.replace("-", "").replace(":", "").replace("T", "")[:14]
+               for ts in distinct]
+    delta = datetime.timedelta(minutes=5)
+    for name, cls in (("strptime", OldTimestamp), ("Timestamp", Timestamp)):
+        Timestamp._cache.clear()
+        print "%-10s ISO, distinct:   %.3fs" % (name, measure(
+            lambda: [cls.fromISOformat(ts) for ts in distinct]))
+        print "%-10s ISO, repeated:   %.3fs" % (name, measure(
+            lambda: [cls.fromISOformat(ts) for ts in repeated]))
+        print "%-10s MediaWiki:       %.3fs" % (name, measure(
+            lambda: [cls.fromtimestampformat(ts) for ts in compact]))
+        ts = cls.fromISOformat(distinct[0])
+        print "%-10s addition:        %.3fs" % (name, measure(
+            lambda: [ts + delta for i in xrange(10 * NUMBER)]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8  -*-
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import datetime
+import unittest
+from pywikibot import Timestamp
+
+
+class TestTimestamp(unittest.TestCase):
+
+    def testParse(self):
+        """Test that timestamps are parsed like strptime does"""
+        for ts in ("2011-02-28T23:59:07Z", u"1999-12-31T00:00:00Z"):
+            self.assertEqual(Timestamp.fromISOformat(ts),
+                             datetime.datetime.strptime(
+                                 ts, Timestamp.ISO8601Format))
+        self.assertEqual(Timestamp.fromtimestampformat("20110228235907"),
+                         datetime.datetime(2011, 2, 28, 23, 59, 7))
+        self.assertEqual(type(Timestamp.fromISOformat("2011-02-28T23:59:07Z")),
+                         Timestamp)
+        self.assertRaises(ValueError, Timestamp.fromISOformat,
+                          "2011-02-30T23:59:07Z")
+        self.assertRaises(ValueError, Timestamp.fromISOformat,
+                          "2011-02-28 23:59:07")
+        self.assertRaises(ValueError, Timestamp.fromtimestampformat,
+                          "2011-02-28")
+
+    def testString(self):
+        ts = "2011-02-28T23:59:07Z"
+        self.assertEqual(str(Timestamp.fromISOformat(ts)), ts)
+
+    def testArithmetic(self):
+        ts = Timestamp.fromISOformat("2011-02-28T23:59:07Z")
+        later = ts + datetime.timedelta(seconds=60)
+        self.assertEqual(type(later), Timestamp)
+        self.assertEqual(str(later), "2011-03-01T00:00:07Z")
+        self.assertEqual(type(later - datetime.timedelta(days=1)), Timestamp)
+        self.assertEqual(later - ts, datetime.timedelta(seconds=60))
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
@@ -0,0 +1,188 @@
+# -*- coding: utf-8  -*-
+"""
+Offline tests for the token cache of APISite, using the fake API.
+"""
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import unittest
+import pywikibot
+from pywikibot.comms import fakeapi, http
+from pywikibot.data import api
+
+mysite = pywikibot.Site('en', 'wikipedia')
+
+
+class TokenAPI(fakeapi.FakeAPI):
+    """FakeAPI that logs the token queries and edits it receives"""
+
+    def __init__(self, *args, **kwargs):
+        fakeapi.FakeAPI.__init__(self, *args, **kwargs)
+        self.log = []
+
+    def handle(self, params):
+        if "intoken" in params:
+            self.log.append("token")
+        elif params.get("prop") == "info":
+            self.log.append("info")
+        elif params.get("action") in ("edit", "login"):
+            self.log.append(params["action"])
+        return fakeapi.FakeAPI.handle(self, params)
+
+
+class TestTokens(unittest.TestCase):
+
+    def setUp(self):
+        self.api = TokenAPI()
+        self.api.edittoken = u"first+\\"
+        for i in range(3):
+            self.api.add_page(u"Page %i" % i, u"text %i" % i)
+        self.transports = [thread.http for thread in http.threads]
+        for thread in http.threads:
+            thread.http = self.api
+        self.loginstatus = mysite._loginstatus
+        mysite._loginstatus = -1
+        mysite.invalidate_tokens()
+        self.writedelay = mysite.throttle.writedelay
+        mysite.throttle.writedelay = 0
+
+    def tearDown(self):
+        for thread, old in zip(http.threads, self.transports):
+            thread.http = old
+        mysite._loginstatus = self.loginstatus
+        mysite.invalidate_tokens()
+        mysite.throttle.writedelay = self.writedelay
+
+    def edit(self, title, text):
+        page = pywikibot.Page(mysite, title)
+        page.text = text
+        return mysite.editpage(page, u"test")
+
+    def testCache(self):
+        """Test that the edit token is retrieved only once"""
+        self.assertTrue(self.edit(u"Page 0", u"new 0"))
+        self.assertTrue(self.edit(u"Page 1", u"new 1"))
+        self.assertEqual(self.api.log, ["token", "edit", "edit"])
+        self.assertEqual(self.api.pages[u"Page 1"]["revisions"][-1]["*"],
+                         u"new 1")
+
+    def testBadToken(self):
+        """Test that a rejected token is retrieved again, once"""
+        self.assertTrue(self.edit(u"Page 0", u"new 0"))
+        self.api.edittoken = u"second+\\"
+        self.assertTrue(self.edit(u"Page 1", u"new 1"))
+        self.assertEqual(self.api.log,
+                         ["token", "edit", "edit", "token", "edit"])
+        self.assertEqual(mysite.token(None, "edit"), u"second+\\")
+
+        # a token that is rejected again is not retried a second time
+        self.api.edittoken = None
+        del self.api.log[:]
+        try:
+            self.edit(u"Page 2", u"new 2")
+        except api.APIError, err:
+            self.assertEqual(err.code, "badtoken")
+        else:
+            self.fail("APIError not raised")
+        self.assertEqual(self.api.log, ["edit", "token", "edit"])
+        # the rejected token is not kept either
+        self.assertFalse(mysite._tokens)
+
+    def testLogin(self):
+        """Test that logging in discards the tokens of the old session"""
+        self.assertTrue(self.edit(u"Page 0", u"new 0"))
+        self.assertTrue(mysite._tokens)
+        password = pywikibot.input
+        storecookiedata = api.LoginManager.storecookiedata
+        pywikibot.input = lambda *args, **kwargs: u"secret"
+        api.LoginManager.storecookiedata = lambda self, data: None
+        try:
+            mysite.login(False)
+        finally:
+            pywikibot.input = password
+            api.LoginManager.storecookiedata = storecookiedata
+        self.assertTrue(mysite.logged_in())
+        self.assertFalse(mysite._tokens)
+        self.assertTrue(self.edit(u"Page 1", u"new 1"))
+        self.assertEqual(self.api.log,
+                         ["token", "edit", "login", "token", "edit"])
+
+
+class TestConflicts(unittest.TestCase):
+    """Test the check of the latest revision before saving"""
+
+    def setUp(self):
+        self.api = TokenAPI()
+        self.api.add_page(u"Page", u"text")
+        self.transports = [thread.http for thread in http.threads]
+        for thread in http.threads:
+            thread.http = self.api
+        self.loginstatus = mysite._loginstatus
+        mysite._loginstatus = -1
+        mysite.invalidate_tokens()
+        self.writedelay = mysite.throttle.writedelay
+        mysite.throttle.writedelay = 0
+        self.check = pywikibot.config.edit_check_lastrevid
+        pywikibot.config.edit_check_lastrevid = True
+
+    def tearDown(self):
+        pywikibot.config.edit_check_lastrevid = self.check
+        for thread, old in zip(http.threads, self.transports):
+            thread.http = old
+        mysite._loginstatus = self.loginstatus
+        mysite.invalidate_tokens()
+        mysite.throttle.writedelay = self.writedelay
+
+    def testChanged(self):
+        page = pywikibot.Page(mysite, u"Page")
+        page.get()
+        self.api.add_page(u"Page", u"changed")
+        page.text = u"new"
+        self.assertRaises(pywikibot.EditConflict,
+                          mysite.editpage, page, u"test")
+        self.assertEqual(self.api.pages[u"Page"]["revisions"][-1]["*"],
+                         u"changed")
+        self.assertEqual(self.api.log, ["token", "info"])
+
+    def testUnchanged(self):
+        page = pywikibot.Page(mysite, u"Page")
+        page.get()
+        page.text = u"new"
+        self.assertTrue(mysite.editpage(page, u"test"))
+        self.assertEqual(self.api.log, ["token", "info", "edit"])
+        # without the check, only the edit is sent
+        del self.api.log[:]
+        page.text = u"newer"
+        self.assertTrue(mysite.editpage(page, u"test", checkrevid=False))
+        self.assertEqual(self.api.log, ["edit"])
+
+    def testCreated(self):
+        """Test that a page created since it was loaded is not replaced"""
+        page = pywikibot.Page(mysite, u"New page")
+        self.assertFalse(page.exists())
+        self.api.add_page(u"New page", u"created")
+        page.text = u"new"
+        self.assertRaises(pywikibot.EditConflict,
+                          mysite.editpage, page, u"test")
+        self.assertEqual(self.api.pages[u"New page"]["revisions"][-1]["*"],
+                         u"created")
+
+    def testInfoOnly(self):
+        """Test a page whose revision is known, but not its timestamp"""
+        page = pywikibot.Page(mysite, u"Page")
+        self.assertTrue(page.exists())
+        page.text = u"new"
+        self.assertTrue(mysite.editpage(page, u"test"))
+        self.assertEqual(self.api.pages[u"Page"]["revisions"][-1]["*"],
+                         u"new")
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
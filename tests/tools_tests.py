@@ -0,0 +1,61 @@
+# -*- coding: utf-8  -*-
+#
+# (C) Pywikipedia bot team, 2010
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import threading
+import unittest
+from pywikibot import tools
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def testOrder(self):
+        self.assertEqual(list(tools.prefetch(xrange(100), 3)), range(100))
+
+    def testLookahead(self):
+        """Test that no more than size items are retrieved in advance"""
+        taken = []
+        waiting = threading.Event()
+        def source():
+            for i in xrange(10):
+                taken.append(i)
+                if i == 3:
+                    # the queue is full, so this item cannot be queued
+                    waiting.set()
+                yield i
+        gen = tools.prefetch(source(), 2)
+        self.assertEqual(gen.next(), 0)
+        waiting.wait(10)
+        # one item consumed, two queued and one waiting to be queued
+        self.assertEqual(taken, [0, 1, 2, 3])
+        self.assertEqual([gen.next() for i in range(3)], [1, 2, 3])
+        gen.close()
+
+    def testException(self):
+        def source():
+            yield 1
+            raise ValueError("broken")
+        gen = tools.prefetch(source(), 2)
+        self.assertEqual(gen.next(), 1)
+        self.assertRaises(ValueError, gen.next)
+
+    def testStop(self):
+        gen = tools.prefetch(iter(int, 1), 2)
+        gen.next()
+        threads = [t for t in threading.enumerate()
+                   if t.getName() == "PrefetchThread"]
+        gen.close()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual([t for t in threads if t.isAlive()], [])
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
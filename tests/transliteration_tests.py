@@ -0,0 +1,71 @@
+# -*- coding: utf-8  -*-
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import unittest
+from pywikibot.userinterfaces import transliteration
+
+
+class TestTransliteration(unittest.TestCase):
+
+    def testTrans(self):
+        trans = transliteration.trans
+        self.assertEqual(trans(u"ĉ"), u"c")
+        self.assertEqual(trans(u"Ä"), u"Ae")
+        self.assertEqual(trans(u"☃"), u"?")
+        self.assertEqual(trans(u"☃", default=u"*"), u"*")
+
+    def testSpecial(self):
+        """Test the replacements that depend on the neighbours"""
+        trans = transliteration.trans
+        # repeat the preceding character
+        self.assertEqual(trans(u"々", prev=u"b"), u"b")
+        # the first letter of the next character
+        self.assertEqual(trans(u"ッ", next=u"カ"), u"k")
+        # depends on the case of the preceding character
+        self.assertEqual(trans(u"Х", prev=u"a"), u"Kh")
+        self.assertEqual(trans(u"Х", prev=u"A"), u"KH")
+        self.assertEqual(trans(u"Х"), u"Kh")
+
+    def testTransliterate(self):
+        transliterate = transliteration.transliterate
+        self.assertEqual(transliterate(u"Ĉu ĉi"), u"Cu ci")
+        self.assertEqual(transliterate(u"Щи"), u"Shchi")
+        self.assertEqual(transliterate(u"ab々"), u"abb")
+        self.assertEqual(transliterate(u"ッカ"), u"kka")
+        self.assertEqual(transliterate(u"AХ Х"), u"AKH Kh")
+        self.assertEqual(transliterate(u"щИ"), u"shchI")
+        # the results are the same as those of trans()
+        text = u"Ĉu ĉi Щи ab々 ッカ AХ Х Äx"
+        prev = u"-"
+        expected = []
+        for i, char in enumerate(text):
+            if ord(char) < 128:
+                replacement = char
+            else:
+                replacement = transliteration.trans(char, u"?", prev,
+                                                    text[i+1:i+2] or u" ")
+            expected.append(replacement)
+            prev = replacement[-1:]
+        self.assertEqual(transliterate(text), u"".join(expected))
+        self.assertEqual(transliterate(text, u"?"), u"".join(expected))
+
+    def testDefault(self):
+        """Test that only unknown non-ASCII characters are replaced"""
+        transliterate = transliteration.transliterate
+        self.assertEqual(transliterate(u"Abc def", u"?"), u"Abc def")
+        self.assertEqual(transliterate(u"a☃ĉ", u"?"), u"a?c")
+        self.assertEqual(transliterate(u"a☃ĉ"), u"a☃c")
+        self.assertEqual(transliterate(u"a☃々", u"?"), u"a??")
+        self.assertEqual(transliterate(u"a☃々"), u"a☃☃")
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
@@ -0,0 +1,178 @@
+# -*- coding: utf-8  -*-
+#
+# (C) Pywikipedia bot team, 2011
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import json
+import os
+import tempfile
+import unittest
+import urllib
+import pywikibot
+from pywikibot.comms import fakeapi, transport
+
+URI = "http://en.example.org/w/api.php"
+
+
+def query(api, **params):
+    """Send params to api like api.Request does, and return the result"""
+    params["format"] = "json"
+    response, content = api.request(URI, "POST",
+                                    body=urllib.urlencode(params))
+    return json.loads(content)
+
+
+class TestFakeAPI(unittest.TestCase):
+
+    def setUp(self):
+        self.api = fakeapi.FakeAPI()
+        for i in range(5):
+            self.api.add_page(u"Page %i" % i, u"text %i" % i)
+        self.api.add_page(u"talk:Page 1", u"talk")
+
+    def testContinuation(self):
+        """Test that allpages is continued until all pages are listed"""
+        titles = []
+        params = dict(action="query", list="allpages", aplimit="2")
+        while True:
+            data = query(self.api, **params)
+            titles.extend(item["title"] for item in data["query"]["allpages"])
+            if "query-continue" not in data:
+                break
+            params.update(data["query-continue"]["allpages"])
+        self.assertEqual(titles, [u"Page %i" % i for i in range(5)])
+
+    def testPages(self):
+        data = query(self.api, action="query", prop="info|revisions",
+                     rvprop="ids|content", titles="Talk:Page_1|Missing")
+        pages = sorted(data["query"]["pages"].values(),
+                       key=lambda page: page["title"])
+        self.assertEqual(pages[0]["title"], u"Missing")
+        self.assertTrue("missing" in pages[0])
+        self.assertEqual(pages[1]["title"], u"Talk:Page 1")
+        self.assertEqual(pages[1]["revisions"][0]["*"], u"talk")
+
+    def testEdit(self):
+        """Test that edits are saved and edit conflicts detected"""
+        data = query(self.api, action="query", prop="info|revisions",
+                     intoken="edit", titles="Page 2")
+        page = data["query"]["pages"].values()[0]
+        base = page["revisions"][0]["timestamp"]
+        edit = dict(action="edit", title="Page 2", text="new",
+                    token=page["edittoken"], basetimestamp=base)
+        data = query(self.api, **edit)
+        self.assertEqual(data["edit"]["result"], "Success")
+        self.assertEqual(self.api.pages[u"Page 2"]["revisions"][-1]["*"],
+                         u"new")
+        edit["text"] = "newer"
+        data = query(self.api, **edit)
+        self.assertEqual(data["error"]["code"], "editconflict")
+
+
+class CookieAPI(fakeapi.FakeAPI):
+    """FakeAPI that sets a session cookie with each response"""
+
+    def request(self, *args, **kwargs):
+        response, content = fakeapi.FakeAPI.request(self, *args, **kwargs)
+        response["set-cookie"] = "fakewiki_session=secret"
+        return response, content
+
+
+class TestCassette(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def testReplay(self):
+        """Test that recorded responses are replayed in order"""
+        api = fakeapi.FakeAPI()
+        filename = self.filename
+        cassette = transport.Cassette(filename)
+        recorder = transport.RecordingTransport(api, cassette)
+        body = "action=query&list=allpages&format=json"
+        first = recorder.request(URI, "POST", body)[1]
+        api.add_page(u"Example", u"text")
+        second = recorder.request(URI, "POST", body)[1]
+        cassette.save()
+        cassette = transport.Cassette(filename)
+        cassette.load()
+        player = transport.ReplayTransport(cassette)
+        response, content = player.request(URI, "POST", body)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(content, first)
+        self.assertEqual(player.request(URI, "POST", body)[1], second)
+        self.assertTrue(isinstance(player.request(URI, "POST", body),
+                                   pywikibot.FatalServerError))
+
+    def testScrub(self):
+        """Test that cookies and tokens are not saved, and that requests
+        with the replayed tokens match the recorded ones"""
+        api = CookieAPI()
+        api.edittoken = u"0123456789abcdef+\\"
+        api.add_page(u"Example", u"text")
+        cassette = transport.Cassette(self.filename)
+        recorder = transport.RecordingTransport(api, cassette)
+        data = query(recorder, action="query", prop="info",
+                     intoken="edit", titles="Example")
+        token = data["query"]["pages"].values()[0]["edittoken"]
+        self.assertEqual(token, api.edittoken)
+        data = query(recorder, action="edit", title="Example", text="new",
+                     token=token.encode("utf-8"))
+        self.assertEqual(data["edit"]["result"], "Success")
+        cassette.save()
+        f = open(self.filename, "rb")
+        try:
+            saved = f.read()
+        finally:
+            f.close()
+        self.assertFalse("0123456789abcdef" in saved)
+        self.assertFalse("secret" in saved)
+
+        cassette = transport.Cassette(self.filename)
+        cassette.load()
+        player = transport.ReplayTransport(cassette)
+        data = query(player, action="query", prop="info",
+                     intoken="edit", titles="Example")
+        token = data["query"]["pages"].values()[0]["edittoken"]
+        self.assertNotEqual(token, api.edittoken)
+        self.assertTrue(token.endswith(u"+\\"))
+        data = query(player, action="edit", title="Example", text="new",
+                     token=token.encode("utf-8"))
+        self.assertEqual(data["edit"]["result"], "Success")
+
+    def testMiss(self):
+        """Test that a request without a recorded response is not retried"""
+        from pywikibot.comms import http
+        from pywikibot.data import api
+        cassette = transport.Cassette(self.filename)
+        player = transport.ReplayTransport(cassette)
+        site = pywikibot.Site("en", "wikipedia")
+        transports = [thread.http for thread in http.threads]
+        loginstatus = site._loginstatus
+        try:
+            for thread in http.threads:
+                thread.http = player
+            site._loginstatus = -1
+            request = api.Request(site=site, action="query",
+                                  meta="userinfo")
+            self.assertRaises(pywikibot.FatalServerError, request.submit)
+            future = request.submit_async()
+            self.assertRaises(pywikibot.FatalServerError, future.result)
+        finally:
+            for thread, old in zip(http.threads, transports):
+                thread.http = old
+            site._loginstatus = loginstatus
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
@@ -0,0 +1,175 @@
+# -*- coding: utf-8  -*-
+#
+# (C) Pywikipedia bot team, 2010
+#
+# Distributed under the terms of the MIT license.
+#
+__version__ = '$Id$'
+
+import bz2
+import gzip
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+import pywikibot
+from pywikibot import xmlreader
+
+DUMP = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.4/" version="0.4">
+  <siteinfo>
+    <sitename>Wikipedia</sitename>
+    <namespaces>
+      <namespace key="0" />
+      <namespace key="1">Talk</namespace>
+    </namespaces>
+  </siteinfo>
+  <page>
+    <title>Pear</title>
+    <id>1</id>
+    <revision>
+      <id>10</id>
+      <timestamp>2010-01-01T00:00:00Z</timestamp>
+      <contributor><username>Alice</username><id>5</id></contributor>
+      <text xml:space="preserve">old</text>
+    </revision>
+    <revision>
+      <id>11</id>
+      <timestamp>2010-01-02T00:00:00Z</timestamp>
+      <contributor><ip>127.0.0.1</ip></contributor>
+      <comment>fix</comment>
+      <text xml:space="preserve">Birne \xc3\xa4</text>
+    </revision>
+  </page>
+  <page>
+    <title>Talk:Pear</title>
+    <id>2</id>
+    <redirect />
+    <revision>
+      <id>12</id>
+      <timestamp>2010-01-03T00:00:00Z</timestamp>
+      <contributor><username>Bob</username><id>6</id></contributor>
+      <text xml:space="preserve">#REDIRECT [[Pear]]</text>
+    </revision>
+  </page>
+</mediawiki>
+"""
+
+
+def containsPear(entry):
+    return "Pear" in entry.text
+
+
+class TestXmlDump(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, opener=open):
+        filename = os.path.join(self.dir, name)
+        f = opener(filename, "wb")
+        f.write(DUMP)
+        f.close()
+        return filename
+
+    def testLatestRevision(self):
+        entries = list(xmlreader.XmlDump(self.write("dump.xml")).parse())
+        self.assertEqual([e.title for e in entries], [u"Pear", u"Talk:Pear"])
+        pear, talk = entries
+        self.assertEqual(pear.text, u"Birne \xe4")
+        self.assertEqual(pear.revisionid, "11")
+        self.assertEqual(pear.id, "1")
+        self.assertEqual(pear.ns, 0)
+        self.assertEqual(pear.username, u"127.0.0.1")
+        self.assert_(pear.ipedit)
+        self.assert_(not pear.redirect)
+        self.assertEqual(talk.ns, 1)
+        self.assert_(talk.redirect)
+        self.assertEqual(talk.username, u"Bob")
+
+    def testAllRevisions(self):
+        dump = xmlreader.XmlDump(self.write("dump.xml"), allrevisions=True)
+        self.assertEqual([e.revisionid for e in dump.parse()],
+                         ["10", "11", "12"])
+
+    def testCompressed(self):
+        for name, opener in (("dump.xml.bz2", bz2.BZ2File),
+                             ("dump.xml.gz", gzip.open)):
+            dump = xmlreader.XmlDump(self.write(name, opener))
+            self.assertEqual([e.title for e in dump.parse()],
+                             [u"Pear", u"Talk:Pear"])
+
+    def writePages(self):
+        pages = "".join(["""  <page>
+    <title>P%d</title>
+    <id>%d</id>
+    <revision>
+      <id>%d</id>
+      <text xml:space="preserve">%s</text>
+    </revision>
+  </page>
+""" % (i, i, i, i % 3 and "Apple" or "Pear") for i in range(100)])
+        filename = self.write("dump.xml")
+        f = open(filename, "wb")
+        f.write(DUMP.replace("</mediawiki>", pages + "</mediawiki>"))
+        f.close()
+        return filename
+
+    def testScan(self):
+        filename = self.writePages()
+        expected = [u"Talk:Pear"] + [u"P%d" % i for i in range(0, 100, 3)]
+        for processes in (1, 2):
+            dump = xmlreader.XmlDump(filename)
+            self.assertEqual(list(dump.scan(containsPear, chunksize=500,
+                                            processes=processes)),
+                             expected)
+        dump = xmlreader.XmlDump(filename)
+        self.assertEqual(list(dump.scan(containsPear, start=u"P50",
+                                        chunksize=500, processes=2)),
+                         expected[18:])
+
+    def testScanThread(self):
+        """Test that no worker processes are started from other threads"""
+        filename = self.writePages()
+        pool = xmlreader.multiprocessing.Pool
+        result = []
+        def scan():
+            dump = xmlreader.XmlDump(filename)
+            result.extend(dump.scan(containsPear, chunksize=500,
+                                    processes=2))
+        xmlreader.multiprocessing.Pool = None
+        try:
+            thread = threading.Thread(target=scan)
+            thread.start()
+            thread.join()
+        finally:
+            xmlreader.multiprocessing.Pool = pool
+        self.assertEqual(len(result), 35)
+
+    def testReplaceMatcher(self):
+        """Test that the matcher of replace.py works without the site in
+        the worker processes"""
+        from scripts import replace
+        site = pywikibot.Site("en", "wikipedia")
+        matcher = replace.XmlDumpReplaceMatcher(
+            [(re.compile("Pear"), u"Apple")],
+            {"inside-tags": ["hyperlink", "interwiki"],
+             "title": [re.compile("^P[1-9]")]}, site)
+        copy = pickle.loads(pickle.dumps(matcher))
+        self.assertEqual(copy.replacementSet.site, None)
+        dump = xmlreader.XmlDump(self.writePages())
+        self.assertEqual(list(dump.scan(matcher, chunksize=500,
+                                        processes=2)),
+                         [u"Talk:Pear", u"P0"])
+
+
+if __name__ == '__main__':
+    try:
+        unittest.main()
+    except SystemExit:
+        pass